@@ -0,0 +1,317 @@
+"""
+Offline evaluation of similarity backends: result quality against cost
+
+Every candidate backend answers the top-k query of every catalog movie and
+is scored against the exact dense cosine matrix (the 'precomputed'
+backend):
+    - recall@k: share of the exact top k returned. Movies tied with the
+      exact k-th score count as hits, so a backend that only breaks ties
+      differently scores 1.0
+    - rank overlap: rank-biased overlap (RBO, p=0.9) with the exact list,
+      so order differences near the top cost the most
+and next to it the backend's in-memory footprint, build time and
+single-query latency.
+
+Candidates:
+    exact     dense float32 N x N matrix (the reference itself)
+    float16   dense matrix stored as float16
+    pruned    top --prune-n neighbours per movie (ids + float16 scores)
+    svd       cosine over --svd-dims truncated-SVD vectors of the features
+    sparse    on-the-fly cosine over the sparse feature matrix
+
+Usage:
+    python -m benchmarks.evaluate_backends --size 5000
+    python -m benchmarks.evaluate_backends --data-dir data --k 10 25 --workers 8
+    python -m benchmarks.evaluate_backends --backends float16 pruned --prune-n 50
+
+Quality is computed in parallel over chunks of titles (forked worker
+processes share the built backends); latency is measured afterwards in
+the main process alone, so the workers do not skew it.
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import svds
+
+from benchmarks.run_benchmarks import latency_stats
+from recommender.utils.similarity import PrecomputedSimilarity, SparseCosineSimilarity, top_k_indices
+
+CANDIDATES = ('exact', 'float16', 'pruned', 'svd', 'sparse')
+
+# Persistence of rank-biased overlap: weight of rank r is proportional to RBO_P ** r
+RBO_P = 0.9
+
+
+class Float16Similarity:
+    """Dense similarity matrix kept in half precision"""
+
+    def __init__(self, matrix):
+        self.matrix = np.asarray(matrix, dtype=np.float16)
+
+    def top_k(self, index, k):
+        return top_k_indices(self.matrix[index].astype(np.float32), k, exclude=index)
+
+
+class PrunedSimilarity:
+    """Only the n best neighbours of each movie, best first"""
+
+    def __init__(self, matrix, n):
+        rows = len(matrix)
+        self.neighbors = np.empty((rows, n), dtype=np.int32)
+        self.scores = np.empty((rows, n), dtype=np.float16)
+        for index in range(rows):
+            row = np.asarray(matrix[index], dtype=np.float32)
+            neighbors = top_k_indices(row, n, exclude=index)
+            self.neighbors[index, :len(neighbors)] = neighbors
+            self.scores[index, :len(neighbors)] = row[neighbors]
+
+    def top_k(self, index, k):
+        # Lists are already sorted: a query is a slice, k is capped at n
+        return self.neighbors[index, :k]
+
+
+class SVDSimilarity:
+    """Cosine over reduced-dimension vectors of the row-normalized features"""
+
+    def __init__(self, feature_matrix, dims):
+        vectors = SparseCosineSimilarity(feature_matrix).vectors
+        dims = min(dims, min(vectors.shape) - 1)
+        u, s, _ = svds(vectors.astype(np.float64), k=dims)
+        embedding = (u * s).astype(np.float32)
+        norms = np.linalg.norm(embedding, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.vectors = embedding / norms
+
+    def top_k(self, index, k):
+        return top_k_indices(self.vectors @ self.vectors[index], k, exclude=index)
+
+
+def footprint_bytes(index):
+    """Bytes of the arrays (dense or sparse) an index holds"""
+    total = 0
+    for value in vars(index).values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+        elif sparse.issparse(value):
+            total += value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    return total
+
+
+def rank_biased_overlap(exact, candidate, p=RBO_P):
+    """Truncated rank-biased overlap of two top-k lists (1.0 when identical)"""
+    depth = min(len(exact), len(candidate))
+    if depth == 0:
+        return 1.0
+    seen_exact, seen_candidate = set(), set()
+    overlap = 0
+    total = 0.0
+    for rank in range(depth):
+        a, b = int(exact[rank]), int(candidate[rank])
+        if a == b:
+            overlap += 1
+        else:
+            overlap += (a in seen_candidate) + (b in seen_exact)
+        seen_exact.add(a)
+        seen_candidate.add(b)
+        total += p ** rank * overlap / (rank + 1)
+    return total * (1 - p) / (1 - p ** depth)
+
+
+def load_catalog(data_dir):
+    """
+    Exact dense matrix and sparse features of a catalog
+
+    Returns:
+        Tuple of (N x N similarity memmap, N x V sparse feature matrix)
+    """
+    from recommender.utils.data_loader import DataLoader
+    from recommender.utils.similarity import build_count_matrix
+
+    loader = DataLoader(data_dir=data_dir)
+    loader.load_movies()
+    loader.load_credits()
+    loader.merge_data()
+    loader.align_to_artifact()
+    loader.load_similarity_matrix()
+    feature_matrix, _ = build_count_matrix(loader.create_feature_tokens())
+    return loader.similarity_matrix, feature_matrix
+
+
+def build_backends(names, matrix, feature_matrix, prune_n, svd_dims):
+    """
+    Build the candidate backends
+
+    Returns:
+        Dict of name -> (index, build seconds)
+    """
+    builders = {
+        'exact': lambda: PrecomputedSimilarity(matrix),
+        'float16': lambda: Float16Similarity(matrix),
+        'pruned': lambda: PrunedSimilarity(matrix, prune_n),
+        'svd': lambda: SVDSimilarity(feature_matrix, svd_dims),
+        'sparse': lambda: SparseCosineSimilarity(feature_matrix),
+    }
+    backends = {}
+    for name in names:
+        print(f"Building {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        index = builders[name]()
+        backends[name] = (index, time.perf_counter() - start)
+    return backends
+
+
+# Built in the parent before the worker processes fork
+_state = {}
+
+
+def _evaluate_chunk(indices):
+    """
+    Quality sums of every backend over a chunk of titles
+
+    Returns:
+        Dict of (name, k) -> [recall sum, RBO sum]
+    """
+    exact = _state['exact']
+    sums = {}
+    for index in indices:
+        exact_scores = np.asarray(exact.scores(index), dtype=np.float32)
+        # One reference list, sliced, so every cutoff breaks ties the same way
+        reference = exact.top_k(index, max(_state['ks']))
+        exact_lists = {k: reference[:k] for k in _state['ks']}
+        for name, backend in _state['backends'].items():
+            candidate = backend.top_k(index, max(_state['ks']))
+            for k, exact_list in exact_lists.items():
+                got = candidate[:k]
+                # Ties with the exact k-th score are as good as the exact pick
+                threshold = exact_scores[exact_list[-1]] - 1e-6 if len(exact_list) else np.inf
+                recall = float((exact_scores[got] >= threshold).sum()) / max(len(exact_list), 1)
+                entry = sums.setdefault((name, k), [0.0, 0.0])
+                entry[0] += min(recall, 1.0)
+                entry[1] += rank_biased_overlap(exact_list, got)
+    return sums
+
+
+def evaluate_quality(backends, exact, ks, indices, workers):
+    """Mean recall@k and RBO of every backend over the given titles"""
+    _state.update(backends={name: index for name, (index, _) in backends.items()}, exact=exact, ks=ks)
+    chunks = np.array_split(np.asarray(indices), max(workers * 4, 1))
+    totals = {}
+    if workers > 1:
+        # Fork, so the workers share the built backends instead of rebuilding them
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(_evaluate_chunk, [chunk.tolist() for chunk in chunks]))
+    else:
+        results = [_evaluate_chunk(chunk.tolist()) for chunk in chunks]
+    # Drop the references to the backends (and the mapped matrix)
+    _state.clear()
+    for sums in results:
+        for key, (recall, rbo) in sums.items():
+            entry = totals.setdefault(key, [0.0, 0.0])
+            entry[0] += recall
+            entry[1] += rbo
+    return {key: (recall / len(indices), rbo / len(indices)) for key, (recall, rbo) in totals.items()}
+
+
+def measure_latency(index, indices, k):
+    durations = []
+    for position in indices:
+        start = time.perf_counter()
+        index.top_k(position, k)
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+
+def print_table(report):
+    ks = report['k']
+    header = f"{'backend':<9} {'memory MB':>10} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+    for k in ks:
+        header += f" {f'recall@{k}':>10} {f'rbo@{k}':>8}"
+    print(header)
+    for name, row in report['backends'].items():
+        line = (f"{name:<9} {row['memory_mb']:>10.1f} {row['build_seconds']:>8.2f} "
+                f"{row['latency']['p50_ms']:>8.3f} {row['latency']['p95_ms']:>8.3f}")
+        for k in ks:
+            line += f" {row['quality'][str(k)]['recall']:>10.4f} {row['quality'][str(k)]['rbo']:>8.4f}"
+        print(line)
+
+
+def evaluate(args, matrix, feature_matrix):
+    """
+    Build, score and time every requested backend
+
+    Returns:
+        Report dictionary (see main)
+    """
+    n_movies = len(matrix)
+    rng = np.random.default_rng(args.seed)
+    indices = np.arange(n_movies)
+    if args.sample is not None and args.sample < n_movies:
+        indices = np.sort(rng.choice(n_movies, size=args.sample, replace=False))
+    latency_indices = rng.choice(n_movies, size=min(args.latency_queries, n_movies), replace=False)
+
+    backends = build_backends(args.backends, matrix, feature_matrix, args.prune_n, args.svd_dims)
+    exact = PrecomputedSimilarity(matrix)
+
+    print(f"Scoring {len(indices)} titles with {args.workers} workers...", file=sys.stderr)
+    start = time.perf_counter()
+    quality = evaluate_quality(backends, exact, args.k, indices, args.workers)
+    print(f"  done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    report = {'movies': n_movies, 'titles_scored': len(indices), 'k': args.k, 'backends': {}}
+    for name, (index, build_seconds) in backends.items():
+        report['backends'][name] = {
+            'memory_mb': footprint_bytes(index) / 1e6,
+            'build_seconds': build_seconds,
+            'latency': measure_latency(index, latency_indices, max(args.k)),
+            'quality': {
+                str(k): {'recall': quality[(name, k)][0], 'rbo': quality[(name, k)][1]} for k in args.k
+            },
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=5000, help='Synthetic catalog size (without --data-dir)')
+    parser.add_argument('--data-dir', type=Path, help='Existing data directory with a dense artifact')
+    parser.add_argument('--backends', nargs='+', choices=CANDIDATES, default=list(CANDIDATES))
+    parser.add_argument('--k', type=int, nargs='+', default=[10, 25], help='Cutoffs to score')
+    parser.add_argument('--prune-n', type=int, default=100, help='Neighbours kept by the pruned backend')
+    parser.add_argument('--svd-dims', type=int, default=64, help='Dimensions of the svd backend')
+    parser.add_argument('--sample', type=int, default=None, help='Score a random sample of titles (default: all)')
+    parser.add_argument('--latency-queries', type=int, default=500, help='Queries timed per backend')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Quality worker processes')
+    parser.add_argument('--output', type=Path, default=Path('backend_evaluation.json'))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if 'pruned' in args.backends and max(args.k) > args.prune_n:
+        parser.error('--prune-n must be at least the largest --k')
+
+    # The dense matrix is a memmap into the data directory: evaluate before it is removed
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            from benchmarks.synthetic_catalog import generate_catalog
+
+            data_dir = Path(workdir) / 'catalog'
+            generate_catalog(data_dir, args.size, seed=args.seed, dense=True)
+        report = evaluate(args, *load_catalog(data_dir))
+
+    args.output.write_text(json.dumps(report, indent=2))
+    print_table(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
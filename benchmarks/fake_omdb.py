@@ -0,0 +1,170 @@
+"""
+Local OMDB stand-in for load testing
+
+Serves the subset of the OMDB API the app uses (``?t=<title>&y=<year>``) with
+configurable latency, error rate, not-found rate and a token-bucket rate
+limit that answers like the real quota error (401 "Request limit reached!").
+
+Usage:
+    python -m benchmarks.fake_omdb --port 8765 --latency-ms 80 --error-rate 0.02 --rate-limit 100
+
+Point the app at it with OMDB_API_URL=http://127.0.0.1:8765/ . Request
+counters are served (uncounted) at /__stats.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+from recommender.utils.omdb_api import TokenBucket
+
+
+STATS_PATH = '/__stats'
+
+
+class FakeOMDBServer(ThreadingHTTPServer):
+    """HTTP server holding the fault-injection settings and request counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=50.0, jitter_ms=10.0, error_rate=0.0,
+                 not_found_rate=0.0, rate_limit=None, seed=None):
+        super().__init__(address, FakeOMDBHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.bucket = TokenBucket(rate_limit) if rate_limit else None
+        self.random = random.Random(seed)
+        self.counter_lock = threading.Lock()
+        self.counters = {'requests': 0, 'ok': 0, 'not_found': 0, 'errors': 0, 'rate_limited': 0}
+
+    def count(self, name):
+        with self.counter_lock:
+            self.counters['requests'] += 1
+            self.counters[name] += 1
+
+    def snapshot(self) -> dict:
+        with self.counter_lock:
+            return dict(self.counters)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+class FakeOMDBHandler(BaseHTTPRequestHandler):
+    """Answers OMDB title lookups"""
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path == STATS_PATH:
+            return self._send(200, server.snapshot())
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if not params.get('apikey'):
+            server.count('errors')
+            return self._send(401, {'Response': 'False', 'Error': 'No API key provided.'})
+
+        if server.bucket is not None and not server.bucket.acquire():
+            server.count('rate_limited')
+            return self._send(401, {'Response': 'False', 'Error': 'Request limit reached!'})
+
+        with server.counter_lock:
+            delay = max(0.0, server.random.gauss(server.latency_ms, server.jitter_ms)) / 1000.0
+            roll = server.random.random()
+        time.sleep(delay)
+
+        if roll < server.error_rate:
+            server.count('errors')
+            return self._send(503, {'Response': 'False', 'Error': 'Service unavailable'})
+        if roll < server.error_rate + server.not_found_rate:
+            server.count('not_found')
+            return self._send(200, {'Response': 'False', 'Error': 'Movie not found!'})
+
+        title = params.get('t', '')
+        server.count('ok')
+        return self._send(200, {
+            'Title': title,
+            'Year': params.get('y', 'N/A'),
+            'Poster': f"https://posters.example.invalid/{quote(title)}.jpg",
+            'imdbRating': '7.0',
+            'Genre': 'Drama',
+            'Runtime': '120 min',
+            'Actors': 'N/A',
+            'Director': 'N/A',
+            'Plot': f"Plot of {title}.",
+            'Response': 'True',
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep load-test output readable
+        pass
+
+
+def start_fake_omdb(host='127.0.0.1', port=0, **options):
+    """
+    Start a fake OMDB server on a background thread
+
+    Returns:
+        The running FakeOMDBServer (call ``shutdown()`` to stop it)
+    """
+    server = FakeOMDBServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def add_server_arguments(parser):
+    """Fault-injection options shared with the load generator"""
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Mean response latency')
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help='Latency standard deviation')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 503 responses')
+    parser.add_argument('--not-found-rate', type=float, default=0.0, help='Fraction of "Movie not found!"')
+    parser.add_argument('--rate-limit', type=float, default=None, help='Requests per second before 401s')
+
+
+def server_options(args) -> dict:
+    return {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate,
+        'not_found_rate': args.not_found_rate,
+        'rate_limit': args.rate_limit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeOMDBServer((args.host, args.port), **server_options(args))
+    print(f"Fake OMDB listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.snapshot()))
+
+
+if __name__ == '__main__':
+    main()
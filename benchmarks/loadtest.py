@@ -0,0 +1,316 @@
+"""
+Load-testing harness for views.main
+
+Replays a realistic query mix (exact titles with a popularity skew,
+misspellings, actor and director searches) against the recommendation view
+while OMDB is served by the local stand-in in benchmarks/fake_omdb.py.
+Reports p50/p95/p99 latency, throughput and live OMDB calls for every
+scenario x worker count.
+
+Usage:
+    # In-process: a threaded Django handler per scenario, fake OMDB started here
+    python -m benchmarks.loadtest --size 5000 --workers 1 4 16 --requests 400
+
+    # Compare settings, e.g. similarity backends (env overrides per scenario)
+    python -m benchmarks.loadtest --scenario dense:RECOMMENDER_SIMILARITY_BACKEND=precomputed \\
+        --scenario sparse:RECOMMENDER_SIMILARITY_BACKEND=sparse
+
+    # Against a running server started with OMDB_API_URL pointing at fake_omdb
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000/ --data-dir data --workers 8
+
+Each worker is a thread issuing requests back to back, like a threaded
+(gthread) server worker. In-process scenarios run against their own
+scratch SQLite database, never the project's db.sqlite3, and the poster
+store is emptied before every run, so each run starts with cold posters.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_omdb import STATS_PATH, add_server_arguments, server_options, start_fake_omdb
+from benchmarks.run_benchmarks import BASE_DIR, misspell
+
+
+# Share of each query kind in the replayed traffic
+QUERY_MIX = {'title': 0.6, 'misspelling': 0.15, 'actor': 0.15, 'director': 0.1}
+
+# Zipf exponent of title popularity: a few titles get most of the searches
+TITLE_SKEW = 1.1
+
+
+def load_query_pool(data_dir):
+    """Titles, actors and directors of the catalog in ``data_dir``"""
+    from recommender.utils.data_loader import DataLoader
+
+    datasets_dir = Path(data_dir) / 'datasets'
+    movies = pd.read_csv(datasets_dir / 'tmdb_5000_movies.csv', usecols=['title', 'popularity'])
+    credits = pd.read_csv(datasets_dir / 'tmdb_5000_credits.csv', usecols=['cast', 'crew'])
+
+    # Most popular first, so the Zipf ranks follow popularity
+    titles = movies.sort_values('popularity', ascending=False)['title'].astype(str).tolist()
+    actors = sorted({a for cast in credits['cast'] for a in DataLoader.extract_cast(cast, limit=3)})
+    directors = sorted({d for d in credits['crew'].apply(DataLoader.extract_director) if d != 'N/A'})
+    return {'titles': titles, 'actors': actors, 'directors': directors}
+
+
+def build_query_mix(pool, n_requests, seed=0):
+    """
+    Sample the replayed requests
+
+    Returns:
+        List of (kind, movie_name, search_type) tuples
+    """
+    rng = random.Random(seed)
+    ranks = np.arange(1, len(pool['titles']) + 1)
+    weights = 1.0 / ranks ** TITLE_SKEW
+    title_choices = np.random.default_rng(seed).choice(
+        len(pool['titles']), size=n_requests, p=weights / weights.sum()
+    )
+
+    kinds = rng.choices(list(QUERY_MIX), weights=list(QUERY_MIX.values()), k=n_requests)
+    queries = []
+    for kind, title_index in zip(kinds, title_choices):
+        title = pool['titles'][title_index]
+        if kind == 'title':
+            queries.append((kind, title, 'movie'))
+        elif kind == 'misspelling':
+            queries.append((kind, misspell(title, rng), 'movie'))
+        elif kind == 'actor':
+            queries.append((kind, rng.choice(pool['actors']), 'actor'))
+        else:
+            queries.append((kind, rng.choice(pool['directors']), 'director'))
+    return queries
+
+
+def in_process_sender(database=None):
+    """
+    Send requests through the full Django handler of this process
+
+    Args:
+        database: SQLite file to create and use instead of the configured
+            database (the replay writes posters, profiles and hot queries)
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movie_recommendation.settings')
+    sys.path.insert(0, str(BASE_DIR))
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client
+
+    django.setup()
+    settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+    if database is not None:
+        # Before the first query: every connection is opened from this dict
+        settings.DATABASES['default'].update(ENGINE='django.db.backends.sqlite3', NAME=str(database))
+        call_command('migrate', verbosity=0, interactive=False)
+
+    # Load the data before the clock starts
+    from recommender import views  # noqa: F401
+
+    local = threading.local()
+
+    def send(movie_name, search_type):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        return client.post('/', {'movie_name': movie_name, 'search_type': search_type}).status_code
+
+    return send
+
+
+def http_sender(url):
+    """Send requests to a running server, with its CSRF token"""
+    import requests
+
+    local = threading.local()
+
+    def send(movie_name, search_type):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.get(url, timeout=30)
+        token = session.cookies.get('csrftoken', '')
+        response = session.post(
+            url,
+            data={'movie_name': movie_name, 'search_type': search_type, 'csrfmiddlewaretoken': token},
+            headers={'X-CSRFToken': token, 'Referer': url},
+            timeout=60,
+        )
+        return response.status_code
+
+    return send
+
+
+def clear_poster_store():
+    """Forget every stored poster, so the next run looks them up again"""
+    from recommender.models import MoviePoster
+
+    MoviePoster.objects.all().delete()
+
+
+def omdb_call_counter(omdb_url):
+    """Callable returning the fake OMDB server's request count"""
+    import requests
+
+    stats_url = omdb_url.rstrip('/') + STATS_PATH
+    return lambda: requests.get(stats_url, timeout=5).json()['requests']
+
+
+def replay(send, queries, workers, omdb_calls=None):
+    """Replay the queries with ``workers`` concurrent threads"""
+    def one(query):
+        kind, movie_name, search_type = query
+        start = time.perf_counter()
+        try:
+            status = send(movie_name, search_type)
+        except Exception:
+            status = 0
+        return kind, time.perf_counter() - start, status
+
+    omdb_before = omdb_calls() if omdb_calls else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(one, queries))
+    elapsed = time.perf_counter() - start
+    omdb_after = omdb_calls() if omdb_calls else None
+
+    latencies = np.array([duration for _, duration, _ in results]) * 1000.0
+    by_kind = {}
+    for kind in QUERY_MIX:
+        kind_latencies = [d * 1000.0 for k, d, _ in results if k == kind]
+        if kind_latencies:
+            by_kind[kind] = {'count': len(kind_latencies), 'p50_ms': float(np.percentile(kind_latencies, 50))}
+
+    return {
+        'workers': workers,
+        'requests': len(results),
+        'errors': sum(1 for _, _, status in results if status != 200),
+        'elapsed_seconds': elapsed,
+        'throughput_rps': len(results) / elapsed if elapsed else 0.0,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'by_kind': by_kind,
+        'omdb_calls': omdb_after - omdb_before if omdb_calls else None,
+    }
+
+
+def parse_scenario(text):
+    """'name:KEY=VALUE,KEY2=VALUE2' -> (name, {KEY: VALUE, ...})"""
+    name, _, assignments = text.partition(':')
+    env = {}
+    for assignment in filter(None, assignments.split(',')):
+        key, _, value = assignment.partition('=')
+        env[key.strip()] = value.strip()
+    return name, env
+
+
+def run_scenario_subprocess(name, env_overrides, args, data_dir, queries_path, omdb_url, database):
+    """
+    Run one scenario in a fresh process, so settings read at import apply
+
+    The scenario gets its own ``database`` (a new SQLite file), so stored
+    posters and profiles neither leak between scenarios nor reach the
+    project's database.
+    """
+    env = dict(os.environ)
+    env.update({
+        'RECOMMENDER_DATA_DIR': str(data_dir),
+        'OMDB_API_URL': omdb_url,
+        'OMDB_API_KEY': env.get('OMDB_API_KEY') or 'loadtest',
+    })
+    env.update(env_overrides)
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.loadtest', '--replay', str(queries_path),
+         '--database', str(database), '--workers', *map(str, args.workers)],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_table(report):
+    print(f"{'scenario':<16} {'workers':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7} {'omdb':>6}")
+    for scenario in report['scenarios']:
+        for run in scenario['runs']:
+            print(f"{scenario['name']:<16} {run['workers']:>7} {run['throughput_rps']:>8.1f} "
+                  f"{run['p50_ms']:>9.1f} {run['p95_ms']:>9.1f} {run['p99_ms']:>9.1f} "
+                  f"{run['errors']:>7} {run['omdb_calls'] if run['omdb_calls'] is not None else '-':>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=5000, help='Synthetic catalog size (without --data-dir)')
+    parser.add_argument('--data-dir', type=Path, help='Existing data directory to draw queries from')
+    parser.add_argument('--requests', type=int, default=400, help='Requests per run')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16], help='Concurrent workers')
+    parser.add_argument('--scenario', action='append', default=[],
+                        help="Settings scenario 'name:ENV=VALUE,...' (repeatable)")
+    parser.add_argument('--url', help='Load-test a running server instead of in-process handlers')
+    parser.add_argument('--output', type=Path, default=Path('loadtest_results.json'))
+    parser.add_argument('--seed', type=int, default=0)
+    add_server_arguments(parser)
+    # Internal: replay a query file in this process
+    parser.add_argument('--replay', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--database', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.replay:
+        queries = [tuple(q) for q in json.loads(args.replay.read_text())]
+        send = in_process_sender(args.database)
+        omdb_calls = omdb_call_counter(os.environ['OMDB_API_URL'])
+        runs = []
+        for workers in args.workers:
+            clear_poster_store()
+            runs.append(replay(send, queries, workers, omdb_calls))
+        print(json.dumps(runs))
+        return 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            from benchmarks.synthetic_catalog import generate_catalog
+
+            data_dir = Path(workdir) / 'catalog'
+            generate_catalog(data_dir, args.size, seed=args.seed)
+
+        queries = build_query_mix(load_query_pool(data_dir), args.requests, seed=args.seed)
+        report = {'requests_per_run': args.requests, 'query_mix': QUERY_MIX, 'scenarios': []}
+
+        if args.url:
+            send = http_sender(args.url)
+            runs = [replay(send, queries, workers) for workers in args.workers]
+            report['scenarios'].append({'name': 'remote', 'env': {}, 'runs': runs})
+        else:
+            queries_path = Path(workdir) / 'queries.json'
+            queries_path.write_text(json.dumps(queries))
+            server = start_fake_omdb(seed=args.seed, **server_options(args))
+            try:
+                for number, (name, env) in enumerate(map(parse_scenario, args.scenario or ['default:'])):
+                    database = Path(workdir) / f"scenario-{number}.sqlite3"
+                    runs = run_scenario_subprocess(name, env, args, data_dir, queries_path, server.url, database)
+                    report['scenarios'].append({'name': name, 'env': env, 'runs': runs})
+                report['omdb'] = server.snapshot()
+            finally:
+                server.shutdown()
+
+    args.output.write_text(json.dumps(report, indent=2))
+    print_table(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
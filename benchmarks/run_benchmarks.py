@@ -0,0 +1,257 @@
+"""
+Benchmark suite for the recommendation hot paths
+
+For each catalog size this measures, in a fresh process:
+    - cold load time of DataLoader.load_all
+    - per-query latency of RecommendationEngine for title/actor/director/suggestion queries
+    - full views.main request latency (OMDB disabled, so posters are the placeholder)
+    - peak RSS
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 5000 50000 200000
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json --tolerance 0.2
+
+Catalogs above synthetic_catalog.DENSE_LIMIT titles have no dense matrix and are
+benchmarked with the sparse similarity backend.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SIZES = [5000, 50000, 200000]
+
+# Differences below these floors are treated as noise when comparing runs
+NOISE_FLOOR = {'_ms': 0.05, '_seconds': 0.05, '_mb': 5.0}
+
+
+def latency_stats(samples_seconds):
+    """Summarize latency samples (seconds) in milliseconds"""
+    samples = np.asarray(samples_seconds) * 1000.0
+    return {
+        'count': int(len(samples)),
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'max_ms': float(samples.max()),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+def misspell(title, rng):
+    """Swap two adjacent characters so the query misses the exact title index"""
+    chars = list(title.lower())
+    i = rng.randrange(len(chars) - 1)
+    chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return ''.join(chars)
+
+
+def build_queries(catalog_info, n_queries, seed=0):
+    """Sample the query mix for every search path"""
+    rng = random.Random(seed)
+    titles = rng.sample(catalog_info['titles'], min(n_queries, len(catalog_info['titles'])))
+    return {
+        'title': titles,
+        'actor': rng.sample(catalog_info['actors'], min(n_queries, len(catalog_info['actors']))),
+        'director': rng.sample(catalog_info['directors'], min(n_queries, len(catalog_info['directors']))),
+        'suggestion': [misspell(t, rng) for t in titles],
+    }
+
+
+def timed_calls(func, queries):
+    """Call func once per query and return the per-call durations"""
+    durations = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def run_worker(data_dir, backend, queries):
+    """Benchmark one catalog in the current process and return the results"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movie_recommendation.settings')
+    os.environ['RECOMMENDER_DATA_DIR'] = str(data_dir)
+    os.environ['RECOMMENDER_SIMILARITY_BACKEND'] = backend
+    sys.path.insert(0, str(BASE_DIR))
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    # Stub the OMDB call: without a key get_movie_poster returns the placeholder
+    settings.OMDB_API_KEY = None
+
+    from recommender.utils import data_loader as data_loader_module
+    from recommender.utils import DataLoader
+
+    start = time.perf_counter()
+    loader = DataLoader(similarity_backend=backend, data_dir=data_dir)
+    loader.load_all()
+    load_seconds = time.perf_counter() - start
+
+    # Reuse the loaded data for the views module instead of loading it twice
+    data_loader_module._data_loader = loader
+    from django.test import RequestFactory
+    from recommender import views
+
+    engine = views.recommender
+    factory = RequestFactory()
+
+    engine_results = {}
+    view_results = {}
+    view_search_types = {'title': 'movie', 'suggestion': 'movie', 'actor': 'actor', 'director': 'director'}
+    for path, path_queries in queries.items():
+        engine_results[path] = latency_stats(
+            timed_calls(lambda q: engine.get_recommendations(q, k=25), path_queries)
+        )
+
+        def request_main(query, search_type=view_search_types[path]):
+            request = factory.post('/', {'movie_name': query, 'search_type': search_type})
+            return views.main(request)
+
+        view_results[path] = latency_stats(timed_calls(request_main, path_queries))
+
+    return {
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'engine': engine_results,
+        'view': view_results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_size(n_movies, n_queries, workdir, backend=None):
+    """Generate a catalog and benchmark it in a fresh subprocess"""
+    from benchmarks.synthetic_catalog import generate_catalog
+
+    data_dir = Path(workdir) / f"catalog_{n_movies}"
+    catalog_info = generate_catalog(data_dir, n_movies)
+    backend = backend or ('precomputed' if catalog_info['dense'] else 'sparse')
+
+    queries_path = data_dir / 'queries.json'
+    with open(queries_path, 'w') as f:
+        json.dump(build_queries(catalog_info, n_queries), f)
+
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.run_benchmarks', '--worker',
+         '--data-dir', str(data_dir), '--backend', backend, '--queries-file', str(queries_path)],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def flatten(results, prefix=''):
+    """Flatten nested result dictionaries into dotted metric names"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, tolerance):
+    """
+    Compare a run against a baseline
+
+    Returns:
+        List of (metric, baseline_value, current_value, ratio) for regressions
+    """
+    current_flat = flatten(current['sizes'])
+    baseline_flat = flatten(baseline['sizes'])
+    regressions = []
+    for metric, base_value in sorted(baseline_flat.items()):
+        unit = next((u for u in NOISE_FLOOR if metric.endswith(u)), None)
+        if unit is None or metric not in current_flat:
+            continue
+        value = current_flat[metric]
+        if value > base_value * (1 + tolerance) and value - base_value > NOISE_FLOOR[unit]:
+            ratio = value / base_value if base_value else float('inf')
+            regressions.append((metric, base_value, value, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Catalog sizes')
+    parser.add_argument('--queries', type=int, default=50, help='Queries per search path')
+    parser.add_argument('--backend', choices=['precomputed', 'sparse', 'sharded'], default=None,
+                        help='Similarity backend (default: by catalog size)')
+    parser.add_argument('--output', type=Path, default=Path('benchmark_results.json'), help='Results JSON')
+    parser.add_argument('--baseline', type=Path, help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown (0.2 = 20%%)')
+    parser.add_argument('--save-baseline', type=Path, help='Also write the results as a new baseline')
+    parser.add_argument('--workdir', type=Path, help='Where to write catalogs (default: temp dir)')
+    # Internal: benchmark a single, already generated catalog
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--queries-file', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.queries_file) as f:
+            queries = json.load(f)
+        print(json.dumps(run_worker(args.data_dir, args.backend, queries)))
+        return 0
+
+    results = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'queries_per_path': args.queries,
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for n_movies in args.sizes:
+            print(f"Benchmarking {n_movies} titles...", file=sys.stderr)
+            size_results = run_size(n_movies, args.queries, workdir, args.backend)
+            results['sizes'][str(n_movies)] = size_results
+            print(
+                f"  load {size_results['load_seconds']:.2f}s, "
+                f"title p50 {size_results['engine']['title']['p50_ms']:.2f}ms, "
+                f"view p50 {size_results['view']['title']['p50_ms']:.2f}ms, "
+                f"peak RSS {size_results['peak_rss_mb']:.0f}MB",
+                file=sys.stderr,
+            )
+
+    args.output.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        for metric, base_value, value, ratio in regressions:
+            print(f"REGRESSION {metric}: {base_value:.3f} -> {value:.3f} ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
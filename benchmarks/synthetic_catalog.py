@@ -0,0 +1,151 @@
+"""
+Synthetic Catalog Generator
+Writes a fake TMDB-shaped dataset (movies, credits JSON, model artifact) of any size
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from recommender.utils.model_artifacts import save_model_artifacts
+from recommender.utils.similarity import SparseCosineSimilarity, build_count_matrix
+
+
+# Largest catalog that gets a dense N x N matrix (10k x 10k float32 = 400 MB)
+DENSE_LIMIT = 10000
+
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama',
+    'Family', 'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance',
+    'Science Fiction', 'Thriller', 'War', 'Western',
+]
+
+TITLE_WORDS = [
+    'Dark', 'Last', 'Lost', 'Silent', 'Golden', 'Broken', 'Hidden', 'Midnight', 'Final',
+    'Crimson', 'Iron', 'Frozen', 'Wild', 'Secret', 'Burning', 'Empty', 'Eternal', 'Red',
+    'City', 'River', 'Kingdom', 'Empire', 'Night', 'Storm', 'Shadow', 'Garden', 'Road',
+    'Dream', 'Island', 'Star', 'Heart', 'Game', 'Machine', 'Ghost', 'Planet', 'War',
+]
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+    'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas',
+    'Sarah', 'Chris', 'Karen', 'Daniel', 'Nancy', 'Matthew', 'Lisa', 'Anthony', 'Emma',
+    'Mark', 'Olivia', 'Paul', 'Sophia', 'Steven', 'Grace', 'Kevin', 'Chloe', 'Brian', 'Zoe',
+]
+
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Wilson',
+    'Anderson', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Thompson', 'White', 'Harris',
+    'Clark', 'Lewis', 'Robinson', 'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott',
+    'Hill', 'Green', 'Adams', 'Baker', 'Nelson', 'Carter', 'Mitchell', 'Roberts', 'Turner',
+]
+
+
+def _people(rng, count, prefix=''):
+    """Unique, realistic-looking person names"""
+    firsts = rng.choice(FIRST_NAMES, count)
+    lasts = rng.choice(LAST_NAMES, count)
+    return [f"{prefix}{first} {last} {i}" for i, (first, last) in enumerate(zip(firsts, lasts))]
+
+
+def _json_names(names, **extra):
+    """TMDB-style JSON list of {'name': ...} objects"""
+    return json.dumps([dict(extra, id=i, name=name) for i, name in enumerate(names)])
+
+
+def generate_catalog(directory, n_movies: int, seed: int = 0, dense: bool = None):
+    """
+    Write a synthetic catalog laid out like the real data/ directory
+
+    Args:
+        directory: Output data directory (gets datasets/ and models/)
+        n_movies: Number of titles
+        seed: Random seed
+        dense: Write a dense similarity artifact (default: n_movies <= DENSE_LIMIT)
+
+    Returns:
+        Dictionary with the generated titles, actors, directors and paths
+    """
+    directory = Path(directory)
+    datasets_dir = directory / 'datasets'
+    models_dir = directory / 'models'
+    datasets_dir.mkdir(parents=True, exist_ok=True)
+    models_dir.mkdir(parents=True, exist_ok=True)
+    if dense is None:
+        dense = n_movies <= DENSE_LIMIT
+
+    rng = np.random.default_rng(seed)
+    actors = _people(rng, max(50, n_movies // 2))
+    directors = _people(rng, max(20, n_movies // 8), prefix='Dir. ')
+    keywords = [f"keyword{i}" for i in range(max(100, n_movies // 5))]
+
+    # Sample from arrays: rng.choice converts a list on every call
+    actor_pool = np.array(actors, dtype=object)
+    keyword_pool = np.array(keywords, dtype=object)
+
+    titles = [
+        f"The {rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {i}" for i in range(n_movies)
+    ]
+
+    movies_rows = []
+    credits_rows = []
+    token_lists = []
+    for i, title in enumerate(titles):
+        movie_genres = list(rng.choice(GENRES, rng.integers(1, 4), replace=False))
+        movie_keywords = list(rng.choice(keyword_pool, rng.integers(3, 12), replace=False))
+        cast = list(rng.choice(actor_pool, rng.integers(5, 20), replace=False))
+        director = directors[rng.integers(len(directors))]
+        crew = [
+            {'name': director, 'job': 'Director', 'department': 'Directing'},
+            {'name': directors[rng.integers(len(directors))], 'job': 'Producer', 'department': 'Production'},
+        ]
+        movies_rows.append({
+            'budget': int(rng.integers(0, 200_000_000)),
+            'genres': _json_names(movie_genres),
+            'homepage': '',
+            'id': i + 1,
+            'keywords': _json_names(movie_keywords),
+            'original_language': 'en',
+            'original_title': title,
+            'overview': f"A story about {' and '.join(movie_keywords[:3])} in the {movie_genres[0].lower()} tradition.",
+            'popularity': float(rng.pareto(1.5) * 10),
+            'production_companies': _json_names(['Synthetic Pictures']),
+            'release_date': f"{rng.integers(1930, 2024)}-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+            'revenue': int(rng.integers(0, 1_000_000_000)),
+            'runtime': int(rng.integers(70, 200)),
+            'status': 'Released',
+            'tagline': f"{rng.choice(TITLE_WORDS)} is coming.",
+            'title': title,
+            'vote_average': round(float(rng.uniform(1, 10)), 1),
+            'vote_count': int(rng.integers(0, 20000)),
+        })
+        credits_rows.append({
+            'movie_id': i + 1,
+            'title': title,
+            'cast': json.dumps([{'cast_id': j, 'character': f"Role {j}", 'name': name, 'order': j}
+                                for j, name in enumerate(cast)]),
+            'crew': json.dumps(crew),
+        })
+        token_lists.append(movie_keywords + cast[:3] + movie_genres + [director] * 3)
+
+    movies = pd.DataFrame(movies_rows)
+    movies.to_csv(datasets_dir / 'tmdb_5000_movies.csv', index=False)
+    pd.DataFrame(credits_rows).to_csv(datasets_dir / 'tmdb_5000_credits.csv', index=False)
+
+    if dense:
+        feature_matrix, _ = build_count_matrix(token_lists)
+        vectors = SparseCosineSimilarity(feature_matrix).vectors
+        similarity = (vectors @ vectors.T).toarray()
+        save_model_artifacts(models_dir, movies, similarity)
+
+    return {
+        'directory': directory,
+        'n_movies': n_movies,
+        'dense': dense,
+        'titles': titles,
+        'actors': actors,
+        'directors': directors,
+    }
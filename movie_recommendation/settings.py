@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "recommender.middleware.RequestIdMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -36,7 +37,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware"
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "recommender.middleware.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "movie_recommendation.urls"
@@ -129,4 +131,115 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # OMDB API Configuration
 # Get your free API key from: http://www.omdbapi.com/apikey.aspx
-OMDB_API_KEY = '8fadb753'  # OMDB API key
+OMDB_API_KEY = os.environ.get('OMDB_API_KEY', '8fadb753')  # OMDB API key
+# Override to point at a local stand-in (see benchmarks/fake_omdb.py)
+OMDB_API_URL = os.environ.get('OMDB_API_URL', 'http://www.omdbapi.com/')
+# OMDB client: pooled connections, client-side rate limit and a circuit breaker
+# that falls back to the placeholder poster while OMDB is failing or our quota
+# is used up (see recommender/utils/omdb_api.py)
+OMDB_CLIENT = {
+    'timeout': 3.0,
+    'pool_size': int(os.environ.get('OMDB_POOL_SIZE', '20')),
+    'retries': 1,
+    'rate_limit': float(os.environ.get('OMDB_RATE_LIMIT', '10')),  # requests per second
+    'burst': 20,
+    'max_wait': 0.5,  # seconds a lookup may wait for the rate limiter
+    'failure_threshold': 5,
+    'reset_timeout': 30.0,
+    'quota_reset_timeout': 3600.0,
+}
+
+# Directory holding datasets/ (TMDB CSVs) and models/ (model artifact)
+RECOMMENDER_DATA_DIR = os.environ.get('RECOMMENDER_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+
+# 'manage.py test' serves the app from a generated catalog instead of data/
+TEST_RUNNER = 'recommender.test_runner.SyntheticCatalogRunner'
+
+# Normalized queries whose resolution (title / actor / director / suggestions)
+# is memoized per process
+RECOMMENDER_QUERY_CACHE_SIZE = int(os.environ.get('RECOMMENDER_QUERY_CACHE_SIZE', '10000'))
+
+# Rendered result cards kept per process (see recommender/utils/card_cache.py)
+RECOMMENDER_CARD_CACHE_SIZE = int(os.environ.get('RECOMMENDER_CARD_CACHE_SIZE', '5000'))
+
+# Popular-query tracking (count-min sketch + decayed top-K per process),
+# flushed to the HotQuery table every flush_interval seconds
+RECOMMENDER_QUERY_TRACKER = {
+    'enabled': os.environ.get('RECOMMENDER_QUERY_TRACKER', 'True') == 'True',
+    'top_k': 200,
+    'half_life': float(os.environ.get('RECOMMENDER_HOT_QUERY_HALF_LIFE', '3600')),  # seconds
+    'flush_interval': 300.0,
+}
+
+# Record title searches per visitor (ViewerProfile) for the "for you" feed
+RECOMMENDER_PROFILES_ENABLED = os.environ.get('RECOMMENDER_PROFILES_ENABLED', 'True') == 'True'
+
+# Hottest stored queries each web process replays (in the background) at
+# startup to fill its caches; 0 disables. See also: manage.py warm_hot_queries
+RECOMMENDER_WARMUP_QUERIES = int(os.environ.get('RECOMMENDER_WARMUP_QUERIES', '0'))
+
+# How often web processes reload changed MovieEnrichment rows (IMDB rating,
+# genre, runtime and plot on the cards, filled by warm_posters --details)
+RECOMMENDER_ENRICHMENT_REFRESH_SECONDS = float(os.environ.get('RECOMMENDER_ENRICHMENT_REFRESH_SECONDS', '300'))
+
+# Route the search page to the async view. Enable when serving the ASGI app, e.g.
+#   uvicorn movie_recommendation.asgi:application --workers 2
+# so one process can serve many searches that are waiting on OMDB posters.
+RECOMMENDER_ASYNC_VIEWS = os.environ.get('RECOMMENDER_ASYNC_VIEWS', 'False') == 'True'
+
+# Per-stage latency histograms and cache counters, exported at /metrics
+RECOMMENDER_METRICS_ENABLED = os.environ.get('RECOMMENDER_METRICS_ENABLED', 'False') == 'True'
+
+# Opt-in cProfile of views.main on a sampled fraction of requests (or, when
+# allow_header is on, on requests sent with 'X-Profile: 1'). The newest
+# max_profiles dumps are kept in 'directory'; roll them up into a top-N
+# hot-function report with: manage.py profile_report
+RECOMMENDER_PROFILING = {
+    'enabled': os.environ.get('RECOMMENDER_PROFILING', 'False') == 'True',
+    'sample_rate': float(os.environ.get('RECOMMENDER_PROFILING_SAMPLE_RATE', '0.01')),
+    'allow_header': DEBUG or os.environ.get('RECOMMENDER_PROFILING_ALLOW_HEADER', 'False') == 'True',
+    'directory': os.environ.get('RECOMMENDER_PROFILING_DIR', os.path.join(BASE_DIR, 'profiles')),
+    'max_profiles': int(os.environ.get('RECOMMENDER_PROFILING_MAX_PROFILES', '200')),
+}
+
+# Structured (JSON lines) logs tagged with the request id
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'recommender.utils.metrics.RequestIdFilter'},
+    },
+    'formatters': {
+        'structured': {'()': 'recommender.utils.metrics.StructuredFormatter'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['request_id'],
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'recommender': {
+            'handlers': ['console'],
+            'level': os.environ.get('RECOMMENDER_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Similarity backend used by the recommendation engine:
+# 'precomputed' - load the dense N x N similarity matrix (fastest lookups, N^2 memory)
+# 'sparse'      - keep only the row-normalized sparse feature matrix and compute
+#                 cosine similarity per query (memory proportional to nonzeros)
+# 'sharded'     - like 'sparse', with the feature matrix split across worker
+#                 processes that are queried in parallel (scatter-gather)
+RECOMMENDER_SIMILARITY_BACKEND = os.environ.get('RECOMMENDER_SIMILARITY_BACKEND', 'precomputed')
+
+# Shard processes of the 'sharded' backend (unset: one per CPU)
+RECOMMENDER_SIMILARITY_SHARDS = int(os.environ.get('RECOMMENDER_SIMILARITY_SHARDS', '0')) or None
+
+# Hash the whole model artifact on every process start. Off by default: the
+# manifest, file sizes, shape and row order are always checked, and
+# 'manage.py check_model_artifacts' verifies the checksums once per deploy.
+RECOMMENDER_VERIFY_ARTIFACT_CHECKSUMS = os.environ.get('RECOMMENDER_VERIFY_ARTIFACT_CHECKSUMS', 'False') == 'True'
@@ -1,75 +1,43 @@
 import streamlit as slt
-import pickle
-import pandas as pd
-import re
-from difflib import get_close_matches
+import os
+import sys
+from pathlib import Path
 
-# Load pickled data
-movies_df = pickle.load(open('movies.pkl', 'rb'))
-similarity = pickle.load(open('similarity_list.pkl', 'rb'))
+# Share the recommendation engine with the Django app
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
 
-slt.title("Movie Recommender System")
+from recommender.utils.model_artifacts import load_movies_artifact, load_similarity_artifact
+from recommender.utils.recommender_engine import RecommendationEngine
 
-# Create normalized title column for flexible matching
-def normalize_title(s: str) -> str:
-    """Normalize title: lowercase, remove non-alphanumeric characters"""
-    s = str(s).lower()
-    s = re.sub(r"[^a-z0-9]+", "", s)  # Keep only alphanumerics
-    return s
+MODEL_DIR = Path(os.environ.get('MODEL_ARTIFACT_DIR', BASE_DIR / 'data' / 'models'))
 
-# Add normalized titles to dataframe
-movies_df['title_norm'] = movies_df['title'].apply(normalize_title)
 
-def recommend(title_query: str, k: int = 10):
+@slt.cache_resource
+def load_engine():
     """
-    Recommend k similar movies based on the input title.
-    
-    Parameters:
-    - title_query: Movie title (case-insensitive, flexible spelling)
-    - k: Number of recommendations to return (default: 10)
+    Load the model artifact and build the recommendation engine.
     
-    Returns:
-    - List of recommended movie titles
+    Cached as a resource, so it runs once per process and is shared by
+    every rerun and session instead of being reloaded on each interaction.
     """
-    # Normalize query
-    q = normalize_title(title_query)
-    
-    # Find exact match
-    matches = movies_df[movies_df['title_norm'] == q]
-    
-    if matches.empty:
-        # No exact match - suggest similar titles
-        candidates = movies_df['title_norm'].tolist()
-        close = get_close_matches(q, candidates, n=5, cutoff=0.6)
-        
-        if close:
-            suggestions = []
-            for c in close:
-                suggestions.append(movies_df.loc[movies_df['title_norm'] == c, 'title'].iloc[0])
-            return None, suggestions
-        else:
-            return None, []
-    
-    # Get movie index
-    movie_index = matches.index[0]
-    
-    # Find top-k most similar movies (excluding the input movie itself)
-    top = sorted(enumerate(similarity[movie_index]), key=lambda x: x[1], reverse=True)[1:k+1]
-    
-    recommendations = []
-    for idx, score in top:
-        recommendations.append(movies_df.iloc[idx]['title'])
-    
-    return recommendations, None
+    movies_df = load_movies_artifact(MODEL_DIR).to_pandas()
+    similarity = load_similarity_artifact(MODEL_DIR, titles=movies_df['title'])
+    return RecommendationEngine(movies_df, similarity)
+
+
+engine = load_engine()
+
+slt.title("Movie Recommender System")
 
 # Streamlit UI
 selected_movie_name = slt.selectbox(
     'Select a movie you like:',
-    movies_df['title'].values
+    engine.movies.title
 )
 
 if slt.button('Recommend'):
-    recommendations, suggestions = recommend(selected_movie_name, k=10)
+    recommendations, suggestions = engine.recommend_titles(selected_movie_name, k=10)
     
     if recommendations:
         slt.subheader(f"Movies similar to '{selected_movie_name}':")
@@ -80,4 +48,4 @@ if slt.button('Recommend'):
         for movie in suggestions:
             slt.write(f"• {movie}")
     else:
-        slt.error(f"No matches found for '{selected_movie_name}'. Try another title.")
\ No newline at end of file
+        slt.error(f"No matches found for '{selected_movie_name}'. Try another title.")
@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from .models import HotQuery, MovieEnrichment, MoviePoster, ViewerProfile
+
+
+@admin.register(MoviePoster)
+class MoviePosterAdmin(admin.ModelAdmin):
+    list_display = ('movie_id', 'title', 'year', 'poster_url', 'fetched_at')
+    search_fields = ('title',)
+
+
+@admin.register(MovieEnrichment)
+class MovieEnrichmentAdmin(admin.ModelAdmin):
+    list_display = ('movie_id', 'imdb_rating', 'genre', 'runtime', 'updated_at')
+
+
+@admin.register(HotQuery)
+class HotQueryAdmin(admin.ModelAdmin):
+    list_display = ('query', 'search_type', 'process', 'score', 'updated_at')
+    list_filter = ('search_type',)
+    search_fields = ('query',)
+    ordering = ('-score',)
+
+
+@admin.register(ViewerProfile)
+class ViewerProfileAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'searches', 'updated_at')
+    search_fields = ('owner',)
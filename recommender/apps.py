@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class RecommenderConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "recommender"
+
+    def ready(self):
+        from django.conf import settings
+        from .utils.metrics import registry
+
+        registry.enabled = getattr(settings, 'RECOMMENDER_METRICS_ENABLED', False)
@@ -0,0 +1,43 @@
+"""
+Verify the checksums of the similarity model artifact
+
+Usage:
+    python manage.py check_model_artifacts
+    python manage.py check_model_artifacts --directory /path/to/models
+
+Hashes every file listed in manifest.json. Web processes only check the
+manifest, file sizes, shape and row order at startup, so run this once
+after converting or deploying an artifact.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.utils.data_loader import DATA_DIR
+from recommender.utils.model_artifacts import ArtifactError, verify_artifact
+
+
+class Command(BaseCommand):
+    help = "Verify the SHA-256 checksums of the model artifact files"
+    # The URL checks import the views, which would load the whole catalog
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', type=Path, default=None,
+                            help='Artifact directory (default: <RECOMMENDER_DATA_DIR>/models)')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if directory is None:
+            data_dir = getattr(settings, 'RECOMMENDER_DATA_DIR', None)
+            directory = (Path(data_dir) if data_dir else DATA_DIR) / 'models'
+        try:
+            manifest = verify_artifact(directory)
+        except ArtifactError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"{directory}: schema {manifest['schema_version']}, {manifest['row_count']} movies, "
+            f"{len(manifest['files'])} files verified"
+        )
@@ -0,0 +1,33 @@
+"""
+Roll the dumped request profiles up into a top-N hot-function report
+
+Usage:
+    python manage.py profile_report
+    python manage.py profile_report --top 50 --directory /tmp/profiles
+
+Reads the .prof files ProfilingMiddleware wrote (RECOMMENDER_PROFILING)
+and writes top_functions.txt next to them, ordered by cumulative and by
+own time.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.middleware import write_profile_report
+
+
+class Command(BaseCommand):
+    help = "Write a top-N hot-function report of the profiled requests"
+    # The URL checks import the views, which would load the whole catalog
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', help='Profile directory (default: RECOMMENDER_PROFILING directory)')
+        parser.add_argument('--top', type=int, default=30, help='Functions listed per ordering')
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or getattr(settings, 'RECOMMENDER_PROFILING', {}).get('directory', 'profiles')
+        report_path = write_profile_report(directory, options['top'])
+        if report_path is None:
+            raise CommandError(f"No profiles in {directory}")
+        self.stdout.write(f"Wrote {report_path}")
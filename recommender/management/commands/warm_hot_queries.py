@@ -0,0 +1,38 @@
+"""
+Replay the hottest recorded searches to warm the caches
+
+Usage:
+    python manage.py warm_hot_queries              # 100 hottest queries
+    python manage.py warm_hot_queries --limit 500
+    python manage.py warm_hot_queries --list       # only show them (summed over processes)
+
+Run after a deploy or model swap: posters of the hot results that are not
+in the poster store yet are fetched from OMDB and stored, so the first
+visitors get them from the database. Each web process fills its own
+in-memory caches (query resolver, card fragments) the same way at startup
+when RECOMMENDER_WARMUP_QUERIES is set.
+"""
+
+from django.core.management.base import BaseCommand
+
+from recommender.utils.hot_queries import hot_queries, warm_hot_queries
+
+
+class Command(BaseCommand):
+    help = "Run the hottest recorded searches so their posters are stored"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Number of hot queries to replay')
+        parser.add_argument('--list', action='store_true', help='Only list the hot queries')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for query, search_type in hot_queries(options['limit']):
+                self.stdout.write(f"{search_type:<9} {query}")
+            return
+
+        # Loads the catalog and the recommendation engine
+        from recommender import views
+
+        count = warm_hot_queries(views.recommender, views.card_cache, options['limit'])
+        self.stdout.write(f"Replayed {count} hot queries")
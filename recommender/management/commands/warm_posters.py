@@ -0,0 +1,121 @@
+"""
+Resolve catalog posters ahead of time into the poster store
+
+Usage:
+    python manage.py warm_posters                 # whole catalog, most popular first
+    python manage.py warm_posters --top 1000 --details   # also fill MovieEnrichment
+    python manage.py warm_posters --rate 2 --concurrency 4
+
+Movies already in the store are skipped, so an interrupted run (Ctrl-C,
+quota reached) continues where it stopped when started again. Calls go
+through the same rate limiter and circuit breaker as the web app; the run
+stops early once OMDB refuses further calls.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.models import MovieEnrichment, MoviePoster
+from recommender.utils.data_loader import DataLoader
+from recommender.utils.enrichment import enrichment_record, save_enrichment
+from recommender.utils.movie_store import MovieStore
+from recommender.utils.omdb_api import DEFAULT_OMDB_API_URL, OMDBClient
+from recommender.utils.poster_store import poster_record, save_posters
+
+
+class Command(BaseCommand):
+    help = "Fetch OMDB posters (and optionally card enrichment) for the catalog into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None,
+                            help='Only the N most popular titles (default: whole catalog)')
+        parser.add_argument('--details', action='store_true',
+                            help='Also store the card enrichment (IMDB rating, genre, runtime, plot)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel OMDB lookups')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='OMDB requests per second (default: OMDB_CLIENT rate_limit)')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Lookups saved per database write')
+        parser.add_argument('--force', action='store_true', help='Refetch movies already stored')
+
+    def handle(self, *args, **options):
+        api_key = getattr(settings, 'OMDB_API_KEY', None)
+        if not api_key:
+            raise CommandError('OMDB_API_KEY is not set')
+
+        movies = self.catalog(options['top'])
+        todo = self.pending(movies, options['details'], options['force'])
+        self.stdout.write(f"{len(todo)} of {len(movies)} titles to fetch")
+        if not todo:
+            return
+
+        config = dict(getattr(settings, 'OMDB_CLIENT', {}))
+        if options['rate']:
+            config.update(rate_limit=options['rate'], burst=options['rate'])
+        # Unlike a web request, the job waits for the rate limiter instead of skipping
+        config.update(pool_size=options['concurrency'], max_wait=float('inf'))
+        client = OMDBClient(api_key, url=getattr(settings, 'OMDB_API_URL', DEFAULT_OMDB_API_URL), **config)
+
+        totals = {'found': 0, 'no_poster': 0, 'failed': 0}
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for offset in range(0, len(todo), options['batch_size']):
+                batch = todo[offset:offset + options['batch_size']]
+                payloads = pool.map(
+                    lambda movie: client.lookup(movie[1], movie[2], details=options['details']), batch
+                )
+                records = []
+                enrichments = []
+                for (movie_id, title, year), payload in zip(batch, payloads):
+                    if payload is None:
+                        totals['failed'] += 1
+                        continue
+                    record = poster_record(movie_id, title, year, payload)
+                    totals['found' if record.poster_url else 'no_poster'] += 1
+                    records.append(record)
+                    if options['details']:
+                        enrichments.append(enrichment_record(movie_id, payload))
+                save_posters(records)
+                save_enrichment(enrichments)
+
+                done = offset + len(batch)
+                self.stdout.write(
+                    f"{done}/{len(todo)} fetched ({done / (time.monotonic() - start):.1f}/s), "
+                    f"{totals['found']} posters, {totals['no_poster']} without, {totals['failed']} failed"
+                )
+                if client.breaker.is_open():
+                    self.stderr.write(
+                        'OMDB is failing or the API quota is used up; stopping. '
+                        'Run the command again later to resume.'
+                    )
+                    break
+
+    def catalog(self, top):
+        """
+        Movies in order of popularity
+
+        Returns:
+            List of (movie_id, title, year) with the year formatted as the
+            result pages pass it to OMDB
+        """
+        loader = DataLoader(data_dir=getattr(settings, 'RECOMMENDER_DATA_DIR', None))
+        movies_data = loader.load_movies()
+        store = MovieStore.from_dataframe(movies_data)
+
+        order = np.argsort(-movies_data['popularity'].fillna(0).to_numpy(), kind='stable')
+        if top is not None:
+            order = order[:top]
+        return [(int(store.movie_id[p]), store.title[p], store.release_year(p)) for p in order]
+
+    def pending(self, movies, details, force):
+        """Movies without a stored poster (or enrichment, when it is wanted)"""
+        if force:
+            return movies
+        done = set(MoviePoster.objects.values_list('movie_id', flat=True))
+        if details:
+            done &= set(MovieEnrichment.objects.values_list('movie_id', flat=True))
+        return [movie for movie in movies if movie[0] not in done]
@@ -0,0 +1,176 @@
+"""
+Middleware for the recommender app
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.urls import Resolver404, resolve
+
+from .utils.metrics import registry, request_id_var
+
+
+logger = logging.getLogger('recommender.requests')
+
+REQUEST_METRIC = 'recommender_request_duration_seconds'
+
+# Accept caller-supplied request ids only if they are short and log-safe
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdMiddleware:
+    """
+    Tag each request with an id for structured logs and time the whole request
+
+    The id is taken from the X-Request-ID header when it is well formed,
+    otherwise generated, and echoed back in the response header. Works in
+    both the WSGI and the ASGI handler, so async views are not adapted to
+    a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token, start = self._start(request)
+        try:
+            return self._finish(request, self.get_response(request), start)
+        finally:
+            request_id_var.reset(token)
+
+    async def __acall__(self, request):
+        token, start = self._start(request)
+        try:
+            return self._finish(request, await self.get_response(request), start)
+        finally:
+            request_id_var.reset(token)
+
+    def _start(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        return request_id_var.set(request_id), time.perf_counter()
+
+    def _finish(self, request, response, start):
+        response['X-Request-ID'] = request.request_id
+        if registry.enabled:
+            duration = time.perf_counter() - start
+            registry.observe(REQUEST_METRIC, duration, method=request.method, status=response.status_code)
+            logger.info(
+                'request finished',
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round(duration * 1000, 2),
+                },
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in cProfile of the recommendation view on a sample of requests
+
+    Configured by the RECOMMENDER_PROFILING setting. A request is profiled
+    when it is sampled (``sample_rate``) or, if ``allow_header`` is on, when
+    it carries an ``X-Profile: 1`` header. The profiler wraps the rest of
+    the request handling rather than the view alone, so every middleware's
+    process_view (CSRF included) still runs for profiled requests. Each
+    profile is dumped as a .prof file in ``directory``; only the newest
+    ``max_profiles`` are kept. ``manage.py profile_report`` rolls them up
+    into a top-N hot-function report.
+    """
+
+    def __init__(self, get_response):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+
+        config = getattr(settings, 'RECOMMENDER_PROFILING', {})
+        if not config.get('enabled'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = float(config.get('sample_rate', 0.0))
+        self.allow_header = bool(config.get('allow_header', False))
+        self.directory = Path(config.get('directory', 'profiles'))
+        self.max_profiles = int(config.get('max_profiles', 200))
+        self.view_names = set(config.get('views', ['main']))
+        self._rotate_lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+
+        request_id = getattr(request, 'request_id', None) or uuid.uuid4().hex
+        profile_path = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{request_id}.prof"
+        profiler.dump_stats(profile_path)
+        self._rotate()
+        logger.info('request profiled', extra={'profile': str(profile_path)})
+        return response
+
+    def _should_profile(self, request):
+        try:
+            view_func = resolve(request.path_info).func
+        except Resolver404:
+            return False
+        if view_func.__name__ not in self.view_names or iscoroutinefunction(view_func):
+            # runcall would only profile the creation of the coroutine
+            return False
+        if self.allow_header and request.headers.get('X-Profile') == '1':
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _rotate(self):
+        # Dump names start with a timestamp: oldest first
+        with self._rotate_lock:
+            paths = sorted(self.directory.glob('*.prof'))
+            for path in paths[:max(len(paths) - self.max_profiles, 0)]:
+                path.unlink(missing_ok=True)
+
+
+def write_profile_report(directory, top_n: int = 30, report_name: str = 'top_functions.txt'):
+    """
+    Roll every dumped profile up into one top-N report
+
+    Args:
+        directory: Directory of the .prof dumps
+        top_n: Functions listed per ordering
+        report_name: File written in the directory
+
+    Returns:
+        Path of the report, or None when there is no profile
+    """
+    directory = Path(directory)
+    paths = sorted(str(p) for p in directory.glob('*.prof'))
+    if not paths:
+        return None
+    stream = io.StringIO()
+    stats = pstats.Stats(*paths, stream=stream)
+    stream.write(f"{len(paths)} profiled requests\n\n")
+    stats.sort_stats('cumulative').print_stats(top_n)
+    stats.sort_stats('tottime').print_stats(top_n)
+    report_path = directory / report_name
+    report_path.write_text(stream.getvalue())
+    return report_path
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoviePoster',
+            fields=[
+                ('movie_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('year', models.CharField(blank=True, max_length=8)),
+                ('poster_url', models.URLField(blank=True, max_length=500)),
+                ('details', models.JSONField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_details(apps, schema_editor):
+    """Move the details stored on MoviePoster into MovieEnrichment rows"""
+    MoviePoster = apps.get_model('recommender', 'MoviePoster')
+    MovieEnrichment = apps.get_model('recommender', 'MovieEnrichment')
+
+    def field(details, key):
+        value = details.get(key) or ''
+        return '' if value == 'N/A' else value
+
+    records = []
+    for poster in MoviePoster.objects.exclude(details=None).iterator():
+        details = poster.details
+        try:
+            imdb_rating = float(details.get('imdb_rating'))
+        except (TypeError, ValueError):
+            imdb_rating = None
+        records.append(MovieEnrichment(
+            movie_id=poster.movie_id,
+            imdb_rating=imdb_rating,
+            genre=field(details, 'genre'),
+            runtime=field(details, 'runtime'),
+            plot=field(details, 'plot'),
+            updated_at=poster.fetched_at,
+        ))
+    MovieEnrichment.objects.bulk_create(records, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieEnrichment',
+            fields=[
+                ('movie_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('imdb_rating', models.FloatField(blank=True, null=True)),
+                ('genre', models.CharField(blank=True, max_length=255)),
+                ('runtime', models.CharField(blank=True, max_length=32)),
+                ('plot', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(copy_details, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='movieposter',
+            name='details',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0002_movieenrichment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('search_type', models.CharField(max_length=16)),
+                ('key', models.CharField(max_length=255)),
+                ('query', models.CharField(max_length=255)),
+                ('score', models.FloatField(db_index=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('search_type', 'key'), name='unique_hot_query')],
+            },
+        ),
+    ]
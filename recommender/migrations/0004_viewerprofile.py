@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0003_hotquery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewerProfile',
+            fields=[
+                ('owner', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('seen_ids', models.BinaryField(default=b'')),
+                ('neighbor_ids', models.BinaryField(default=b'')),
+                ('neighbor_scores', models.BinaryField(default=b'')),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
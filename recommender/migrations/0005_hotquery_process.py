@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0004_viewerprofile'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='hotquery',
+            name='unique_hot_query',
+        ),
+        migrations.AddField(
+            model_name='hotquery',
+            name='process',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='hotquery',
+            constraint=models.UniqueConstraint(fields=('process', 'search_type', 'key'), name='unique_hot_query_per_process'),
+        ),
+    ]
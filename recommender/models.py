@@ -0,0 +1,93 @@
+from django.db import models
+from django.utils import timezone
+
+
+class MoviePoster(models.Model):
+    """
+    OMDB poster of a catalog movie, keyed by its TMDB id
+
+    Filled ahead of time by the warm_posters command and by live lookups,
+    so result pages can take posters from the database instead of OMDB.
+    """
+
+    movie_id = models.IntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    year = models.CharField(max_length=8, blank=True)
+    # Empty when OMDB knows the movie but has no poster for it
+    poster_url = models.URLField(max_length=500, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.title} ({self.year})" if self.year else self.title
+
+
+class MovieEnrichment(models.Model):
+    """
+    OMDB details shown on the result cards, keyed by TMDB id
+
+    Filled by ``warm_posters --details``; empty fields mean OMDB has no
+    value (a row with all fields empty: OMDB does not know the movie).
+    """
+
+    movie_id = models.IntegerField(primary_key=True)
+    imdb_rating = models.FloatField(null=True, blank=True)
+    genre = models.CharField(max_length=255, blank=True)
+    runtime = models.CharField(max_length=32, blank=True)
+    plot = models.TextField(blank=True)
+    # Web processes reload the rows changed since their last refresh
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return str(self.movie_id)
+
+
+class HotQuery(models.Model):
+    """
+    Popular search query, as last reported by one web process's query tracker
+
+    ``score`` is that process's time-decayed search count. Every process
+    keeps its own rows, so flushes never overwrite each other; a query's
+    popularity is the sum over processes (see hot_queries()), which the
+    warm_hot_queries command and web process startup replay.
+    """
+
+    # 'hostname:pid' of the reporting process
+    process = models.CharField(max_length=64, default='')
+    search_type = models.CharField(max_length=16)
+    # Normalized query, as the query resolver memoizes it
+    key = models.CharField(max_length=255)
+    query = models.CharField(max_length=255)
+    score = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['process', 'search_type', 'key'], name='unique_hot_query_per_process'),
+        ]
+
+    def __str__(self):
+        return f"{self.query} ({self.search_type})"
+
+
+class ViewerProfile(models.Model):
+    """
+    Search history and taste profile of a visitor (session or user)
+
+    The profile is a sparse vector of aggregated neighbour scores: every
+    searched movie adds its nearest neighbours, rank-weighted, to the
+    decayed earlier scores. Arrays are stored as raw little-endian bytes
+    (int32 TMDB ids, float32 scores), so a "for you" feed is one top-k over
+    them.
+    """
+
+    # 'user:<id>' or 'session:<session key>'
+    owner = models.CharField(max_length=64, primary_key=True)
+    # TMDB ids of the searched movies, oldest first
+    seen_ids = models.BinaryField(default=b'')
+    neighbor_ids = models.BinaryField(default=b'')
+    neighbor_scores = models.BinaryField(default=b'')
+    searches = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.owner
@@ -0,0 +1,39 @@
+"""
+Test runner that serves the app from a synthetic catalog
+
+The views load the catalog when they are imported (by the URL system
+checks or by a test), so the real data/ directory would have to be
+present to run the suite. This runner writes a small synthetic catalog
+(benchmarks.synthetic_catalog) to a temporary directory and points
+RECOMMENDER_DATA_DIR at it for the whole run. The synthetic titles are
+not on OMDB, so the OMDB key is unset as well and no test calls out.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+# Titles of the catalog the tests run against
+TEST_CATALOG_SIZE = 300
+
+
+class SyntheticCatalogRunner(DiscoverRunner):
+    """DiscoverRunner with RECOMMENDER_DATA_DIR set to a generated catalog"""
+
+    def setup_test_environment(self, **kwargs):
+        from benchmarks.synthetic_catalog import generate_catalog
+
+        super().setup_test_environment(**kwargs)
+        self.catalog_dir = Path(tempfile.mkdtemp(prefix='recommender-test-'))
+        self.catalog = generate_catalog(self.catalog_dir, TEST_CATALOG_SIZE, seed=0, dense=True)
+        self.data_dir, self.omdb_api_key = settings.RECOMMENDER_DATA_DIR, settings.OMDB_API_KEY
+        settings.RECOMMENDER_DATA_DIR = str(self.catalog_dir)
+        settings.OMDB_API_KEY = None
+
+    def teardown_test_environment(self, **kwargs):
+        settings.RECOMMENDER_DATA_DIR, settings.OMDB_API_KEY = self.data_dir, self.omdb_api_key
+        shutil.rmtree(self.catalog_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
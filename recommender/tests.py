@@ -0,0 +1,1174 @@
+"""
+Tests for the recommender app
+
+Run with:
+    python manage.py test recommender
+
+The test runner (recommender.test_runner) serves the app from a small
+synthetic catalog, so no data/ directory is needed.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .middleware import write_profile_report
+from .utils.data_loader import DataLoader, get_data_loader
+from .utils.metrics import LATENCY_BUCKETS, MetricsRegistry, StructuredFormatter, registry, request_id_var
+from .utils.model_artifacts import (
+    ArtifactError,
+    load_artifact_ids,
+    load_similarity_artifact,
+    save_model_artifacts,
+    verify_artifact,
+)
+from .utils.movie_store import MovieStore
+from .utils.omdb_api import CircuitBreaker, OMDBClient, TokenBucket, get_default_poster
+from .utils.poster_store import fetch_posters
+from .utils.profiles import merge_neighbors, profile_arrays, profile_owner, record_search
+from .utils.query_resolver import ACTOR, DIRECTOR, MOVIE, SUGGESTION, TEXT, QueryResolver
+from .utils.similarity import PrecomputedSimilarity, SparseCosineSimilarity, build_count_matrix, top_k_indices
+from .utils.text_processing import normalize_title
+from .utils.text_search import BM25Index, tokenize
+
+
+class BenchmarkTests(SimpleTestCase):
+
+    def test_run_benchmarks_on_a_tiny_catalog(self):
+        from benchmarks.run_benchmarks import run_size
+
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_size(200, 3, workdir)
+        self.assertEqual(results['backend'], 'precomputed')
+        self.assertGreater(results['load_seconds'], 0)
+        for path in ('title', 'actor', 'director', 'suggestion'):
+            self.assertEqual(results['view'][path]['count'], 3)
+            self.assertEqual(results['engine'][path]['count'], 3)
+
+    def test_compare_ignores_noise_and_flags_regressions(self):
+        from benchmarks.run_benchmarks import compare
+
+        baseline = {'sizes': {'5000': {'load_seconds': 1.0, 'engine': {'title': {'p50_ms': 0.01, 'count': 50}}}}}
+        current = {'sizes': {'5000': {'load_seconds': 1.5, 'engine': {'title': {'p50_ms': 0.04, 'count': 50}}}}}
+        # The 4x p50 change is below the 0.05 ms noise floor; counts are not timings
+        self.assertEqual(compare(current, baseline, 0.2), [('5000.load_seconds', 1.0, 1.5, 1.5)])
+        self.assertEqual(compare(baseline, baseline, 0.2), [])
+
+
+class EvaluateBackendsTests(SimpleTestCase):
+
+    def test_rank_biased_overlap(self):
+        from benchmarks.evaluate_backends import rank_biased_overlap
+
+        self.assertAlmostEqual(rank_biased_overlap([1, 2, 3, 4], [1, 2, 3, 4]), 1.0)
+        self.assertEqual(rank_biased_overlap([1, 2, 3, 4], [5, 6, 7, 8]), 0.0)
+        # Order differences near the top cost more than near the bottom
+        self.assertLess(rank_biased_overlap([1, 2, 3, 4], [2, 1, 3, 4]),
+                        rank_biased_overlap([1, 2, 3, 4], [1, 2, 4, 3]))
+
+    def test_evaluation_on_a_tiny_catalog(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            output = Path(workdir) / 'evaluation.json'
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.evaluate_backends', '--size', '80', '--k', '5',
+                 '--prune-n', '10', '--svd-dims', '8', '--latency-queries', '5', '--workers', '1',
+                 '--output', str(output)],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            )
+            report = json.loads(output.read_text())
+
+        self.assertEqual(report['movies'], 80)
+        self.assertEqual(set(report['backends']), {'exact', 'float16', 'pruned', 'svd', 'sparse'})
+        self.assertEqual(report['backends']['exact']['quality']['5'], {'recall': 1.0, 'rbo': 1.0})
+        for result in report['backends'].values():
+            self.assertGreater(result['memory_mb'], 0)
+            self.assertLessEqual(result['quality']['5']['recall'], 1.0)
+
+
+class TopKIndicesTests(SimpleTestCase):
+
+    def test_orders_by_descending_score(self):
+        scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+        self.assertEqual(top_k_indices(scores, 3).tolist(), [1, 3, 2])
+
+    def test_excludes_the_query_position(self):
+        scores = np.array([1.0, 0.9, 0.5, 0.7])
+        self.assertEqual(top_k_indices(scores, 2, exclude=0).tolist(), [1, 3])
+
+    def test_breaks_ties_at_the_cutoff_by_position(self):
+        scores = np.array([0.2, 0.5, 0.5, 0.9, 0.5, 0.5, 0.1])
+        self.assertEqual(top_k_indices(scores, 3).tolist(), [3, 1, 2])
+        self.assertEqual(top_k_indices(scores, 4, exclude=1).tolist(), [3, 2, 4, 5])
+
+    def test_matches_a_full_sort(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            n = int(rng.integers(1, 40))
+            scores = rng.integers(0, 4, n).astype(np.float32)
+            k = int(rng.integers(0, n + 2))
+            expected = np.lexsort((np.arange(n), -scores))[:k]
+            self.assertEqual(top_k_indices(scores, k).tolist(), expected.tolist())
+
+    def test_caps_k_at_the_available_positions(self):
+        self.assertEqual(top_k_indices(np.array([0.3, 0.6]), 5, exclude=0).tolist(), [1])
+        self.assertEqual(len(top_k_indices(np.array([0.3]), 0)), 0)
+
+
+class SparseCosineSimilarityTests(SimpleTestCase):
+
+    def setUp(self):
+        token_lists = [
+            ['space', 'alien', 'director'] + ['nolan'] * 3,
+            ['space', 'alien', 'ship'],
+            ['romance', 'paris'],
+            ['space', 'nolan'],
+            [],
+        ]
+        self.features, self.vocabulary = build_count_matrix(token_lists)
+
+    def test_repeated_tokens_become_counts(self):
+        self.assertEqual(self.features.shape, (5, len(self.vocabulary)))
+        self.assertEqual(self.features[0, self.vocabulary.index('nolan')], 3)
+
+    def test_matches_the_dense_cosine_matrix(self):
+        counts = self.features.toarray()
+        norms = np.linalg.norm(counts, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        dense = PrecomputedSimilarity((counts / norms) @ (counts / norms).T)
+        sparse_index = SparseCosineSimilarity(self.features)
+
+        for index in range(len(dense)):
+            np.testing.assert_allclose(sparse_index.scores(index), dense.scores(index), atol=1e-6)
+            self.assertEqual(sparse_index.top_k(index, 3).tolist(), dense.top_k(index, 3).tolist())
+
+    def test_movie_without_features_scores_zero(self):
+        self.assertFalse(SparseCosineSimilarity(self.features).scores(4).any())
+
+
+class MovieStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.store = MovieStore.from_dataframe(pd.DataFrame({
+            'id': [19995, 285, 206647],
+            'title': ['Avatar', "Pirates of the Caribbean: At World's End", 'Spectre'],
+            'director': ['James Cameron', None, 'Sam Mendes'],
+            'cast_list': [['Sam Worthington', 'Zoe Saldana'], ['Johnny Depp'], None],
+            'release_date': ['2009-12-10', None, '2015-10-26'],
+            'vote_average': [7.2, 6.9, 'n/a'],
+            'overview': ['x' * 400, None, 'A cryptic message'],
+        }))
+
+    def test_columns(self):
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.director(0), 'James Cameron')
+        self.assertEqual(self.store.director(1), 'N/A')
+        self.assertEqual(self.store.cast(0), ['Sam Worthington', 'Zoe Saldana'])
+        self.assertEqual(self.store.cast(0, limit=1), ['Sam Worthington'])
+        self.assertEqual(self.store.cast(2), [])
+        self.assertEqual([self.store.release_year(p) for p in range(3)], ['2009', 'N/A', '2015'])
+        self.assertTrue(np.isnan(self.store.vote_average[2]))
+        self.assertLessEqual(len(self.store.overview[0]), 153)
+
+    def test_title_lookups(self):
+        self.assertEqual(self.store.title_positions['Spectre'], 2)
+        self.assertEqual(self.store.title_norm_positions['piratesofthecaribbeanatworldsend'], 1)
+
+    def test_positions_of_ids(self):
+        self.assertEqual(self.store.positions_of([206647, 1, 19995]).tolist(), [2, -1, 0])
+
+    def test_only_a_title_column_is_required(self):
+        store = MovieStore.from_dataframe(pd.DataFrame({'title': ['Heat', 'Heat']}))
+        self.assertEqual(store.movie_id.tolist(), [0, 1])
+        self.assertEqual(store.title_positions['Heat'], 0)
+        self.assertEqual(store.director(1), 'N/A')
+
+    def test_loader_keeps_only_the_store(self):
+        loader = get_data_loader()
+        self.assertIsNone(loader.get_movies_data())
+        self.assertIsNone(loader.credits_data)
+        store = loader.get_movie_store()
+        self.assertEqual(len(store), len(loader.get_titles_list()))
+        self.assertEqual(list(store.title), loader.get_titles_list())
+
+
+class CatalogTestCase(SimpleTestCase):
+    """Copies a small generated catalog per test, so tests can edit its files"""
+
+    n_movies = 20
+
+    @classmethod
+    def setUpClass(cls):
+        from benchmarks.synthetic_catalog import generate_catalog
+
+        super().setUpClass()
+        cls.catalog_dir = Path(tempfile.mkdtemp())
+        generate_catalog(cls.catalog_dir, cls.n_movies, seed=1, dense=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.catalog_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.data_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.data_dir, True)
+        shutil.copytree(self.catalog_dir, self.data_dir, dirs_exist_ok=True)
+        self.movies_path = self.data_dir / 'datasets' / 'tmdb_5000_movies.csv'
+        self.movies = pd.read_csv(self.movies_path)
+
+    def write_movies(self, movies):
+        movies.to_csv(self.movies_path, index=False)
+
+    def load(self, **kwargs):
+        loader = DataLoader(data_dir=self.data_dir, **kwargs)
+        loader.load_all()
+        return loader
+
+
+class AlignToArtifactTests(CatalogTestCase):
+
+    def test_rows_follow_the_artifact_order(self):
+        self.write_movies(self.movies.sample(frac=1, random_state=0))
+        loader = self.load()
+        artifact_ids = load_artifact_ids(self.data_dir / 'models')
+        self.assertEqual(loader.get_movie_store().movie_id.tolist(), artifact_ids.tolist())
+        self.assertEqual(loader.get_titles_list(), self.movies['title'].tolist())
+
+    def test_dataset_movies_without_a_matrix_row_are_dropped(self):
+        extra = self.movies.iloc[[0]].assign(id=9999, title='Not In The Model')
+        self.write_movies(pd.concat([extra, self.movies]))
+        with self.assertLogs('recommender.utils.data_loader', 'WARNING') as logs:
+            loader = self.load()
+        self.assertIn('Dropping 1 dataset movies', logs.output[0])
+        self.assertEqual(len(loader.get_movie_store()), self.n_movies)
+        self.assertNotIn('Not In The Model', loader.get_titles_list())
+
+    def test_artifact_movies_missing_from_the_dataset_raise(self):
+        self.write_movies(self.movies.iloc[1:])
+        with self.assertRaisesMessage(ArtifactError, '1 artifact movies are not in the dataset'):
+            self.load()
+
+    def test_duplicate_dataset_ids_are_dropped(self):
+        self.write_movies(pd.concat([self.movies, self.movies.iloc[[3]]]))
+        with self.assertLogs('recommender.utils.data_loader', 'WARNING') as logs:
+            loader = self.load()
+        self.assertIn('Dropping 1 duplicate ids from the movies dataset', logs.output[0])
+        self.assertEqual(len(loader.get_movie_store()), self.n_movies)
+
+
+class ModelArtifactTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.movies = pd.DataFrame({'id': [3, 1, 2], 'title': ['C', 'A', 'B']})
+        self.matrix = np.arange(9, dtype=np.float64).reshape(3, 3)
+        save_model_artifacts(self.directory, self.movies, self.matrix)
+
+    def test_round_trip(self):
+        matrix = load_similarity_artifact(self.directory, titles=['C', 'A', 'B'], ids=[3, 1, 2])
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_array_equal(matrix, self.matrix)
+        self.assertEqual(load_artifact_ids(self.directory).tolist(), [3, 1, 2])
+
+    def test_row_order_is_checked(self):
+        with self.assertRaises(ArtifactError):
+            load_similarity_artifact(self.directory, ids=[1, 2, 3])
+        with self.assertRaises(ArtifactError):
+            load_similarity_artifact(self.directory, titles=['A', 'B', 'C'])
+
+    def test_shape_must_match_the_movies(self):
+        with self.assertRaises(ArtifactError):
+            save_model_artifacts(self.directory, self.movies.iloc[:2], self.matrix)
+
+    def test_truncated_file_is_caught_on_load(self):
+        path = self.directory / 'similarity.npy'
+        path.write_bytes(path.read_bytes()[:-4])
+        with self.assertRaisesMessage(ArtifactError, 'Size mismatch'):
+            load_similarity_artifact(self.directory)
+
+    def test_checksums_are_verified_on_demand(self):
+        path = self.directory / 'similarity.npy'
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+        # Same size: only hashing notices
+        load_similarity_artifact(self.directory)
+        with self.assertRaisesMessage(ArtifactError, 'Checksum mismatch'):
+            verify_artifact(self.directory)
+        with self.assertRaisesMessage(ArtifactError, 'Checksum mismatch'):
+            load_similarity_artifact(self.directory, verify_checksum=True)
+
+    def test_unsupported_schema_is_refused(self):
+        manifest_path = self.directory / 'manifest.json'
+        manifest = json.loads(manifest_path.read_text())
+        manifest['schema_version'] = 99
+        manifest_path.write_text(json.dumps(manifest))
+        with self.assertRaisesMessage(ArtifactError, 'Unsupported artifact schema version'):
+            load_similarity_artifact(self.directory)
+
+
+class ConvertModelArtifactsTests(CatalogTestCase):
+    """scripts/convert_model_artifacts.py on a legacy-shaped pickle"""
+
+    def setUp(self):
+        super().setUp()
+        credits_path = self.data_dir / 'datasets' / 'tmdb_5000_credits.csv'
+        credits = pd.read_csv(credits_path)
+        # Two movies share a title, so the notebook's title merge repeats both,
+        # and one has no overview, so its dropna removes it
+        for frame in (self.movies, credits):
+            frame.loc[[4, 5], 'title'] = 'The Host'
+        self.movies.loc[8, 'overview'] = None
+        self.write_movies(self.movies)
+        credits.to_csv(credits_path, index=False)
+
+        # The training notebook's row order
+        merged = self.movies.merge(credits, on='title')
+        self.legacy = merged[['id', 'movie_id', 'title', 'overview']].dropna().reset_index(drop=True)
+        self.assertEqual(len(self.legacy), self.n_movies + 1)
+        rng = np.random.default_rng(0)
+        self.legacy_matrix = rng.random((len(self.legacy), len(self.legacy)))
+        self.write_pickle('similarity_list.pkl', self.legacy_matrix)
+
+    def write_pickle(self, name, value):
+        path = self.data_dir / 'models' / name
+        with open(path, 'wb') as f:
+            pickle.dump(value, f)
+        return path
+
+    def convert(self, *args):
+        return subprocess.run(
+            [sys.executable, 'scripts/convert_model_artifacts.py', '--data-dir', str(self.data_dir), *args],
+            cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True,
+        )
+
+    def assert_serves_legacy_rows(self, legacy_rows):
+        with self.assertLogs('recommender.utils.data_loader', 'WARNING') as logs:
+            loader = self.load()
+        self.assertIn('Dropping 1 dataset movies', logs.output[0])
+        ids = loader.get_movie_store().movie_id
+        self.assertEqual(ids.tolist(), self.legacy['id'][legacy_rows].tolist())
+        self.assertEqual(len(np.unique(ids)), len(ids))
+        np.testing.assert_allclose(
+            loader.get_similarity_matrix(), self.legacy_matrix[np.ix_(legacy_rows, legacy_rows)], rtol=1e-6
+        )
+
+    def test_rows_rebuilt_from_the_csvs(self):
+        completed = self.convert()
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn('2 repeated movie rows dropped', completed.stdout)
+        # For the shared title, the rows whose credits belong to the movie
+        matched = self.legacy['id'] == self.legacy['movie_id']
+        rows = [row for row in range(len(self.legacy))
+                if matched[row] or (self.legacy['id'] == self.legacy['id'][row]).sum() == 1]
+        self.assert_serves_legacy_rows(rows)
+
+    def test_rows_from_the_movies_pickle(self):
+        pickle_path = self.write_pickle('movies.pkl', self.legacy[['id', 'title']])
+        completed = self.convert('--movies-pickle', str(pickle_path))
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        rows = np.flatnonzero(~self.legacy['id'].duplicated()).tolist()
+        self.assert_serves_legacy_rows(rows)
+
+    def test_matrix_of_another_catalog_is_refused(self):
+        self.write_pickle('similarity_list.pkl', np.eye(self.n_movies))
+        completed = self.convert()
+        self.assertNotEqual(completed.returncode, 0)
+        self.assertIn('does not match', completed.stderr)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+
+    def test_disabled_registry_records_nothing(self):
+        metrics = MetricsRegistry(enabled=False)
+        with metrics.timer('stage_seconds', stage='load'):
+            pass
+        metrics.inc('hits_total')
+        self.assertEqual(metrics.render_prometheus(), '\n')
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = MetricsRegistry(enabled=True)
+        for value in (0.0002, 0.003, 0.003, 20.0):
+            metrics.observe('stage_seconds', value, stage='render')
+        lines = metrics.render_prometheus().splitlines()
+        self.assertEqual(lines[0], '# TYPE stage_seconds histogram')
+        self.assertIn('stage_seconds_bucket{stage="render",le="0.0005"} 1', lines)
+        self.assertIn('stage_seconds_bucket{stage="render",le="0.005"} 3', lines)
+        self.assertIn(f'stage_seconds_bucket{{stage="render",le="{LATENCY_BUCKETS[-1]}"}} 3', lines)
+        self.assertIn('stage_seconds_bucket{stage="render",le="+Inf"} 4', lines)
+        self.assertIn('stage_seconds_count{stage="render"} 4', lines)
+
+    def test_counters_and_label_escaping(self):
+        metrics = MetricsRegistry(enabled=True)
+        metrics.inc('cache_total', cache='query', result='hit')
+        metrics.inc('cache_total', 2, cache='query', result='hit')
+        metrics.inc('cache_total', cache='say "hi"', result='miss')
+        text = metrics.render_prometheus()
+        self.assertIn('cache_total{cache="query",result="hit"} 3', text)
+        self.assertIn('cache_total{cache="say \\"hi\\"",result="miss"} 1', text)
+
+    def test_structured_log_lines(self):
+        token = request_id_var.set('abc123')
+        self.addCleanup(request_id_var.reset, token)
+        record = logging.makeLogRecord({'name': 'recommender', 'levelname': 'INFO', 'msg': 'done %s',
+                                        'args': ('now',), 'duration_ms': 1.5})
+        entry = json.loads(StructuredFormatter().format(record))
+        self.assertEqual(entry['message'], 'done now')
+        self.assertEqual(entry['request_id'], 'abc123')
+        self.assertEqual(entry['duration_ms'], 1.5)
+
+
+class MetricsEndpointTests(TestCase):
+
+    def test_disabled_endpoint_is_not_found(self):
+        with mock.patch.object(registry, 'enabled', False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    def test_requests_are_timed_and_exported(self):
+        self.addCleanup(registry.reset)
+        with mock.patch.object(registry, 'enabled', True):
+            self.client.get('/api/search', {'q': get_data_loader().get_titles_list()[0]})
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('recommender_request_duration_seconds_count{method="GET",status="200"} 1', text)
+        self.assertIn('recommender_stage_duration_seconds_count{stage="similarity_topk"} 1', text)
+
+    def test_request_ids_are_echoed_or_generated(self):
+        response = self.client.get('/metrics', headers={'X-Request-ID': 'req-42'})
+        self.assertEqual(response['X-Request-ID'], 'req-42')
+        response = self.client.get('/metrics', headers={'X-Request-ID': 'bad id\n'})
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        config = {'enabled': True, 'sample_rate': 0.0, 'allow_header': True,
+                  'directory': str(self.directory), 'max_profiles': 2}
+        settings_override = override_settings(RECOMMENDER_PROFILING=config)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # A fresh client builds its middleware chain with the settings above
+        self.client = Client()
+
+    def profiles(self):
+        return sorted(self.directory.glob('*.prof'))
+
+    def test_only_requests_asking_for_it_are_profiled(self):
+        self.client.get('/')
+        self.assertEqual(self.profiles(), [])
+        response = self.client.get('/', headers={'X-Profile': '1', 'X-Request-ID': 'profiled-1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.profiles()), 1)
+        self.assertTrue(self.profiles()[0].name.endswith('-profiled-1.prof'))
+
+    def test_other_views_are_not_profiled(self):
+        self.client.get('/browse', headers={'X-Profile': '1'})
+        self.assertEqual(self.profiles(), [])
+
+    def test_profiled_requests_still_check_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post('/', {'movie_name': 'x'}, headers={'X-Profile': '1'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_only_the_newest_profiles_are_kept(self):
+        # Dump names start with a one-second timestamp: make each request a new second
+        stamps = iter(f"20260101-00000{i}" for i in range(4))
+        strftime = time.strftime
+
+        def stamp(fmt, *args):
+            return next(stamps) if fmt == '%Y%m%d-%H%M%S' else strftime(fmt, *args)
+
+        with mock.patch('recommender.middleware.time.strftime', stamp):
+            for i in range(4):
+                self.client.get('/', headers={'X-Profile': '1', 'X-Request-ID': f"r{i}"})
+        self.assertEqual([p.name for p in self.profiles()], ['20260101-000002-r2.prof', '20260101-000003-r3.prof'])
+
+    def test_report(self):
+        self.assertIsNone(write_profile_report(self.directory))
+        self.client.get('/', headers={'X-Profile': '1'})
+        stdout = io.StringIO()
+        call_command('profile_report', directory=str(self.directory), top=5, stdout=stdout)
+        report = (self.directory / 'top_functions.txt').read_text()
+        self.assertIn('Wrote', stdout.getvalue())
+        self.assertTrue(report.startswith('1 profiled requests'))
+        self.assertIn('cumulative', report)
+
+
+class LoadTestTests(SimpleTestCase):
+
+    def test_scenarios_start_cold_on_their_own_database(self):
+        project_db = Path(settings.BASE_DIR) / 'db.sqlite3'
+        before = project_db.read_bytes() if project_db.exists() else None
+        with tempfile.TemporaryDirectory() as workdir:
+            output = Path(workdir) / 'loadtest.json'
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.loadtest', '--size', '60', '--requests', '10',
+                 '--workers', '1', '2', '--latency-ms', '0', '--jitter-ms', '0', '--output', str(output),
+                 '--scenario', 'first:OMDB_RATE_LIMIT=1000', '--scenario', 'second:OMDB_RATE_LIMIT=1000'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            )
+            report = json.loads(output.read_text())
+
+        runs = [scenario['runs'] for scenario in report['scenarios']]
+        for run in sum(runs, []):
+            self.assertEqual(run['errors'], 0)
+        # The second scenario and the second run of each find no stored poster either
+        self.assertGreater(runs[0][0]['omdb_calls'], 0)
+        self.assertEqual(runs[1][0]['omdb_calls'], runs[0][0]['omdb_calls'])
+        self.assertGreaterEqual(runs[0][1]['omdb_calls'], runs[0][0]['omdb_calls'])
+        if before is not None:
+            self.assertEqual(project_db.read_bytes(), before)
+
+
+class AsyncViewTests(TransactionTestCase):
+
+    def test_search_page(self):
+        from . import views
+
+        title = get_data_loader().get_titles_list()[0]
+        request = RequestFactory().post('/', {'movie_name': title, 'search_type': 'movie'})
+        response = asyncio.run(views.main_async(request))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f"Movies similar to {title}")
+
+    def test_pool_threads_close_their_connections(self):
+        from . import views
+
+        calls = []
+
+        def search():
+            calls.append(('search', threading.get_ident()))
+            raise ValueError
+
+        def close_old_connections():
+            calls.append(('close', threading.get_ident()))
+
+        with mock.patch('recommender.views.close_old_connections', close_old_connections):
+            with self.assertRaises(ValueError):
+                asyncio.run(views._in_thread_pool(search)())
+        # Closed on the worker thread that used them, even when the call fails
+        self.assertEqual([name for name, _ in calls], ['search', 'close'])
+        self.assertEqual(calls[0][1], calls[1][1])
+        self.assertNotEqual(calls[0][1], threading.get_ident())
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('recommender.utils.omdb_api.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertTrue(self.breaker.is_open())
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_probe_success_closes(self):
+        self.breaker.trip(30.0)
+        self.clock.now += 31
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        # Only one probe at a time
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_probe_failure_reopens(self):
+        self.breaker.trip(30.0)
+        self.clock.now += 31
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_released_probe_goes_to_the_next_call(self):
+        self.breaker.trip(30.0)
+        self.clock.now += 31
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_success_of_an_older_call_does_not_close_an_open_breaker(self):
+        self.breaker.trip(30.0)
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('recommender.utils.omdb_api.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=2.0, burst=3)
+        self.assertEqual([bucket.acquire() for _ in range(4)], [True, True, True, False])
+        self.clock.now += 0.5
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire())
+
+    def test_reserve_returns_the_wait_for_a_future_token(self):
+        bucket = TokenBucket(rate=2.0, burst=1)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertIsNone(bucket.reserve(max_wait=0.1))
+        self.assertAlmostEqual(bucket.reserve(max_wait=1.0), 0.5)
+
+
+class OMDBClientGuardTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('recommender.utils.omdb_api.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = OMDBClient('key', url='http://127.0.0.1:9/', rate_limit=1.0, burst=2,
+                                 max_wait=0.0, failure_threshold=1, reset_timeout=30.0)
+
+    def test_refused_calls_do_not_use_rate_limit_tokens(self):
+        self.client.breaker.trip(30.0)
+        tokens = self.client.bucket.tokens
+        for _ in range(5):
+            self.assertIsNone(self.client._admit('poster'))
+        self.assertEqual(self.client.bucket.tokens, tokens)
+
+    def test_rate_limited_probe_is_released(self):
+        self.client.breaker.trip(30.0)
+        self.clock.now += 31
+        self.client.bucket.tokens = 0
+        self.client.bucket.updated = self.clock.now
+        self.assertIsNone(self.client._admit('poster'))
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+        self.assertTrue(self.client.breaker.allow())
+
+    def test_cancelled_probe_does_not_stay_half_open(self):
+        self.client.breaker.trip(30.0)
+        self.clock.now += 31
+
+        async def cancel_probe():
+            async def hang(*args, **kwargs):
+                await asyncio.sleep(10)
+
+            http_client, _ = self.client._loop_state()
+            http_client.get = hang
+            task = asyncio.ensure_future(self.client._request_async('poster', {'t': 'Heat', 'type': 'movie'}))
+            await asyncio.sleep(0)
+            self.assertEqual(self.client.breaker.state, CircuitBreaker.HALF_OPEN)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now += 31
+        self.assertFalse(self.client.breaker.is_open())
+
+
+class OMDBResponseTests(TestCase):
+
+    def setUp(self):
+        self.client = OMDBClient('key', url='http://127.0.0.1:9/', rate_limit=1.0, burst=2, max_wait=0.0)
+        self.card = {'movie_id': 19995, 'title': 'Avatar', 'release_year': 2009}
+
+    def respond(self, status_code, payload=None):
+        response = mock.Mock(status_code=status_code)
+        response.json.return_value = payload or {}
+        self.client.session.get = mock.Mock(return_value=response)
+
+    def test_not_found_is_stored_as_no_poster(self):
+        from .models import MoviePoster
+
+        self.respond(200, {'Response': 'False', 'Error': 'Movie not found!'})
+        self.assertEqual(self.client.lookup('Avatar', 2009), {})
+        self.assertEqual(self.client.breaker.failures, 0)
+        with mock.patch('recommender.utils.poster_store.get_omdb_client', return_value=self.client):
+            fetch_posters([self.card])
+        self.assertEqual(MoviePoster.objects.get(movie_id=19995).poster_url, '')
+
+    def test_rate_limited_answer_backs_off_and_is_not_stored(self):
+        from .models import MoviePoster
+
+        self.respond(429)
+        with mock.patch('recommender.utils.poster_store.get_omdb_client', return_value=self.client):
+            fetch_posters([self.card])
+        self.assertEqual(self.card['poster_url'], get_default_poster())
+        self.assertFalse(MoviePoster.objects.exists())
+        self.assertEqual(self.client.breaker.failures, 1)
+        # The burst token left over is gone: the next call waits for the limiter
+        self.assertIsNone(self.client._admit('poster'))
+
+    def test_forbidden_answer_is_not_stored(self):
+        from .models import MoviePoster
+
+        self.respond(403)
+        self.assertIsNone(self.client.lookup('Avatar', 2009))
+        self.assertEqual(self.client.breaker.failures, 1)
+        with mock.patch('recommender.utils.poster_store.get_omdb_client', return_value=self.client):
+            fetch_posters([self.card])
+        self.assertFalse(MoviePoster.objects.exists())
+
+
+class PosterStoreTests(TestCase):
+
+    def test_stored_posters_are_attached(self):
+        from .models import MoviePoster
+        from .utils.poster_store import attach_stored_posters
+
+        MoviePoster.objects.create(movie_id=1, title='Heat', poster_url='https://posters.example/heat.jpg')
+        MoviePoster.objects.create(movie_id=2, title='Ronin', poster_url='')
+        cards = [{'movie_id': 1}, {'movie_id': 2}, {'movie_id': 3}]
+        missing = attach_stored_posters(cards)
+        self.assertEqual(missing, [{'movie_id': 3}])
+        self.assertEqual(cards[0]['poster_url'], 'https://posters.example/heat.jpg')
+        # Stored 'no poster' answers get the placeholder without asking OMDB
+        self.assertEqual(cards[1]['poster_url'], get_default_poster())
+
+    @override_settings(OMDB_API_KEY='key')
+    def test_warm_posters_stores_answers_and_resumes(self):
+        from .management.commands.warm_posters import Command
+        from .models import MoviePoster
+
+        movies = Command().catalog(3)
+        found, no_poster = movies[0][0], movies[1][0]
+        payloads = {
+            movies[0][1]: {'Response': 'True', 'Poster': 'https://posters.example/1.jpg'},
+            movies[1][1]: {},
+            movies[2][1]: None,
+        }
+        lookup = mock.Mock(side_effect=lambda title, year, details=False: payloads[title])
+        with mock.patch.object(OMDBClient, 'lookup', lookup):
+            call_command('warm_posters', top=3, stdout=io.StringIO())
+            self.assertEqual(
+                dict(MoviePoster.objects.values_list('movie_id', 'poster_url')),
+                {found: 'https://posters.example/1.jpg', no_poster: ''},
+            )
+            # A second run only retries the movie without an answer
+            lookup.reset_mock()
+            call_command('warm_posters', top=3, stdout=io.StringIO())
+        self.assertEqual([c.args[0] for c in lookup.call_args_list], [movies[2][1]])
+
+
+class EnrichmentTests(TestCase):
+
+    def test_record_from_payload(self):
+        from .utils.enrichment import enrichment_record
+
+        record = enrichment_record(1, {'imdbRating': '7.8', 'Genre': 'Crime', 'Runtime': 'N/A', 'Plot': 'Cops.'})
+        self.assertEqual((record.imdb_rating, record.genre, record.runtime, record.plot),
+                         (7.8, 'Crime', '', 'Cops.'))
+        # OMDB does not know the movie: an empty row
+        record = enrichment_record(2, {})
+        self.assertEqual((record.imdb_rating, record.genre, record.plot), (None, '', ''))
+
+    def test_cache_loads_then_picks_up_changed_rows(self):
+        from .utils.enrichment import EMPTY_ENRICHMENT, EnrichmentCache, enrichment_record, save_enrichment
+
+        save_enrichment([enrichment_record(1, {'imdbRating': '7.8', 'Genre': 'Crime'})])
+        cache = EnrichmentCache(refresh_interval=3600)
+        cards = [{'movie_id': 1}, {'movie_id': 2}]
+        # The first use loads the table before returning
+        cache.attach(cards)
+        self.assertEqual((cards[0]['imdb_rating'], cards[0]['genre']), ('7.8/10', 'Crime'))
+        self.assertEqual({k: cards[1][k] for k in EMPTY_ENRICHMENT}, EMPTY_ENRICHMENT)
+
+        save_enrichment([enrichment_record(2, {'Runtime': '106 min'})])
+        with self.assertNumQueries(1):
+            cache.refresh()
+        cards = [{'movie_id': 1}, {'movie_id': 2}]
+        cache.attach(cards)
+        self.assertEqual(cards[0]['genre'], 'Crime')
+        self.assertEqual(cards[1]['runtime'], '106 min')
+
+
+class BM25IndexTests(SimpleTestCase):
+
+    @staticmethod
+    def exhaustive_scores(index, terms):
+        scores = np.zeros(len(index), dtype=np.float64)
+        for term in terms:
+            term_id = index.vocabulary.get(term)
+            if term_id is not None:
+                docs, impacts = index._postings(term_id)
+                scores[docs] += impacts
+        return scores
+
+    def test_pruned_search_matches_exhaustive_scoring(self):
+        rng = np.random.default_rng(1)
+        # Zipf-like vocabulary: a few very common terms, a long tail of rare ones
+        vocabulary = [f"term{i}" for i in range(300)]
+        weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+        weights /= weights.sum()
+        documents = [list(rng.choice(vocabulary, size=int(rng.integers(3, 40)), p=weights)) for _ in range(2000)]
+        index = BM25Index(documents)
+
+        for _ in range(50):
+            terms = list(rng.choice(vocabulary, size=int(rng.integers(1, 6)), p=weights))
+            exhaustive = self.exhaustive_scores(index, terms)
+            results = index.search(terms, k=10)
+
+            expected = np.sort(exhaustive[exhaustive > 0])[::-1][:10]
+            np.testing.assert_allclose([score for _, score in results], expected, rtol=1e-5)
+            for position, score in results:
+                self.assertAlmostEqual(exhaustive[position], score, places=4)
+
+    def test_query_text_is_tokenized(self):
+        index = BM25Index([tokenize("A heist in the city"), tokenize("A quiet village")])
+        self.assertEqual([position for position, _ in index.search("the HEIST")], [0])
+        self.assertEqual(index.search("the of and"), [])
+
+    def test_ties_at_the_cutoff_go_by_position(self):
+        index = BM25Index([['heist', 'heist', 'city']] + [['heist', 'city']] * 1000)
+        results = index.search(['heist'], k=5)
+        self.assertEqual([position for position, _ in results], [0, 1, 2, 3, 4])
+
+
+def small_catalog():
+    """MovieStore and person indexes of a four-movie catalog"""
+    movies = pd.DataFrame({
+        'id': [11, 12, 13, 14],
+        'title': ['Heat', 'The Insider', 'Inception', 'Interstellar'],
+        'director': ['Michael Mann', 'Michael Mann', 'Christopher Nolan', 'Christopher Nolan'],
+        'cast_list': [['Al Pacino', 'Robert De Niro'], ['Al Pacino'], ['Leonardo DiCaprio'], ['Matthew McConaughey']],
+        'release_date': ['1995-12-15', '1999-11-05', '2010-07-16', '2014-11-05'],
+        'vote_average': [7.9, 7.4, 8.3, 8.4],
+        'overview': ['A bank heist', 'A tobacco whistleblower', 'A heist in dreams', 'Space travel'],
+    })
+    actors, directors = {}, {}
+    for position, row in movies.iterrows():
+        directors.setdefault(row['director'], []).append(position)
+        for actor in row['cast_list']:
+            actors.setdefault(actor, []).append(position)
+    text_index = BM25Index(tokenize(overview) for overview in movies['overview'])
+    return MovieStore.from_dataframe(movies), actors, directors, text_index
+
+
+class QueryResolverTests(SimpleTestCase):
+
+    def setUp(self):
+        store, actors, directors, text_index = small_catalog()
+        self.resolver = QueryResolver(store, actors, directors, text_index, cache_size=10)
+
+    def test_exact_title(self):
+        resolution = self.resolver.resolve('the insider')
+        self.assertEqual((resolution.kind, resolution.positions), (MOVIE, (1,)))
+
+    def test_exact_person_names(self):
+        self.assertEqual(self.resolver.resolve('Al Pacino'), (ACTOR, (0, 1), ()))
+        self.assertEqual(self.resolver.resolve('christopher nolan'), (DIRECTOR, (2, 3), ()))
+
+    def test_partial_person_name(self):
+        self.assertEqual(self.resolver.resolve('nolan'), (DIRECTOR, (2, 3), ()))
+        self.assertEqual(self.resolver.resolve('pacino', ACTOR).positions, (0, 1))
+
+    def test_explicit_search_type_skips_titles(self):
+        self.assertEqual(self.resolver.resolve('Heat', DIRECTOR), (DIRECTOR, (), ()))
+
+    def test_unknown_title_gets_suggestions(self):
+        resolution = self.resolver.resolve('Interstelar')
+        self.assertEqual(resolution.kind, SUGGESTION)
+        self.assertIn('Interstellar', resolution.suggestions)
+
+    def test_free_text(self):
+        resolution = self.resolver.resolve('heist', TEXT)
+        self.assertEqual(resolution.kind, TEXT)
+        self.assertEqual(sorted(resolution.positions), [0, 2])
+
+    def test_resolutions_are_memoized_per_normalized_query(self):
+        first = self.resolver.resolve('Inception')
+        with mock.patch.object(self.resolver, '_classify') as classify:
+            self.assertIs(self.resolver.resolve('  INCEPTION '), first)
+            classify.assert_not_called()
+
+
+class SearchViewResolutionTests(TestCase):
+
+    def test_title_search_resolves_the_query_once(self):
+        from . import views
+
+        title = get_data_loader().get_titles_list()[0]
+        # Give the visitor a session, so the search goes to their profile
+        self.client.session.save()
+        resolve = mock.Mock(wraps=views.recommender.resolver.resolve)
+        with mock.patch.object(views.recommender.resolver, 'resolve', resolve), \
+                mock.patch('recommender.views.record_search_later') as record_search_later:
+            response = self.client.post('/', {'movie_name': title, 'search_type': 'movie'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(resolve.call_count, 1)
+        owner, movie_id, neighbor_ids = record_search_later.call_args.args
+        self.assertEqual(owner, f"session:{self.client.session.session_key}")
+        position = views.recommender.movies.title_norm_positions[normalize_title(title)]
+        self.assertEqual(movie_id, views.recommender.movies.movie_id[position])
+        self.assertEqual(len(neighbor_ids), 25)
+
+
+class CardFragmentCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        from django.template.loader import get_template
+
+        self.template = get_template('recommender/_movie_card.html')
+        self.template.render = mock.Mock(wraps=self.template.render)
+        patcher = mock.patch('recommender.utils.card_cache.get_template', return_value=self.template)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def card(movie_id, **fields):
+        card = {'movie_id': movie_id, 'title': f"Movie <{movie_id}>", 'poster_url': None, 'overview': ''}
+        return dict(card, **fields)
+
+    def test_fragments_are_reused(self):
+        from .utils.card_cache import CardFragmentCache
+
+        cache = CardFragmentCache(model_version='v1')
+        first = cache.render([self.card(1), self.card(2)])
+        self.assertEqual(self.template.render.call_count, 2)
+        self.assertEqual(cache.render([self.card(1), self.card(2)]), first)
+        self.assertEqual(self.template.render.call_count, 2)
+        # Rendered with autoescaping, in card order
+        self.assertIn('Movie &lt;1&gt;', first)
+        self.assertLess(first.index('Movie &lt;1&gt;'), first.index('Movie &lt;2&gt;'))
+
+    def test_changed_cards_and_catalogs_are_rendered_again(self):
+        from .utils.card_cache import CardFragmentCache
+
+        cache = CardFragmentCache(model_version='v1')
+        cache.render([self.card(1)])
+        self.assertIn('https://posters.example/1.jpg',
+                      cache.render([self.card(1, poster_url='https://posters.example/1.jpg')]))
+        cache.render([self.card(1, genre='Crime')])
+        self.assertEqual(self.template.render.call_count, 3)
+        CardFragmentCache(model_version='v2').render([self.card(1)])
+        self.assertEqual(self.template.render.call_count, 4)
+
+    def test_least_recently_used_fragments_are_evicted(self):
+        from .utils.card_cache import CardFragmentCache
+
+        cache = CardFragmentCache(max_size=2)
+        cache.render([self.card(1), self.card(2)])
+        cache.render([self.card(1)])
+        cache.render([self.card(3)])
+        self.template.render.reset_mock()
+        cache.render([self.card(1), self.card(3)])
+        self.template.render.assert_not_called()
+        cache.render([self.card(2)])
+        self.assertEqual(self.template.render.call_count, 1)
+
+
+class HotQueryTests(TestCase):
+
+    def test_sketch_never_undercounts(self):
+        from .utils.hot_queries import CountMinSketch
+
+        sketch = CountMinSketch(width=16, depth=3)
+        counts = {f"query {i}": i % 5 + 1 for i in range(100)}
+        for key, count in counts.items():
+            sketch.add(key, count)
+        self.assertTrue(all(sketch.estimate(key) >= count for key, count in counts.items()))
+
+    def test_tracker_keeps_the_hottest_normalized_queries(self):
+        from .utils.hot_queries import QueryTracker
+
+        tracker = QueryTracker(top_k=2, flush_interval=3600)
+        for query in ['Heat', 'heat ', 'HEAT', 'Ronin', 'Ronin', 'Alien']:
+            tracker.record(query, 'movie')
+        self.assertEqual([(key, text) for _, key, text, _ in tracker.hottest()],
+                         [('heat', 'HEAT'), ('ronin', 'Ronin')])
+
+    def test_flush_truncates_long_queries(self):
+        from .models import HotQuery
+        from .utils.hot_queries import QueryTracker, hot_queries
+
+        tracker = QueryTracker(flush_interval=3600)
+        long_query = 'heat ' * 100
+        for query in [long_query, long_query + 'again', 'Ronin']:
+            tracker.record(query, 'movie')
+        tracker.record(long_query, 'movie')
+        tracker.flush()
+        # Both long queries only differ past the column size: one row, the hottest one's
+        self.assertEqual(HotQuery.objects.count(), 2)
+        self.assertTrue(all(len(row.key) <= 255 and len(row.query) <= 255 for row in HotQuery.objects.all()))
+        self.assertEqual(hot_queries(), [(long_query[:255], 'movie'), ('Ronin', 'movie')])
+
+    def test_counts_are_summed_over_processes(self):
+        from .models import HotQuery
+        from .utils.hot_queries import hot_queries
+
+        HotQuery.objects.create(process='a:1', search_type='movie', key='heat', query='Heat', score=2)
+        HotQuery.objects.create(process='b:2', search_type='movie', key='heat', query='heat', score=2)
+        HotQuery.objects.create(process='a:1', search_type='actor', key='al pacino', query='Al Pacino', score=3)
+        self.assertEqual([search_type for _, search_type in hot_queries()], ['movie', 'actor'])
+
+    def test_warming_replays_the_stored_queries(self):
+        from .models import HotQuery
+        from .utils.hot_queries import warm_hot_queries
+
+        HotQuery.objects.create(process='a:1', search_type='movie', key='heat', query='Heat', score=1)
+        engine = mock.Mock()
+        engine.get_recommendations.return_value = ([{'movie_id': 1}], None, 'movie')
+        card_cache = mock.Mock()
+        self.assertEqual(warm_hot_queries(engine, card_cache), 1)
+        engine.get_recommendations.assert_called_once_with('Heat', k=25, search_type='movie')
+        card_cache.render.assert_called_once_with([{'movie_id': 1}])
+
+
+class ProfileTests(TestCase):
+
+    def test_merge_neighbors_decays_and_sums(self):
+        ids, scores = merge_neighbors(np.array([5], dtype=np.int32), np.array([1.0], dtype=np.float32),
+                                      [7, 5], decay=0.5)
+        self.assertEqual(ids.tolist(), [5, 7])
+        # 5: 0.5 * 1.0 + 1 / log2(3); 7: 1 / log2(2)
+        np.testing.assert_allclose(scores, [0.5 + 1 / np.log2(3), 1.0], rtol=1e-6)
+
+    def test_merge_neighbors_keeps_the_best(self):
+        ids, scores = merge_neighbors(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32),
+                                      list(range(10)), size=3)
+        self.assertEqual(ids.tolist(), [0, 1, 2])
+        self.assertTrue((np.diff(scores) <= 0).all())
+
+    def test_request_without_session(self):
+        request = RequestFactory().post('/', {'movie_name': 'Heat'})
+        self.assertIsNone(profile_owner(request))
+        self.assertIsNone(profile_owner(request, create=True))
+
+    def test_session_is_only_created_when_asked(self):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        self.assertIsNone(profile_owner(request))
+        owner = profile_owner(request, create=True)
+        self.assertEqual(owner, f"session:{request.session.session_key}")
+
+    def test_record_search_accumulates(self):
+        from .models import ViewerProfile
+
+        record_search('session:abc', 11, [12, 13])
+        record_search('session:abc', 12, [13, 14])
+        profile = ViewerProfile.objects.get(owner='session:abc')
+        seen_ids, ids, scores = profile_arrays(profile)
+        self.assertEqual(profile.searches, 2)
+        self.assertEqual(seen_ids.tolist(), [11, 12])
+        self.assertEqual(ids[0], 13)
+
+    def test_feed_leaves_out_searched_movies(self):
+        from . import views
+
+        movie_ids = [int(movie_id) for movie_id in views.recommender.movies.movie_id[:6]]
+        self.client.get('/for-you')
+        owner = f"session:{self.client.session.session_key}"
+        record_search(owner, movie_ids[0], movie_ids[1:4])
+        record_search(owner, movie_ids[1], movie_ids[2:6])
+        results = self.client.get('/api/for-you').json()['results']
+        # Best summed neighbour scores first; the two searched movies never come back
+        self.assertEqual([card['movie_id'] for card in results[:4]], movie_ids[2:6])
+        self.assertFalse({movie_ids[0], movie_ids[1]} & {card['movie_id'] for card in results})
+
+
+
+class BrowseIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        from .utils.browse import BrowseIndex
+
+        self.index = BrowseIndex(
+            genres=[['Crime', 'Drama'], ['Science Fiction'], ['Crime'], ['Science Fiction', 'Drama'], []],
+            years=[1995, 2014, 1999, 1997, 0],
+            directors=['Michael Mann', 'Christopher Nolan', 'Michael Mann', 'Jonathan Nolan', 'N/A'],
+            vote_average=[7.9, 8.4, 7.4, 8.4, 2.0],
+            vote_count=[1000, 1000, 800, 10, 1],
+            popularity=[50, 90, 20, 10, 5],
+        )
+
+    def test_weighted_rating_pulls_few_votes_to_the_mean(self):
+        # 8.4 from ten votes ranks below 7.4 from 800 votes
+        self.assertEqual(self.index.order.tolist(), [1, 0, 2, 3, 4])
+
+    def test_facets_are_slices_of_the_global_order(self):
+        self.assertEqual(self.index.page(genre='crime')[0].tolist(), [0, 2])
+        self.assertEqual(self.index.page(genre='sci-fi')[0].tolist(), [1, 3])
+        self.assertEqual(self.index.page(genre='dramas', decade=1990)[0].tolist(), [0, 3])
+        positions, total = self.index.page(decade=1990, page=2, per_page=2)
+        self.assertEqual((positions.tolist(), total), ([3], 3))
+
+    def test_partial_director_names_merge_in_rank_order(self):
+        self.assertEqual(self.index.page(director='nolan')[0].tolist(), [1, 3])
+        self.assertEqual(self.index.title(director='nolan'), 'Films by directors matching "nolan"')
+        self.assertEqual(self.index.title(director='michael mann'), 'Films by Michael Mann')
+        with self.assertRaises(ValueError):
+            self.index.facet(genre='crime', director='nolan')
+
+    def test_unknown_names(self):
+        positions, total = self.index.page(genre='western')
+        self.assertEqual((len(positions), total), (0, 0))
+        self.assertEqual(self.index.suggestions(genre='crme'), ['Crime'])
+
+    def test_parse_decade(self):
+        from .utils.browse import parse_decade
+
+        self.assertEqual([parse_decade(v) for v in ('1990', '1990s', '90s', "'94", '05', 'x')],
+                         [1990, 1990, 1990, 1990, 2000, None])
+
+
+class BrowseViewTests(TestCase):
+
+    def test_api_pages_and_facet_lists(self):
+        from . import views
+
+        response = self.client.get('/api/browse', {'per_page': 10}).json()
+        self.assertEqual(response['total'], len(views.recommender.movies))
+        self.assertEqual(len(response['results']), 10)
+        self.assertIn('genres', response)
+        second = self.client.get('/api/browse', {'per_page': 10, 'page': 2}).json()['results']
+        self.assertFalse({card['movie_id'] for card in second} & {card['movie_id'] for card in response['results']})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/browse', {'decade': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/browse', {'director': 'nolan', 'genre': 'crime'}).status_code, 400)
+        response = self.client.get('/browse', {'genre': 'no such genre'})
+        self.assertContains(response, 'No movies to browse for this selection.')
@@ -1,6 +1,16 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Serve the async view when running under an ASGI server (see RECOMMENDER_ASYNC_VIEWS)
+main_view = views.main_async if getattr(settings, 'RECOMMENDER_ASYNC_VIEWS', False) else views.main
+
 urlpatterns = [
-    path('', views.main, name='main'),
+    path('', main_view, name='main'),
+    path('for-you', views.for_you, name='for_you'),
+    path('browse', views.browse, name='browse'),
+    path('api/search', views.api_search, name='api_search'),
+    path('api/for-you', views.api_for_you, name='api_for_you'),
+    path('api/browse', views.api_browse, name='api_browse'),
+    path('metrics', views.metrics, name='metrics'),
 ]
@@ -5,6 +5,8 @@ Utility modules for the recommender app
 from .data_loader import get_data_loader, DataLoader
 from .text_processing import normalize_title, find_close_matches
 from .recommender_engine import RecommendationEngine
+from .similarity import PrecomputedSimilarity, SparseCosineSimilarity
+from .sharded_similarity import ShardedSimilarity
 
 __all__ = [
     'get_data_loader',
@@ -12,4 +14,7 @@ __all__ = [
     'normalize_title',
     'find_close_matches',
     'RecommendationEngine',
+    'PrecomputedSimilarity',
+    'SparseCosineSimilarity',
+    'ShardedSimilarity',
 ]
@@ -0,0 +1,252 @@
+"""
+Browse Module
+Ranked movie lists per genre, decade and director, materialized at load time
+
+Movies are ranked once by weighted rating (the IMDB top-250 formula, which
+pulls ratings with few votes towards the catalog mean), then popularity.
+Walking that global order once and appending each movie to the lists of
+its facets gives every list already sorted, so a browse page is a slice of
+an int32 array: no per-request filtering or sorting.
+
+Names are matched like the search box matches them: genres by normalized
+name or a common alias ('sci-fi'), directors by normalized name or, like
+QueryResolver, by any part of it ('nolan'). A partial name matching
+several directors browses their films together, still in rank order.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .text_processing import find_close_matches, normalize_title
+
+GENRE = 'genre'
+DECADE = 'decade'
+DIRECTOR = 'director'
+
+# Vote count a movie needs to be ranked mostly by its own rating (quantile)
+MIN_VOTES_QUANTILE = 0.8
+
+# Normalized alias -> normalized TMDB genre name
+GENRE_ALIASES = {
+    'scifi': 'sciencefiction',
+    'sf': 'sciencefiction',
+    'animated': 'animation',
+    'cartoon': 'animation',
+    'cartoons': 'animation',
+    'comedies': 'comedy',
+    'documentaries': 'documentary',
+    'docs': 'documentary',
+    'historical': 'history',
+    'kids': 'family',
+    'musical': 'music',
+    'musicals': 'music',
+    'romantic': 'romance',
+    'suspense': 'thriller',
+    'tv': 'tvmovie',
+}
+
+
+def weighted_rating(vote_average, vote_count, min_votes):
+    """
+    Bayesian average of the ratings
+
+    Args:
+        vote_average: Array of mean ratings
+        vote_count: Array of vote counts
+        min_votes: Votes weighing as much as the catalog mean
+
+    Returns:
+        float32 array of v / (v + m) * R + m / (v + m) * C
+    """
+    vote_average = np.nan_to_num(np.asarray(vote_average, dtype=np.float64))
+    vote_count = np.nan_to_num(np.asarray(vote_count, dtype=np.float64))
+    mean = vote_average[vote_count > 0].mean() if (vote_count > 0).any() else 0.0
+    total = vote_count + min_votes
+    return ((vote_count * vote_average + min_votes * mean) / np.maximum(total, 1e-9)).astype(np.float32)
+
+
+def parse_decade(value):
+    """
+    Decade of a browse parameter ('1990', '1990s', '90s', '1994')
+
+    Returns:
+        First year of the decade, or None when the value is not a decade
+    """
+    digits = str(value).strip().lower().rstrip('s').lstrip("'")
+    if not digits.isdigit():
+        return None
+    year = int(digits)
+    if len(digits) == 2:
+        year += 1900 if year >= 20 else 2000
+    return year - year % 10
+
+
+class BrowseIndex:
+    """
+    Pre-sorted movie positions for every genre, decade, genre + decade and director
+
+    Args:
+        genres: One list of genre names per movie
+        years: Release year per movie (0 when unknown)
+        directors: Director name per movie ('N/A' when unknown)
+        vote_average: Mean rating per movie
+        vote_count: Vote count per movie
+        popularity: TMDB popularity per movie
+    """
+
+    def __init__(self, genres, years, directors, vote_average, vote_count, popularity):
+        vote_count = np.nan_to_num(np.asarray(vote_count, dtype=np.float64))
+        min_votes = float(np.quantile(vote_count, MIN_VOTES_QUANTILE)) if len(vote_count) else 0.0
+        self.score = weighted_rating(vote_average, vote_count, min_votes)
+        popularity = np.nan_to_num(np.asarray(popularity, dtype=np.float64))
+
+        # Best first: weighted rating, then popularity, then position
+        self.order = np.lexsort((np.arange(len(self.score)), -popularity, -self.score)).astype(np.int32)
+
+        years = np.asarray(years)
+        self.genre_names = {}  # normalized -> display name
+        self.director_names = {}
+        rankings = {}
+        for position in self.order.tolist():
+            decade = int(years[position]) // 10 * 10 if years[position] else None
+            facets = []
+            if decade is not None:
+                facets.append((DECADE, decade))
+            for genre in genres[position]:
+                key = normalize_title(genre)
+                self.genre_names.setdefault(key, genre)
+                facets.append((GENRE, key))
+                if decade is not None:
+                    facets.append((GENRE, key, DECADE, decade))
+            director = directors[position]
+            if director and director != 'N/A':
+                key = normalize_title(director)
+                self.director_names.setdefault(key, director)
+                facets.append((DIRECTOR, key))
+            for facet in facets:
+                rankings.setdefault(facet, []).append(position)
+
+        self.rankings = {facet: np.asarray(positions, dtype=np.int32) for facet, positions in rankings.items()}
+        # Rank of every position, to merge several rankings back into order
+        self.rank = np.empty(len(self.order), dtype=np.int32)
+        self.rank[self.order] = np.arange(len(self.order), dtype=np.int32)
+        self.decades = sorted({facet[1] for facet in self.rankings if facet[0] == DECADE})
+
+    @classmethod
+    def from_dataframe(cls, movies_data: pd.DataFrame, extract_names):
+        """
+        Build the index from the merged movies DataFrame
+
+        Args:
+            movies_data: DataFrame with genres (TMDB JSON), release_date,
+                director, vote_average, vote_count and popularity
+            extract_names: Parser of the TMDB JSON name lists
+        """
+        n_movies = len(movies_data)
+
+        def column(name, default):
+            if name in movies_data:
+                return movies_data[name]
+            return pd.Series([default] * n_movies, index=movies_data.index)
+
+        years = pd.to_datetime(column('release_date', None), errors='coerce').dt.year
+        return cls(
+            genres=[extract_names(g) for g in column('genres', '[]')],
+            years=years.fillna(0).to_numpy(dtype=np.int32),
+            directors=column('director', 'N/A').fillna('N/A').tolist(),
+            vote_average=pd.to_numeric(column('vote_average', np.nan), errors='coerce').to_numpy(),
+            vote_count=pd.to_numeric(column('vote_count', 0), errors='coerce').to_numpy(),
+            popularity=pd.to_numeric(column('popularity', 0), errors='coerce').to_numpy(),
+        )
+
+    def genre_key(self, genre) -> str:
+        """Normalized genre of a browse parameter (alias and plural aware)"""
+        key = normalize_title(genre)
+        for candidate in (key, GENRE_ALIASES.get(key), key[:-1] if key.endswith('s') else None):
+            if candidate in self.genre_names:
+                return candidate
+        return key
+
+    def director_keys(self, director) -> list:
+        """
+        Normalized names of the directors a browse parameter means
+
+        Returns:
+            [exact match], else every director whose name contains it
+        """
+        key = normalize_title(director)
+        if not key:
+            return []
+        if key in self.director_names:
+            return [key]
+        return [name for name in self.director_names if key in name]
+
+    def facet(self, genre=None, decade=None, director=None):
+        """
+        Ranking key of a browse request
+
+        Raises:
+            ValueError: For an unsupported combination (director with another facet)
+        """
+        if director:
+            if genre or decade is not None:
+                raise ValueError("Director browsing cannot be combined with genre or decade")
+            return (DIRECTOR,) + tuple(self.director_keys(director))
+        if genre and decade is not None:
+            return (GENRE, self.genre_key(genre), DECADE, decade)
+        if genre:
+            return (GENRE, self.genre_key(genre))
+        if decade is not None:
+            return (DECADE, decade)
+        return None
+
+    def ranking(self, facet):
+        """Ranked positions of a facet (several directors are merged by rank)"""
+        if facet is None:
+            return self.order
+        if facet[0] == DIRECTOR and len(facet) != 2:
+            merged = np.concatenate([self.order[:0]] + [self.rankings[(DIRECTOR, key)] for key in facet[1:]])
+            return merged[np.argsort(self.rank[merged], kind='stable')]
+        return self.rankings.get(facet, self.order[:0])
+
+    def page(self, genre=None, decade=None, director=None, page: int = 1, per_page: int = 25):
+        """
+        One page of a ranked list
+
+        Args:
+            genre: Genre name or alias (any case/spacing)
+            decade: First year of a decade (see parse_decade)
+            director: Director name, or part of it (any case/spacing)
+            page: 1-based page number
+            per_page: Movies per page
+
+        Returns:
+            Tuple of (positions of the page, total movies in the list);
+            without any facet, the whole catalog ranking
+        """
+        ranking = self.ranking(self.facet(genre, decade, director))
+        start = (max(page, 1) - 1) * per_page
+        return ranking[start:start + per_page], len(ranking)
+
+    def suggestions(self, genre=None, director=None, n: int = 5) -> list:
+        """Display names of the genres or directors closest to an unmatched name"""
+        if director:
+            names = self.director_names
+            key = normalize_title(director)
+        elif genre:
+            names = self.genre_names
+            key = normalize_title(genre)
+        else:
+            return []
+        return [names[match] for match in find_close_matches(key, list(names), n=n, cutoff=0.6)]
+
+    def title(self, genre=None, decade=None, director=None) -> str:
+        """Page heading, e.g. 'Best Science Fiction of the 1990s'"""
+        if director:
+            keys = self.director_keys(director)
+            if len(keys) == 1:
+                return f"Films by {self.director_names[keys[0]]}"
+            return f'Films by directors matching "{director}"'
+        subject = self.genre_names.get(self.genre_key(genre), genre) if genre else 'movies'
+        suffix = f" of the {decade}s" if decade is not None else ''
+        return f"Best {subject}{suffix}"
@@ -0,0 +1,84 @@
+"""
+Card Cache Module
+Pre-rendered HTML of the result cards, cached per movie
+
+A card only changes when the catalog is reloaded (model version), when the
+movie's poster is found, or when its OMDB enrichment is refreshed. The
+cache key holds exactly those, so a stale fragment is never served, and a
+result page becomes a string join of cached fragments; only cards not seen
+before go through the template engine.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .enrichment import ENRICHMENT_FIELDS
+from .metrics import record_cache, timed
+
+CARD_TEMPLATE = 'recommender/_movie_card.html'
+CARD_CACHE = 'card_fragments'
+
+
+def card_version(card) -> tuple:
+    """The parts of a card that change without a catalog reload"""
+    return (card.get('poster_url'),) + tuple(card.get(field) for field in ENRICHMENT_FIELDS)
+
+
+class CardFragmentCache:
+    """
+    Bounded LRU of rendered card fragments
+
+    Args:
+        model_version: Version of the loaded catalog (DataLoader.data_version())
+        max_size: Fragments kept
+        template_name: Card template
+    """
+
+    def __init__(self, model_version: str = '', max_size: int = 5000, template_name: str = CARD_TEMPLATE):
+        self.model_version = model_version
+        self.max_size = max_size
+        self.template_name = template_name
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, cards):
+        """
+        HTML of the cards, in order
+
+        Args:
+            cards: List of card dictionaries with 'movie_id'
+
+        Returns:
+            Safe string of the concatenated fragments
+        """
+        keys = [(card['movie_id'], self.model_version, card_version(card)) for card in cards]
+        with self._lock:
+            fragments = [self._fragments.get(key) for key in keys]
+            for key, fragment in zip(keys, fragments):
+                if fragment is not None:
+                    self._fragments.move_to_end(key)
+
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+        for fragment in fragments:
+            record_cache(CARD_CACHE, fragment is not None)
+        if missing:
+            template = get_template(self.template_name)
+            with timed('render_cards'):
+                for i in missing:
+                    fragments[i] = template.render({'movie': cards[i]})
+            with self._lock:
+                for i in missing:
+                    self._fragments[keys[i]] = fragments[i]
+                while len(self._fragments) > self.max_size:
+                    self._fragments.popitem(last=False)
+
+        # Each fragment was rendered with autoescaping
+        return mark_safe(''.join(fragments))
+
+    def clear(self):
+        """Forget every rendered fragment"""
+        with self._lock:
+            self._fragments.clear()
@@ -3,57 +3,184 @@ Data Loader Module
 Handles loading of datasets and pre-trained models
 """
 
+import hashlib
+import logging
+
+import numpy as np
 import pandas as pd
-import pickle
 import json
 from pathlib import Path
 
+from .browse import BrowseIndex
+from .metrics import timed
+from .model_artifacts import ArtifactError, load_artifact_ids, load_similarity_artifact
+from .movie_store import MovieStore
+from .text_search import BM25Index, tokenize
+from .similarity import (
+    PRECOMPUTED_BACKEND,
+    SPARSE_BACKEND,
+    SHARDED_BACKEND,
+    SIMILARITY_BACKENDS,
+    SparseCosineSimilarity,
+    build_count_matrix,
+)
+
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = BASE_DIR / 'data'
 DATASETS_DIR = DATA_DIR / 'datasets'
 MODELS_DIR = DATA_DIR / 'models'
 
+logger = logging.getLogger(__name__)
+
 
 class DataLoader:
     """Centralized data loading class"""
     
-    def __init__(self):
+    def __init__(self, similarity_backend=PRECOMPUTED_BACKEND, data_dir=None, shards=None,
+                 verify_checksums=False):
+        if similarity_backend not in SIMILARITY_BACKENDS:
+            raise ValueError(
+                f"Unknown similarity backend {similarity_backend!r}; "
+                f"expected one of {', '.join(SIMILARITY_BACKENDS)}"
+            )
+        self.similarity_backend = similarity_backend
+        self.shards = shards  # Shard processes of the sharded backend (None: one per CPU)
+        self.verify_checksums = verify_checksums  # Hash the artifact files on load
+        data_dir = Path(data_dir) if data_dir else DATA_DIR
+        self.datasets_dir = data_dir / 'datasets'
+        self.models_dir = data_dir / 'models'
         self.movies_data = None
         self.credits_data = None
         self.similarity_matrix = None
         self.titles_list = None
-        self.actor_to_movies = {}  # Actor name -> list of movies
-        self.director_to_movies = {}  # Director name -> list of movies
+        self.actor_to_movies = {}  # Actor name -> list of movie positions
+        self.director_to_movies = {}  # Director name -> list of movie positions
+        self.text_index = None  # BM25 index over overview, keywords and tagline
+        self.browse_index = None  # Ranked lists per genre, decade and director
+        self.movie_store = None  # Compact serving columns (replaces movies_data after load_all)
         
     def load_all(self):
         """Load all required data"""
-        self.load_movies()
-        self.load_credits()
-        self.merge_data()
-        self.load_similarity_matrix()
-        self.create_titles_list()
-        self.create_actor_director_indexes()
+        with timed('load_movies'):
+            self.load_movies()
+        with timed('load_credits'):
+            self.load_credits()
+        with timed('merge_data'):
+            self.merge_data()
+        with timed('load_similarity'):
+            if self.similarity_backend in (SPARSE_BACKEND, SHARDED_BACKEND):
+                self.build_sparse_similarity()
+            else:
+                self.align_to_artifact()
+                self.load_similarity_matrix()
+        with timed('build_indexes'):
+            self.create_titles_list()
+            self.create_actor_director_indexes()
+        with timed('build_text_index'):
+            self.build_text_index()
+        with timed('build_browse_index'):
+            self.build_browse_index()
+        self.build_movie_store()
         
     def load_movies(self):
         """Load TMDB movies dataset"""
-        movies_path = DATASETS_DIR / 'tmdb_5000_movies.csv'
+        movies_path = self.datasets_dir / 'tmdb_5000_movies.csv'
         self.movies_data = pd.read_csv(movies_path)
         return self.movies_data
     
     def load_credits(self):
         """Load TMDB credits dataset"""
-        credits_path = DATASETS_DIR / 'tmdb_5000_credits.csv'
+        credits_path = self.datasets_dir / 'tmdb_5000_credits.csv'
         self.credits_data = pd.read_csv(credits_path)
         return self.credits_data
     
     def load_similarity_matrix(self):
-        """Load pre-computed similarity matrix"""
-        similarity_path = MODELS_DIR / 'similarity_list.pkl'
-        with open(similarity_path, 'rb') as f:
-            self.similarity_matrix = pickle.load(f)
+        """Memory-map the pre-computed similarity matrix, checking it lines up with the movies"""
+        ids = titles = None
+        if self.movies_data is not None:
+            titles = self.movies_data['title']
+            ids = self.movies_data['id'] if 'id' in self.movies_data else None
+        self.similarity_matrix = load_similarity_artifact(
+            self.models_dir, titles=titles, ids=ids, verify_checksum=self.verify_checksums
+        )
         return self.similarity_matrix
     
+    def align_to_artifact(self):
+        """
+        Put the movie rows in the order of the similarity matrix rows
+        
+        The artifact's movie ids define the canonical positions: after this,
+        position i of the metadata is row i of the matrix for every lookup.
+        Dataset movies the artifact has no row for are dropped with a warning.
+        
+        Raises:
+            ArtifactError: If artifact movies are missing from the dataset
+        """
+        artifact_ids = load_artifact_ids(self.models_dir, verify_checksum=self.verify_checksums)
+        if artifact_ids is None:
+            # Legacy artifact without ids: only the title order can be checked
+            return self.movies_data
+        
+        dataset_ids = pd.Index(self.movies_data['id'])
+        positions = dataset_ids.get_indexer(artifact_ids)
+        missing = int((positions < 0).sum())
+        if missing:
+            raise ArtifactError(
+                f"Dataset and similarity artifact disagree: {missing} artifact movies are not "
+                f"in the dataset; re-export the model after changing the dataset"
+            )
+        dropped = len(dataset_ids) - len(np.unique(positions))
+        if dropped:
+            logger.warning("Dropping %d dataset movies that have no similarity matrix row", dropped)
+        repeated = len(artifact_ids) - len(np.unique(artifact_ids))
+        if repeated:
+            # Exported from the old title-keyed merge: keep its repeated rows so
+            # every matrix row still has its movie
+            logger.warning("Similarity artifact repeats %d movie ids; re-export it to drop them", repeated)
+        self.movies_data = self.movies_data.iloc[positions].reset_index(drop=True)
+        return self.movies_data
+    
+    def build_sparse_similarity(self):
+        """Build the on-the-fly cosine backend (in process or sharded) from the merged movie metadata"""
+        feature_matrix, _ = build_count_matrix(self.create_feature_tokens())
+        if self.similarity_backend == SHARDED_BACKEND:
+            from .sharded_similarity import ShardedSimilarity
+
+            self.similarity_matrix = ShardedSimilarity(feature_matrix, n_shards=self.shards)
+        else:
+            self.similarity_matrix = SparseCosineSimilarity(feature_matrix)
+        return self.similarity_matrix
+    
+    def create_feature_tokens(self):
+        """Create the keyword/cast/director/genre token soup for each movie"""
+        def squash(name):
+            return str(name).lower().replace(' ', '')
+        
+        keywords = self.movies_data['keywords'].apply(self.extract_names)
+        genres = self.movies_data['genres'].apply(self.extract_names)
+        
+        token_lists = []
+        for movie_keywords, movie_genres, cast_list, director in zip(
+            keywords, genres, self.movies_data['cast_list'], self.movies_data['director']
+        ):
+            tokens = [squash(name) for name in movie_keywords]
+            tokens += [squash(name) for name in cast_list[:3]]
+            tokens += [squash(name) for name in movie_genres]
+            # Director is weighted like the top-3 cast, as in the training notebook
+            if director and director != 'N/A':
+                tokens += [squash(director)] * 3
+            token_lists.append(tokens)
+        return token_lists
+    
+    @staticmethod
+    def extract_names(json_str):
+        """Extract the 'name' fields from a TMDB JSON list (genres, keywords, ...)"""
+        try:
+            return [item['name'] for item in json.loads(json_str)]
+        except:
+            return []
+    
     @staticmethod
     def extract_director(crew_json):
         """Extract director name from crew JSON string"""
@@ -76,20 +203,22 @@ class DataLoader:
             return []
     
     def merge_data(self):
-        """Merge movies with credits to get director information"""
+        """Merge movies with credits (on the TMDB id) to get director information"""
+        # One row per TMDB id, so row positions are stable
+        self.movies_data = self._drop_duplicate_ids(self.movies_data, 'id', 'movies')
+        
         if self.credits_data is not None:
+            self.credits_data = self._drop_duplicate_ids(self.credits_data, 'movie_id', 'credits')
+            
             # Add director column
             self.credits_data['director'] = self.credits_data['crew'].apply(self.extract_director)
             
             # Add cast column (list of actors)
             self.credits_data['cast_list'] = self.credits_data['cast'].apply(self.extract_cast)
             
-            # Merge movies with credits
-            self.movies_data = self.movies_data.merge(
-                self.credits_data[['title', 'director', 'cast_list']], 
-                on='title', 
-                how='left'
-            )
+            # Merge movies with credits; titles are not unique, ids are
+            credits = self.credits_data[['movie_id', 'director', 'cast_list']].rename(columns={'movie_id': 'id'})
+            self.movies_data = self.movies_data.merge(credits, on='id', how='left', validate='one_to_one')
             
             # Fill missing directors
             self.movies_data['director'] = self.movies_data['director'].fillna('N/A')
@@ -98,6 +227,52 @@ class DataLoader:
                 lambda x: x if isinstance(x, list) else []
             )
     
+    @staticmethod
+    def _drop_duplicate_ids(frame, id_column, name):
+        """Keep the first row of every id"""
+        duplicated = frame[id_column].duplicated()
+        if duplicated.any():
+            logger.warning("Dropping %d duplicate ids from the %s dataset", int(duplicated.sum()), name)
+            frame = frame[~duplicated].reset_index(drop=True)
+        return frame
+    
+    def build_movie_store(self):
+        """
+        Pack the served columns into a MovieStore and drop the DataFrames
+        
+        Call last: the indexes are built from movies_data, which is None
+        afterwards, so only the compact store stays in memory.
+        """
+        if self.movies_data is not None:
+            self.movie_store = MovieStore.from_dataframe(self.movies_data)
+        self.movies_data = None
+        self.credits_data = None
+        return self.movie_store
+    
+    def build_text_index(self):
+        """Build the free-text (BM25) index over each movie's overview, keywords and tagline"""
+        if self.movies_data is None:
+            return None
+        
+        empty = pd.Series('', index=self.movies_data.index)
+        documents = [
+            tokenize(overview) + tokenize(' '.join(self.extract_names(keywords))) + tokenize(tagline)
+            for overview, keywords, tagline in zip(
+                self.movies_data.get('overview', empty),
+                self.movies_data.get('keywords', empty),
+                self.movies_data.get('tagline', empty),
+            )
+        ]
+        self.text_index = BM25Index(documents)
+        return self.text_index
+    
+    def build_browse_index(self):
+        """Materialize the ranked browse lists (needs genres, vote_count and popularity)"""
+        if self.movies_data is None:
+            return None
+        self.browse_index = BrowseIndex.from_dataframe(self.movies_data, self.extract_names)
+        return self.browse_index
+    
     def create_titles_list(self):
         """Create list of movie titles"""
         if self.movies_data is not None:
@@ -109,70 +284,64 @@ class DataLoader:
         if self.movies_data is None:
             return
         
-        # Build actor index
-        for idx, row in self.movies_data.iterrows():
-            title = row['title']
-            
+        directors = self.movies_data.get('director', pd.Series('N/A', index=self.movies_data.index))
+        cast_lists = self.movies_data.get('cast_list', pd.Series([[]] * len(self.movies_data)))
+        
+        # Index by position: titles are not unique, positions are
+        for position, (director, cast_list) in enumerate(zip(directors, cast_lists)):
             # Index by director
-            director = row.get('director', 'N/A')
             if director and director != 'N/A':
-                if director not in self.director_to_movies:
-                    self.director_to_movies[director] = []
-                self.director_to_movies[director].append(title)
+                self.director_to_movies.setdefault(director, []).append(position)
             
             # Index by actors
-            cast_list = row.get('cast_list', [])
             if isinstance(cast_list, list):
                 for actor in cast_list:
                     if actor:
-                        if actor not in self.actor_to_movies:
-                            self.actor_to_movies[actor] = []
-                        self.actor_to_movies[actor].append(title)
+                        self.actor_to_movies.setdefault(actor, []).append(position)
     
     def find_movies_by_actor(self, actor_name):
-        """Find all movies featuring a specific actor"""
-        # Case-insensitive partial match
-        actor_lower = actor_name.lower()
-        matching_movies = []
-        
-        for actor, movies in self.actor_to_movies.items():
-            if actor_lower in actor.lower():
-                matching_movies.extend(movies)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        result = []
-        for movie in matching_movies:
-            if movie not in seen:
-                seen.add(movie)
-                result.append(movie)
-        
-        return result
+        """Find the titles of all movies featuring a specific actor"""
+        return self._find_movies(self.actor_to_movies, actor_name)
     
     def find_movies_by_director(self, director_name):
-        """Find all movies by a specific director"""
+        """Find the titles of all movies by a specific director"""
+        return self._find_movies(self.director_to_movies, director_name)
+    
+    def _find_movies(self, person_to_movies, name):
+        """Titles of the movies of every person whose name contains ``name``"""
         # Case-insensitive partial match
-        director_lower = director_name.lower()
-        matching_movies = []
+        name_lower = name.lower()
+        positions = {}
         
-        for director, movies in self.director_to_movies.items():
-            if director_lower in director.lower():
-                matching_movies.extend(movies)
+        for person, person_positions in person_to_movies.items():
+            if name_lower in person.lower():
+                # dict keeps the first occurrence, preserving order
+                positions.update(dict.fromkeys(person_positions))
         
-        # Remove duplicates while preserving order
-        seen = set()
-        result = []
-        for movie in matching_movies:
-            if movie not in seen:
-                seen.add(movie)
-                result.append(movie)
+        titles = self.titles_list
+        return [titles[position] for position in positions]
+    
+    def data_version(self) -> str:
+        """
+        Short fingerprint of the datasets and model artifact on disk
         
-        return result
+        Changes whenever a file is replaced, so caches of derived output
+        (e.g. rendered cards) can key on it.
+        """
+        digest = hashlib.sha256()
+        for path in sorted(self.datasets_dir.glob('*.csv')) + sorted(self.models_dir.glob('manifest.json')):
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()[:12]
     
     def get_movies_data(self):
-        """Get movies dataframe"""
+        """Get movies dataframe (None once build_movie_store has run)"""
         return self.movies_data
     
+    def get_movie_store(self):
+        """Get the compact movie store"""
+        return self.movie_store
+    
     def get_similarity_matrix(self):
         """Get similarity matrix"""
         return self.similarity_matrix
@@ -189,6 +358,14 @@ def get_data_loader():
     """Get or create singleton data loader instance"""
     global _data_loader
     if _data_loader is None:
-        _data_loader = DataLoader()
+        from django.conf import settings
+        
+        backend = getattr(settings, 'RECOMMENDER_SIMILARITY_BACKEND', PRECOMPUTED_BACKEND)
+        data_dir = getattr(settings, 'RECOMMENDER_DATA_DIR', None)
+        shards = getattr(settings, 'RECOMMENDER_SIMILARITY_SHARDS', None)
+        verify = getattr(settings, 'RECOMMENDER_VERIFY_ARTIFACT_CHECKSUMS', False)
+        _data_loader = DataLoader(
+            similarity_backend=backend, data_dir=data_dir, shards=shards, verify_checksums=verify
+        )
         _data_loader.load_all()
     return _data_loader
@@ -0,0 +1,185 @@
+"""
+Enrichment Module
+OMDB details (IMDB rating, genre, runtime, plot) joined into the result cards
+
+The MovieEnrichment table is filled by ``warm_posters --details``. Each web
+process keeps an in-memory copy of it and reloads only the rows changed
+since its last refresh, on a background thread, so adding the fields to a
+card costs a dictionary lookup and no database or OMDB call.
+"""
+
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_FIELDS = ('imdb_rating', 'genre', 'runtime', 'plot')
+
+# Card values for movies without enrichment
+EMPTY_ENRICHMENT = dict.fromkeys(ENRICHMENT_FIELDS, '')
+
+
+def _omdb_value(payload, key):
+    value = payload.get(key) or ''
+    return '' if value == 'N/A' else value
+
+
+def enrichment_record(movie_id, payload):
+    """
+    MovieEnrichment row for a definite OMDB details answer
+
+    Args:
+        movie_id: TMDB movie id
+        payload: OMDB payload of a details lookup ({} when OMDB has no such movie)
+
+    Returns:
+        Unsaved MovieEnrichment instance
+    """
+    from ..models import MovieEnrichment
+
+    try:
+        imdb_rating = float(payload.get('imdbRating'))
+    except (TypeError, ValueError):
+        imdb_rating = None
+    return MovieEnrichment(
+        movie_id=movie_id,
+        imdb_rating=imdb_rating,
+        genre=_omdb_value(payload, 'Genre')[:255],
+        runtime=_omdb_value(payload, 'Runtime')[:32],
+        plot=_omdb_value(payload, 'Plot'),
+        updated_at=timezone.now(),
+    )
+
+
+def save_enrichment(records):
+    """
+    Insert or update MovieEnrichment rows in one statement
+
+    Args:
+        records: List of unsaved MovieEnrichment instances
+    """
+    from ..models import MovieEnrichment
+
+    if not records:
+        return
+    MovieEnrichment.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=['movie_id'],
+        update_fields=['imdb_rating', 'genre', 'runtime', 'plot', 'updated_at'],
+    )
+
+
+def _card_fields(imdb_rating, genre, runtime, plot):
+    return {
+        'imdb_rating': f"{imdb_rating:.1f}/10" if imdb_rating is not None else '',
+        'genre': genre,
+        'runtime': runtime,
+        'plot': plot,
+    }
+
+
+class EnrichmentCache:
+    """
+    In-memory copy of the MovieEnrichment table
+
+    Args:
+        refresh_interval: Seconds between reloads of changed rows
+    """
+
+    def __init__(self, refresh_interval: float = 300.0):
+        self.refresh_interval = refresh_interval
+        self._rows = {}
+        self._watermark = None
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def attach(self, cards):
+        """
+        Add the enrichment fields to cards
+
+        Args:
+            cards: List of card dictionaries with 'movie_id'
+        """
+        self._maybe_refresh()
+        rows = self._rows
+        for card in cards:
+            card.update(rows.get(card['movie_id'], EMPTY_ENRICHMENT))
+
+    def refresh(self):
+        """Load the rows changed since the last refresh"""
+        from ..models import MovieEnrichment
+
+        rows = MovieEnrichment.objects.all()
+        if self._watermark is not None:
+            # >= so rows written in the same instant as the last one are not missed
+            rows = rows.filter(updated_at__gte=self._watermark)
+        changed = list(rows.values_list('movie_id', *ENRICHMENT_FIELDS, 'updated_at'))
+        if not changed:
+            return
+
+        # Swap in a new dict: readers never see a half-updated one
+        updated = dict(self._rows)
+        for movie_id, *fields, updated_at in changed:
+            updated[movie_id] = _card_fields(*fields)
+        self._rows = updated
+        self._watermark = max(updated_at for *_, updated_at in changed)
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            if self._refreshing or now < self._next_refresh:
+                return
+            self._refreshing = True
+            self._next_refresh = now + self.refresh_interval
+
+        if self._loaded:
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        else:
+            # First use: load in this request so the first pages have the fields
+            self._loaded = True
+            self._refresh_safely()
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh_safely()
+        finally:
+            connections.close_all()
+
+    def _refresh_safely(self):
+        try:
+            self.refresh()
+        except DatabaseError as e:
+            # E.g. migrations not applied yet: cards go without enrichment
+            logger.warning("Enrichment table unavailable: %s", e)
+        finally:
+            self._refreshing = False
+
+
+# Global cache instance (created on first use)
+_enrichment_cache = None
+
+
+def get_enrichment_cache():
+    """
+    Get or create the process-wide enrichment cache (singleton pattern)
+
+    Returns:
+        EnrichmentCache refreshed every RECOMMENDER_ENRICHMENT_REFRESH_SECONDS
+    """
+    global _enrichment_cache
+    if _enrichment_cache is None:
+        from django.conf import settings
+
+        _enrichment_cache = EnrichmentCache(
+            getattr(settings, 'RECOMMENDER_ENRICHMENT_REFRESH_SECONDS', 300.0)
+        )
+    return _enrichment_cache
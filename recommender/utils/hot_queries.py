@@ -0,0 +1,282 @@
+"""
+Hot Queries Module
+Streaming popularity of search queries, and cache warming from it
+
+Every search is counted in a count-min sketch (fixed memory, whatever the
+number of distinct queries) and the most frequent ones are kept in a small
+heavy-hitters table. Counts decay exponentially with a configurable half
+life, so the table follows what is popular now. Each web process flushes
+its table to its own HotQuery rows in the background, and readers sum the
+rows of all processes; after a deploy or model swap, warm_hot_queries()
+replays the stored queries so the query resolver, poster store and card
+fragment caches are filled before traffic arrives.
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.db import DatabaseError, connections
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .query_resolver import TEXT
+from .text_processing import normalize_title
+from .text_search import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def query_key(query: str, search_type: str) -> str:
+    """Normalized form of a query, as the query resolver memoizes it"""
+    if search_type == TEXT:
+        return ' '.join(sorted(tokenize(query)))
+    return normalize_title(query)
+
+
+class CountMinSketch:
+    """
+    Approximate counts of arbitrary keys in fixed memory
+
+    Estimates never undercount; they overcount by at most about
+    e / width of the total count, with probability 1 - exp(-depth).
+
+    Args:
+        width: Counters per row
+        depth: Rows (independent hash functions)
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width), dtype=np.float64)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * self.depth).digest()
+        return np.frombuffer(digest, dtype='<u8') % self.width
+
+    def add(self, key: str, count: float = 1.0) -> float:
+        """
+        Count a key
+
+        Returns:
+            The key's estimated count, including this one
+        """
+        columns = self._columns(key)
+        self.counts[self._rows, columns] += count
+        return float(self.counts[self._rows, columns].min())
+
+    def estimate(self, key: str) -> float:
+        """Estimated count of a key"""
+        return float(self.counts[self._rows, self._columns(key)].min())
+
+    def scale(self, factor: float):
+        """Multiply every count (time decay)"""
+        self.counts *= factor
+
+
+class QueryTracker:
+    """
+    Decayed heavy hitters of the search queries of this process
+
+    Args:
+        top_k: Queries kept in the heavy-hitters table
+        half_life: Seconds after which a search counts half
+        flush_interval: Seconds between flushes to the HotQuery table
+        width: Count-min sketch width
+        depth: Count-min sketch depth
+    """
+
+    def __init__(self, top_k: int = 200, half_life: float = 3600.0, flush_interval: float = 300.0,
+                 width: int = 2048, depth: int = 4):
+        self.top_k = top_k
+        self.half_life = half_life
+        self.flush_interval = flush_interval
+        self.sketch = CountMinSketch(width, depth)
+        # (search_type, key) -> [estimated count, query text as last typed]
+        self._heavy = {}
+        self._floor = 0.0
+        self._decayed_at = time.monotonic()
+        self._next_flush = self._decayed_at + flush_interval
+        self._flushing = False
+        self._lock = threading.Lock()
+
+    def record(self, query: str, search_type: str):
+        """
+        Count a search
+
+        Args:
+            query: Search text as typed
+            search_type: Requested search type ('movie', 'actor', ...)
+        """
+        key = query_key(query, search_type)
+        if not key:
+            return
+        entry_key = (search_type, key)
+        with self._lock:
+            self._decay()
+            estimate = self.sketch.add(f"{search_type}:{key}")
+
+            entry = self._heavy.get(entry_key)
+            if entry is not None:
+                entry[0] = estimate
+                entry[1] = query
+            elif len(self._heavy) < self.top_k:
+                self._heavy[entry_key] = [estimate, query]
+            elif estimate > self._floor:
+                # The floor is a lower bound of the coldest count: check the real one
+                coldest = min(self._heavy, key=lambda k: self._heavy[k][0])
+                if estimate > self._heavy[coldest][0]:
+                    del self._heavy[coldest]
+                    self._heavy[entry_key] = [estimate, query]
+                self._floor = min(count for count, _ in self._heavy.values())
+        self._maybe_flush()
+
+    def _decay(self):
+        # Called with the lock held; rescales at most once a second
+        now = time.monotonic()
+        elapsed = now - self._decayed_at
+        if elapsed < 1.0:
+            return
+        factor = 0.5 ** (elapsed / self.half_life)
+        self.sketch.scale(factor)
+        for entry in self._heavy.values():
+            entry[0] *= factor
+        self._floor *= factor
+        self._decayed_at = now
+
+    def hottest(self, n: int = None) -> list:
+        """
+        Most frequent queries, hottest first
+
+        Returns:
+            List of (search_type, key, query text, decayed count)
+        """
+        with self._lock:
+            self._decay()
+            rows = [(search_type, key, text, count) for (search_type, key), (count, text) in self._heavy.items()]
+        rows.sort(key=lambda row: -row[3])
+        return rows[:n] if n is not None else rows
+
+    def flush(self):
+        """Replace this process's rows of the HotQuery table with its heavy hitters"""
+        from ..models import HotQuery
+
+        # Looked up at flush time: pre-forking servers share the tracker's creation
+        process = f"{socket.gethostname()}:{os.getpid()}"[:64]
+        now = timezone.now()
+        rows = {}
+        for search_type, key, text, count in self.hottest():
+            # Cut to the column size; keys that only differ past it share the hottest one's row
+            key = key[:255]
+            if (search_type, key) not in rows:
+                rows[search_type, key] = HotQuery(process=process, search_type=search_type, key=key,
+                                                  query=text[:255], score=count, updated_at=now)
+        rows = list(rows.values())
+        if rows:
+            HotQuery.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['process', 'search_type', 'key'],
+                update_fields=['query', 'score', 'updated_at'],
+            )
+        # Queries that dropped out of this process's table
+        HotQuery.objects.filter(process=process, updated_at__lt=now).delete()
+        # Rows no process has reported for ten half lives (stopped processes) have cooled off
+        stale = now - timedelta(seconds=10 * self.half_life)
+        HotQuery.objects.filter(updated_at__lt=stale).delete()
+
+    def _maybe_flush(self):
+        now = time.monotonic()
+        if now < self._next_flush:
+            return
+        with self._lock:
+            if self._flushing or now < self._next_flush:
+                return
+            self._flushing = True
+            self._next_flush = now + self.flush_interval
+        threading.Thread(target=self._flush_in_background, daemon=True).start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except DatabaseError as e:
+            logger.warning("Hot query table unavailable: %s", e)
+        finally:
+            self._flushing = False
+            connections.close_all()
+
+
+def hot_queries(limit: int = 100) -> list:
+    """
+    Hottest stored queries, counts summed over the web processes
+
+    Returns:
+        List of (query text, search_type), hottest first
+    """
+    from ..models import HotQuery
+
+    rows = (
+        HotQuery.objects.values('search_type', 'key')
+        .annotate(total=Sum('score'), text=Max('query'))
+        .order_by('-total')[:limit]
+    )
+    return [(row['text'], row['search_type']) for row in rows]
+
+
+def warm_hot_queries(engine, card_cache=None, limit: int = 100) -> int:
+    """
+    Run the hottest stored queries so their results are cached
+
+    Fills the engine's query resolver, the poster store (missing posters
+    are fetched from OMDB) and, when given, the card fragment cache.
+
+    Args:
+        engine: RecommendationEngine
+        card_cache: CardFragmentCache to fill
+        limit: Queries to replay
+
+    Returns:
+        Number of queries replayed
+    """
+    try:
+        queries = hot_queries(limit)
+    except DatabaseError as e:
+        logger.warning("Hot query table unavailable, nothing to warm: %s", e)
+        return 0
+
+    start = time.monotonic()
+    for query, search_type in queries:
+        recommendations, _, _ = engine.get_recommendations(query, k=25, search_type=search_type)
+        if recommendations and card_cache is not None:
+            card_cache.render(recommendations)
+    logger.info("Warmed %d hot queries in %.1fs", len(queries), time.monotonic() - start)
+    return len(queries)
+
+
+# Global tracker instance (created on first use)
+_query_tracker = None
+
+
+def get_query_tracker():
+    """
+    Get or create the process-wide query tracker (singleton pattern)
+
+    Returns:
+        QueryTracker configured by RECOMMENDER_QUERY_TRACKER, or None when disabled
+    """
+    global _query_tracker
+    if _query_tracker is None:
+        from django.conf import settings
+
+        config = dict(getattr(settings, 'RECOMMENDER_QUERY_TRACKER', {}))
+        if not config.pop('enabled', True):
+            return None
+        _query_tracker = QueryTracker(**config)
+    return _query_tracker
@@ -0,0 +1,201 @@
+"""
+Metrics Module
+Per-stage latency histograms, cache counters and Prometheus text export
+
+Instrumentation is off unless RECOMMENDER_METRICS_ENABLED is set. While off,
+``timed()`` hands back a shared no-op context manager and the counters
+return immediately, so instrumented code pays one attribute check.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = 'recommender_stage_duration_seconds'
+CACHE_METRIC = 'recommender_cache_requests_total'
+
+# Request id of the request being served, for log records
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+
+class _NullTimer:
+    """Context manager that does nothing (instrumentation disabled)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """Context manager that observes its own duration into a histogram"""
+
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    __slots__ = ('bucket_counts', 'total', 'count')
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs
+    )
+    return '{' + body + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe, in-process store of histograms and counters"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def timer(self, name: str, **labels):
+        """Context manager timing its block into histogram ``name``"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation (seconds) in histogram ``name``"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Increase counter ``name``"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        """Drop every recorded value"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            histograms = sorted(
+                (k, (list(h.bucket_counts), h.total, h.count)) for k, h in self._histograms.items()
+            )
+            counters = sorted(self._counters.items())
+
+        lines = []
+        typed = set()
+        for (name, label_key), (bucket_counts, total, count) in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(label_key, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(label_key)} {total}")
+            lines.append(f"{name}_count{_format_labels(label_key)} {count}")
+
+        for (name, label_key), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(label_key)} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry (configured from settings in RecommenderConfig.ready)
+registry = MetricsRegistry()
+
+
+def timed(stage: str):
+    """Time a pipeline stage, e.g. ``with timed('resolve_query'): ...``"""
+    return registry.timer(STAGE_METRIC, stage=stage)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a hit or miss for the named cache"""
+    registry.inc(CACHE_METRIC, cache=cache, result='hit' if hit else 'miss')
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to every log record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    # Attributes every LogRecord has; anything else was passed via ``extra``
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', request_id_var.get()),
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -0,0 +1,303 @@
+"""
+Model Artifacts Module
+Safe, versioned on-disk format for the similarity model
+
+An artifact directory contains:
+    manifest.json   - schema version, row count, checksums and id/title-order hashes
+    similarity.npy  - N x N float32 similarity matrix (NumPy .npy)
+    movies.arrow    - movie table the matrix rows refer to (Arrow IPC file)
+
+Both data files are memory-mapped on load, so reading them is zero-copy and
+the pages are shared between worker processes. Loading checks the manifest,
+file sizes, shape and row order; hashing the whole N x N matrix is left to
+verify_artifact() (manage.py check_model_artifacts), run once per deploy,
+unless a caller asks for it. See docs/MODEL_ARTIFACTS.md.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+
+ARTIFACT_SCHEMA_VERSION = 2
+# Version 1 artifacts have no id-order hash; they are validated by title order
+SUPPORTED_SCHEMA_VERSIONS = (1, 2)
+MANIFEST_FILE = 'manifest.json'
+SIMILARITY_FILE = 'similarity.npy'
+MOVIES_FILE = 'movies.arrow'
+
+# Movie table columns written to movies.arrow (when present)
+MOVIE_COLUMNS = ['id', 'title']
+
+
+class ArtifactError(ValueError):
+    """Raised when a model artifact is missing, corrupt or misaligned"""
+
+
+def title_order_hash(titles) -> str:
+    """
+    Hash of the movie titles in row order
+
+    Args:
+        titles: Iterable of titles, in the order of the similarity matrix rows
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for title in titles:
+        digest.update(str(title).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def id_order_hash(ids) -> str:
+    """
+    Hash of the TMDB movie ids in row order
+
+    Args:
+        ids: Iterable of integer ids, in the order of the similarity matrix rows
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(np.asarray(ids, dtype='<i8').tobytes()).hexdigest()
+
+
+def file_checksum(path) -> str:
+    """Hex SHA-256 digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_model_artifacts(directory, movies_data, similarity_matrix):
+    """
+    Write the similarity model and its movie table as an artifact directory
+
+    Args:
+        directory: Output directory (created if needed)
+        movies_data: DataFrame whose rows align with the matrix rows
+        similarity_matrix: Square similarity matrix (array-like)
+
+    Returns:
+        The manifest dictionary that was written
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if hasattr(similarity_matrix, 'to_numpy'):
+        similarity_matrix = similarity_matrix.to_numpy()
+    matrix = np.ascontiguousarray(similarity_matrix, dtype=np.float32)
+    row_count = len(movies_data)
+    if matrix.shape != (row_count, row_count):
+        raise ArtifactError(
+            f"Similarity matrix shape {matrix.shape} does not match {row_count} movies"
+        )
+
+    similarity_path = directory / SIMILARITY_FILE
+    np.save(similarity_path, matrix)
+
+    columns = [c for c in MOVIE_COLUMNS if c in movies_data]
+    table = pa.Table.from_pandas(movies_data[columns], preserve_index=False)
+    movies_path = directory / MOVIES_FILE
+    with pa.OSFile(str(movies_path), 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    manifest = {
+        'schema_version': ARTIFACT_SCHEMA_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'row_count': row_count,
+        'title_order_hash': title_order_hash(movies_data['title']),
+        'id_order_hash': id_order_hash(movies_data['id']) if 'id' in movies_data else None,
+        'files': {
+            'similarity': {
+                'path': SIMILARITY_FILE,
+                'sha256': file_checksum(similarity_path),
+                'size': similarity_path.stat().st_size,
+                'dtype': str(matrix.dtype),
+                'shape': list(matrix.shape),
+            },
+            'movies': {
+                'path': MOVIES_FILE,
+                'sha256': file_checksum(movies_path),
+                'size': movies_path.stat().st_size,
+                'columns': columns,
+            },
+        },
+    }
+    with open(directory / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(directory) -> dict:
+    """
+    Read and check the manifest of an artifact directory
+
+    Raises:
+        ArtifactError: If the manifest is missing or has an unsupported schema
+    """
+    manifest_path = Path(directory) / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise ArtifactError(
+            f"No model artifact at {manifest_path}. Convert legacy pickles with "
+            f"scripts/convert_model_artifacts.py"
+        )
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    version = manifest.get('schema_version')
+    if version not in SUPPORTED_SCHEMA_VERSIONS:
+        raise ArtifactError(
+            f"Unsupported artifact schema version {version!r} "
+            f"(expected one of {SUPPORTED_SCHEMA_VERSIONS})"
+        )
+    return manifest
+
+
+def _artifact_file(directory, manifest, name, verify_checksum):
+    """Resolve a data file from the manifest, checking its size and optionally its SHA-256"""
+    entry = manifest['files'][name]
+    path = Path(directory) / entry['path']
+    if not path.exists():
+        raise ArtifactError(f"Artifact file missing: {path}")
+    # Older manifests record no size
+    if entry.get('size') is not None and path.stat().st_size != entry['size']:
+        raise ArtifactError(f"Size mismatch for {path}: {path.stat().st_size} bytes, expected {entry['size']}")
+    if verify_checksum and file_checksum(path) != entry['sha256']:
+        raise ArtifactError(f"Checksum mismatch for {path}")
+    return path
+
+
+def validate_titles(manifest, titles):
+    """
+    Check that a movie table lines up with the artifact's matrix rows
+
+    Raises:
+        ArtifactError: If the row count or title order differs
+    """
+    titles = list(titles)
+    if len(titles) != manifest['row_count']:
+        raise ArtifactError(
+            f"Movie table has {len(titles)} rows but the similarity matrix has "
+            f"{manifest['row_count']}"
+        )
+    if title_order_hash(titles) != manifest['title_order_hash']:
+        raise ArtifactError("Movie titles are not in the order of the similarity matrix rows")
+
+
+def validate_ids(manifest, ids):
+    """
+    Check that a movie table's TMDB ids line up with the artifact's matrix rows
+
+    Raises:
+        ArtifactError: If the row count or id order differs, or the artifact
+            records no id order
+    """
+    ids = np.asarray(ids)
+    if len(ids) != manifest['row_count']:
+        raise ArtifactError(
+            f"Movie table has {len(ids)} rows but the similarity matrix has "
+            f"{manifest['row_count']}"
+        )
+    if not manifest.get('id_order_hash'):
+        raise ArtifactError("Artifact records no movie id order; rebuild it with save_model_artifacts")
+    if id_order_hash(ids) != manifest['id_order_hash']:
+        raise ArtifactError("Movie ids are not in the order of the similarity matrix rows")
+
+
+def verify_artifact(directory):
+    """
+    Check the SHA-256 of every file of an artifact directory
+
+    Reads every byte, so run it at conversion or deploy time rather than
+    on each process start.
+
+    Raises:
+        ArtifactError: If the manifest is invalid, or a file is missing,
+            truncated or corrupt
+    """
+    manifest = load_manifest(directory)
+    for name in manifest['files']:
+        _artifact_file(directory, manifest, name, verify_checksum=True)
+    return manifest
+
+
+def load_similarity_artifact(directory, titles=None, ids=None, verify_checksum=False):
+    """
+    Memory-map the similarity matrix of an artifact directory
+
+    Args:
+        directory: Artifact directory
+        titles: Titles of the serving movie table, in row order; when given,
+            they are validated against the manifest's title-order hash
+        ids: TMDB ids of the serving movie table, in row order; when given,
+            they are validated against the manifest's id-order hash (schema 2)
+        verify_checksum: Also verify the file's SHA-256 before mapping it
+            (reads the whole matrix; see verify_artifact)
+
+    Returns:
+        Read-only float32 memmap of shape (N, N)
+    """
+    manifest = load_manifest(directory)
+    if ids is not None and manifest.get('id_order_hash'):
+        validate_ids(manifest, ids)
+    if titles is not None:
+        validate_titles(manifest, titles)
+
+    path = _artifact_file(directory, manifest, 'similarity', verify_checksum)
+    matrix = np.load(path, mmap_mode='r', allow_pickle=False)
+
+    row_count = manifest['row_count']
+    if matrix.shape != (row_count, row_count):
+        raise ArtifactError(
+            f"Similarity matrix shape {matrix.shape} does not match row count {row_count}"
+        )
+    return matrix
+
+
+def load_movies_artifact(directory, verify_checksum=False):
+    """
+    Memory-map the movie table of an artifact directory
+
+    Returns:
+        pyarrow.Table backed by the mapped file
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    manifest = load_manifest(directory)
+    path = _artifact_file(directory, manifest, 'movies', verify_checksum)
+    table = ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+
+    if table.num_rows != manifest['row_count']:
+        raise ArtifactError(
+            f"Movie table has {table.num_rows} rows but the manifest lists {manifest['row_count']}"
+        )
+    validate_titles(manifest, table.column('title').to_pylist())
+    if manifest.get('id_order_hash'):
+        validate_ids(manifest, table.column('id').to_numpy())
+    return table
+
+
+def load_artifact_ids(directory, verify_checksum=False):
+    """
+    TMDB ids of the artifact's matrix rows, in row order
+
+    Returns:
+        int64 array, or None when the artifact's movie table has no id column
+    """
+    table = load_movies_artifact(directory, verify_checksum=verify_checksum)
+    if 'id' not in table.column_names:
+        return None
+    return table.column('id').to_numpy().astype(np.int64)
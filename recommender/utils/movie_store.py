@@ -0,0 +1,174 @@
+"""
+Movie Store Module
+Compact, column-oriented storage for the metadata shown on result cards
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+
+from .text_processing import normalize_title, truncate_text
+
+
+# Columns the store reads from the merged movies DataFrame
+SERVING_COLUMNS = ['id', 'title', 'director', 'cast_list', 'release_date', 'vote_average', 'overview']
+
+# Overviews are only ever shown truncated, so only the truncated form is kept
+OVERVIEW_LENGTH = 150
+
+MISSING_YEAR = 0
+
+
+def _intern_strings(values):
+    """Object array of interned strings, so repeated values share one object"""
+    return np.array([sys.intern(str(value)) for value in values], dtype=object)
+
+
+def _encode(values):
+    """Dictionary-encode values into (int32 codes, categories array)"""
+    codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    return codes.astype(np.int32), _intern_strings(categories)
+
+
+class MovieStore:
+    """
+    Serving columns for every movie, addressed by integer position
+
+    Strings are interned or dictionary-encoded, ratings are float32, years
+    are int16 and cast lists are a flat code array plus int32 offsets, so the
+    store is a small fraction of the merged DataFrame it is built from.
+    """
+
+    def __init__(self, movie_id, title, director_codes, directors, release_date,
+                 year, vote_average, overview, cast_offsets, cast_codes, cast_names):
+        self.movie_id = movie_id
+        self.title = title
+        self.title_norm = _intern_strings(normalize_title(t) for t in title)
+        self.director_codes = director_codes
+        self.directors = directors
+        self.release_date = release_date
+        self.year = year
+        self.vote_average = vote_average
+        self.overview = overview
+        self.cast_offsets = cast_offsets
+        self.cast_codes = cast_codes
+        self.cast_names = cast_names
+
+        # TMDB ids in sorted order, for vectorized id -> position lookups
+        self._id_order = np.argsort(movie_id, kind='stable')
+        self._sorted_ids = movie_id[self._id_order]
+
+        # First position of each title / normalized title (O(1) exact lookups)
+        self.title_positions = {}
+        self.title_norm_positions = {}
+        for position, (t, t_norm) in enumerate(zip(self.title, self.title_norm)):
+            self.title_positions.setdefault(t, position)
+            self.title_norm_positions.setdefault(t_norm, position)
+
+    @classmethod
+    def from_dataframe(cls, movies_data: pd.DataFrame):
+        """
+        Build the store from the merged movies DataFrame
+
+        Args:
+            movies_data: DataFrame with (at least) the SERVING_COLUMNS
+
+        Returns:
+            MovieStore instance
+        """
+        n_movies = len(movies_data)
+
+        def column(name, default):
+            if name in movies_data:
+                return movies_data[name]
+            return pd.Series([default] * n_movies, index=movies_data.index, dtype=object)
+
+        if 'id' in movies_data:
+            movie_id = movies_data['id'].to_numpy(dtype=np.int32)
+        else:
+            movie_id = np.arange(n_movies, dtype=np.int32)
+
+        title = _intern_strings(movies_data['title'])
+
+        director_codes, directors = _encode(column('director', 'N/A').fillna('N/A'))
+
+        dates = column('release_date', None)
+        valid_dates = dates.notna() & (dates.astype(str) != '')
+        release_date = _intern_strings(dates.where(valid_dates, 'N/A'))
+        years = pd.to_numeric(
+            pd.Series([str(d).split('-')[0] if ok else None for d, ok in zip(dates, valid_dates)], dtype=object),
+            errors='coerce'
+        )
+        year = years.fillna(MISSING_YEAR).to_numpy(dtype=np.int16)
+
+        vote_average = pd.to_numeric(column('vote_average', np.nan), errors='coerce').to_numpy(dtype=np.float32)
+
+        overview = np.array(
+            [truncate_text(text, OVERVIEW_LENGTH) for text in column('overview', None)], dtype=object
+        )
+
+        cast_lists = [c if isinstance(c, list) else [] for c in column('cast_list', None)]
+        cast_offsets = np.zeros(n_movies + 1, dtype=np.int32)
+        cast_offsets[1:] = np.cumsum([len(c) for c in cast_lists])
+        cast_codes, cast_names = _encode([name for c in cast_lists for name in c])
+
+        return cls(
+            movie_id=movie_id,
+            title=title,
+            director_codes=director_codes,
+            directors=directors,
+            release_date=release_date,
+            year=year,
+            vote_average=vote_average,
+            overview=overview,
+            cast_offsets=cast_offsets,
+            cast_codes=cast_codes,
+            cast_names=cast_names,
+        )
+
+    def __len__(self):
+        return len(self.title)
+
+    def director(self, position: int) -> str:
+        """Director name of the movie at ``position``"""
+        return self.directors[self.director_codes[position]]
+
+    def cast(self, position: int, limit: int = None) -> list:
+        """Cast names of the movie at ``position`` in billing order"""
+        start, end = self.cast_offsets[position], self.cast_offsets[position + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self.cast_names[code] for code in self.cast_codes[start:end]]
+
+    def positions_of(self, movie_ids) -> np.ndarray:
+        """
+        Positions of the given TMDB ids
+
+        Args:
+            movie_ids: Array-like of movie ids
+
+        Returns:
+            int64 array of positions, -1 for ids not in the store
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.full(movie_ids.shape, -1, dtype=np.int64)
+        index = np.searchsorted(self._sorted_ids, movie_ids)
+        index = np.minimum(index, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[index] == movie_ids
+        return np.where(found, self._id_order[index], -1).astype(np.int64)
+
+    def release_year(self, position: int) -> str:
+        """Release year as a string, or 'N/A'"""
+        year = int(self.year[position])
+        return str(year) if year != MISSING_YEAR else 'N/A'
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store's arrays and strings"""
+        total = 0
+        for value in vars(self).values():
+            if isinstance(value, np.ndarray):
+                total += value.nbytes
+                if value.dtype == object:
+                    total += sum(sys.getsizeof(v) for v in set(value.tolist()))
+        return total
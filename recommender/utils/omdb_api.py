@@ -1,56 +1,475 @@
 """
 OMDB API Integration
 Fetch movie posters and additional information from OMDB
+
+All calls go through one OMDBClient per process, which keeps a pooled HTTP
+session, paces requests with a token bucket, lets concurrent lookups of the
+same title share one in-flight call, and stops calling OMDB for a while
+(circuit breaker) when it is failing or our quota is used up. Whenever a
+call is skipped the caller gets the same fallback as for a failed call.
 """
 
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import httpx
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OMDB_API_URL = "http://www.omdbapi.com/"
+
+OMDB_REQUEST_METRIC = 'recommender_omdb_request_duration_seconds'
+OMDB_OUTCOME_METRIC = 'recommender_omdb_requests_total'
+OMDB_COALESCED_METRIC = 'recommender_omdb_coalesced_total'
+
+# Server errors worth one more try before counting a failure
+RETRY_STATUSES = (502, 503, 504)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, up to ``burst``"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, max_wait: float = 0.0):
+        """
+        Take a token, possibly one that is still to come
+
+        Returns:
+            Seconds to wait before using the token, or None if that would
+            be longer than ``max_wait`` (no token is taken then)
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def drain(self):
+        """Drop the tokens in hand, e.g. after the server said we were too fast"""
+        with self.lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+    def acquire(self, max_wait: float = 0.0) -> bool:
+        """Take a token, sleeping up to ``max_wait`` seconds for it"""
+        wait = self.reserve(max_wait)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service for a while
+
+    Closed: calls go through and consecutive failures are counted. After
+    ``failure_threshold`` of them the breaker opens and calls are refused
+    for ``reset_timeout`` seconds. Then one probe call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self.lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """True while calls are refused (does not start a probe)"""
+        with self.lock:
+            if self.state == self.OPEN:
+                return time.monotonic() < self.opened_until
+            return self.state == self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """May a call go through now? Starts the probe once the timeout is over"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.opened_until:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def release(self):
+        """A call let through by allow() was not made: hand the probe to the next call"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                # A call started before the breaker opened; only the probe may close it
+                return
+            if self.state == self.HALF_OPEN:
+                logger.info("OMDB circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open(self.reset_timeout, f"{self.failures} failures")
+
+    def trip(self, timeout: float):
+        """Open the breaker right away, e.g. when the API quota is used up"""
+        with self.lock:
+            self._open(timeout, 'API key refused')
+
+    def _open(self, timeout, reason):
+        if self.state != self.OPEN:
+            logger.warning("OMDB circuit open for %.0fs (%s)", timeout, reason)
+        self.state = self.OPEN
+        self.opened_until = time.monotonic() + timeout
+
+
+class OMDBClient:
+    """
+    Guarded OMDB client shared by all requests of a process
+
+    Args:
+        api_key: OMDB API key (None disables every call)
+        url: API endpoint
+        timeout: Per-request timeout in seconds
+        pool_size: Kept-alive connections to OMDB
+        retries: Extra attempts on connection errors and 502/503/504
+        rate_limit: Requests per second allowed out of this process
+        burst: Requests allowed at once after an idle period
+        max_wait: Longest a lookup waits for the rate limiter before giving up
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds the circuit stays open after failures
+        quota_reset_timeout: Seconds the circuit stays open when OMDB refuses our key
+    """
+
+    def __init__(self, api_key, url=DEFAULT_OMDB_API_URL, timeout=3.0, pool_size=20, retries=1,
+                 rate_limit=10.0, burst=20, max_wait=0.5, failure_threshold=5,
+                 reset_timeout=30.0, quota_reset_timeout=3600.0):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retries = retries
+        self.max_wait = max_wait
+        self.quota_reset_timeout = quota_reset_timeout
+        self.bucket = TokenBucket(rate_limit, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.1,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=['GET'],
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        # Event loop -> (httpx.AsyncClient, in-flight tasks); both are bound to their loop
+        self._async_state = weakref.WeakKeyDictionary()
+
+    # --- Public lookups ---
+
+    def lookup(self, movie_title, year=None, details=False):
+        """
+        Raw OMDB payload of a title lookup
+
+        Args:
+            movie_title: Movie title to search
+            year: Release year (optional)
+            details: Ask for the short plot as well (the 'details' endpoint)
+
+        Returns:
+            The payload when OMDB found the movie, {} when OMDB answered that
+            it has no such movie, or None when there was no answer (no API key,
+            call skipped or failed)
+        """
+        if not self.api_key:
+            return None
+        endpoint, params = _lookup_params(movie_title, year, details)
+        return self._coalesced((endpoint, movie_title, year),
+                               lambda: self._request(endpoint, params))
+
+    async def lookup_async(self, movie_title, year=None, details=False):
+        """Same as lookup, without blocking the event loop"""
+        if not self.api_key:
+            return None
+        endpoint, params = _lookup_params(movie_title, year, details)
+        _, inflight = self._loop_state()
+        key = (endpoint, movie_title, year)
+        task = inflight.get(key)
+        if task is None:
+            task = inflight[key] = asyncio.ensure_future(self._request_async(endpoint, params))
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        else:
+            registry.inc(OMDB_COALESCED_METRIC, endpoint=endpoint)
+        return await asyncio.shield(task)
+
+    def poster(self, movie_title, year=None):
+        """Poster URL, or the default placeholder"""
+        return poster_from_payload(self.lookup(movie_title, year)) or get_default_poster()
+
+    def details(self, movie_title, year=None):
+        """Movie details dictionary, or None"""
+        return details_from_payload(self.lookup(movie_title, year, details=True))
+
+    async def poster_async(self, movie_title, year=None):
+        """Poster URL, or the default placeholder, without blocking the event loop"""
+        return poster_from_payload(await self.lookup_async(movie_title, year)) or get_default_poster()
+
+    # --- Request pipeline ---
+
+    def _coalesced(self, key, call):
+        """Run ``call`` once for all threads asking for ``key`` at the same time"""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            registry.inc(OMDB_COALESCED_METRIC, endpoint=key[0])
+            return future.result()
+
+        try:
+            future.set_result(call())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        return future.result()
+
+    def _admit(self, endpoint, wait_async=False):
+        """
+        Apply the circuit breaker and rate limiter to one call
+
+        Returns:
+            Seconds to wait before calling (0 for sync callers, who have
+            already waited), or None if the call must be skipped
+        """
+        # Breaker first: refused calls must not use up rate-limit tokens
+        if not self.breaker.allow():
+            registry.inc(OMDB_OUTCOME_METRIC, endpoint=endpoint, outcome='short_circuit')
+            return None
+        wait = self.bucket.reserve(self.max_wait)
+        if wait is None:
+            self.breaker.release()
+            registry.inc(OMDB_OUTCOME_METRIC, endpoint=endpoint, outcome='rate_limited')
+            return None
+        if wait and not wait_async:
+            try:
+                time.sleep(wait)
+            except BaseException:
+                self.breaker.release()
+                raise
+            return 0.0
+        return wait
+
+    def _request(self, endpoint, params):
+        """One guarded OMDB call; returns the payload as described in lookup"""
+        if self._admit(endpoint) is None:
+            return None
+        try:
+            with registry.timer(OMDB_REQUEST_METRIC, endpoint=endpoint):
+                response = self.session.get(self.url, params=dict(params, apikey=self.api_key),
+                                            timeout=self.timeout)
+            return self._handle_response(endpoint, response.status_code, response.json)
+        except Exception as e:
+            return self._handle_error(endpoint, params['t'], e)
+        except BaseException:
+            # Interrupted: count it, or a half-open breaker would wait for this probe forever
+            self.breaker.record_failure()
+            raise
+
+    async def _request_async(self, endpoint, params):
+        wait = self._admit(endpoint, wait_async=True)
+        if wait is None:
+            return None
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            client, _ = self._loop_state()
+            with registry.timer(OMDB_REQUEST_METRIC, endpoint=endpoint):
+                response = await client.get(self.url, params=dict(params, apikey=self.api_key))
+            return self._handle_response(endpoint, response.status_code, response.json)
+        except Exception as e:
+            return self._handle_error(endpoint, params['t'], e)
+        except BaseException:
+            # Cancelled: count it, or a half-open breaker would wait for this probe forever
+            self.breaker.record_failure()
+            raise
+
+    def _handle_response(self, endpoint, status_code, read_json):
+        if status_code == 401:
+            # Invalid key or "Request limit reached!": nothing will work until it resets
+            self.breaker.trip(self.quota_reset_timeout)
+            registry.inc(OMDB_OUTCOME_METRIC, endpoint=endpoint, outcome='quota')
+            return None
+        if status_code != 200:
+            # 5xx, 429, 403, ...: no answer about the movie, so nothing may be stored for it
+            self.breaker.record_failure()
+            if status_code == 429:
+                # Too many requests: spend the tokens we thought we had
+                self.bucket.drain()
+            registry.inc(OMDB_OUTCOME_METRIC, endpoint=endpoint,
+                         outcome='throttled' if status_code == 429 else 'error')
+            return None
+
+        self.breaker.record_success()
+        data = read_json()
+        if data.get('Response') == 'True':
+            registry.inc(OMDB_OUTCOME_METRIC, endpoint=endpoint, outcome='ok')
+            return data
+        registry.inc(OMDB_OUTCOME_METRIC, endpoint=endpoint, outcome='not_found')
+        return {}
+
+    def _handle_error(self, endpoint, movie_title, error):
+        self.breaker.record_failure()
+        registry.inc(OMDB_OUTCOME_METRIC, endpoint=endpoint, outcome='error')
+        logger.warning("Error fetching %s for %s: %s", endpoint, movie_title, error)
+        return None
+
+    def _loop_state(self):
+        """Pooled async HTTP client and in-flight tasks of the running event loop"""
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size),
+                transport=httpx.AsyncHTTPTransport(retries=self.retries),
+            )
+            state = self._async_state[loop] = (client, {})
+        return state
+
+
+def _lookup_params(movie_title, year=None, details=False):
+    """Endpoint label and query parameters of a title lookup"""
+    params = {
+        't': movie_title,
+        'type': 'movie'
+    }
+
+    if details:
+        params['plot'] = 'short'
+    if year:
+        params['y'] = year
+    return ('details' if details else 'poster'), params
+
+
+def poster_from_payload(data):
+    """Poster URL from an OMDB payload, or None when there is none"""
+    if data:
+        poster_url = data.get('Poster', 'N/A')
+
+        if poster_url and poster_url != 'N/A':
+            return poster_url
+    return None
+
+
+def details_from_payload(data):
+    """Details dictionary from an OMDB payload, or None"""
+    if not data:
+        return None
+    return {
+        'poster': data.get('Poster', get_default_poster()),
+        'imdb_rating': data.get('imdbRating', 'N/A'),
+        'genre': data.get('Genre', 'N/A'),
+        'runtime': data.get('Runtime', 'N/A'),
+        'actors': data.get('Actors', 'N/A'),
+        'director': data.get('Director', 'N/A'),
+        'plot': data.get('Plot', 'N/A')
+    }
+
+
+# Global client instance (created on first use)
+_omdb_client = None
+_omdb_client_lock = threading.Lock()
+
+
+def get_omdb_client():
+    """
+    Get or create the process-wide OMDB client (singleton pattern)
+
+    Returns:
+        OMDBClient configured from the OMDB_* settings
+    """
+    global _omdb_client
+    if _omdb_client is None:
+        with _omdb_client_lock:
+            if _omdb_client is None:
+                _omdb_client = OMDBClient(
+                    getattr(settings, 'OMDB_API_KEY', None),
+                    url=getattr(settings, 'OMDB_API_URL', DEFAULT_OMDB_API_URL),
+                    **getattr(settings, 'OMDB_CLIENT', {}),
+                )
+    return _omdb_client
 
 
 def get_movie_poster(movie_title, year=None):
     """
     Fetch movie poster URL from OMDB API
-    
+
     Args:
         movie_title: Movie title to search
         year: Release year (optional, helps with accuracy)
-    
+
     Returns:
         Poster URL or default placeholder
     """
-    api_key = getattr(settings, 'OMDB_API_KEY', None)
-    
-    if not api_key:
-        return get_default_poster()
-    
-    try:
-        # OMDB API endpoint
-        url = "http://www.omdbapi.com/"
-        params = {
-            'apikey': api_key,
-            't': movie_title,
-            'type': 'movie'
-        }
-        
-        if year:
-            params['y'] = year
-        
-        response = requests.get(url, params=params, timeout=3)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if data.get('Response') == 'True':
-                poster_url = data.get('Poster', 'N/A')
-                
-                if poster_url and poster_url != 'N/A':
-                    return poster_url
-        
-        return get_default_poster()
-        
-    except Exception as e:
-        print(f"Error fetching poster for {movie_title}: {str(e)}")
-        return get_default_poster()
+    return get_omdb_client().poster(movie_title, year)
+
+
+async def get_movie_poster_async(movie_title, year=None):
+    """
+    Fetch movie poster URL from OMDB API without blocking the event loop
+
+    Args:
+        movie_title: Movie title to search
+        year: Release year (optional, helps with accuracy)
+
+    Returns:
+        Poster URL or default placeholder
+    """
+    return await get_omdb_client().poster_async(movie_title, year)
 
 
 def get_default_poster():
@@ -61,49 +480,12 @@ def get_default_poster():
 def get_movie_details(movie_title, year=None):
     """
     Fetch detailed movie information from OMDB API
-    
+
     Args:
         movie_title: Movie title to search
         year: Release year (optional)
-    
+
     Returns:
         Dictionary with movie details or None
     """
-    api_key = getattr(settings, 'OMDB_API_KEY', None)
-    
-    if not api_key:
-        return None
-    
-    try:
-        url = "http://www.omdbapi.com/"
-        params = {
-            'apikey': api_key,
-            't': movie_title,
-            'type': 'movie',
-            'plot': 'short'
-        }
-        
-        if year:
-            params['y'] = year
-        
-        response = requests.get(url, params=params, timeout=3)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if data.get('Response') == 'True':
-                return {
-                    'poster': data.get('Poster', get_default_poster()),
-                    'imdb_rating': data.get('imdbRating', 'N/A'),
-                    'genre': data.get('Genre', 'N/A'),
-                    'runtime': data.get('Runtime', 'N/A'),
-                    'actors': data.get('Actors', 'N/A'),
-                    'director': data.get('Director', 'N/A'),
-                    'plot': data.get('Plot', 'N/A')
-                }
-        
-        return None
-        
-    except Exception as e:
-        print(f"Error fetching details for {movie_title}: {str(e)}")
-        return None
+    return get_omdb_client().details(movie_title, year)
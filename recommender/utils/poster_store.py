@@ -0,0 +1,151 @@
+"""
+Poster Store Module
+Persistent poster URLs, looked up in bulk for the cards of a result page
+
+Posters come from the MoviePoster table first. Only movies missing from it
+are looked up on OMDB, and every definite OMDB answer is written back, so
+the table warms up with traffic as well as through warm_posters.
+"""
+
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .metrics import record_cache
+from .omdb_api import get_default_poster, get_omdb_client, poster_from_payload
+
+logger = logging.getLogger(__name__)
+
+STORE_CACHE = 'poster_store'
+
+
+def stored_posters(movie_ids):
+    """
+    Stored poster URLs of the given movies
+
+    Args:
+        movie_ids: Iterable of TMDB movie ids
+
+    Returns:
+        Dictionary of movie_id -> poster URL ('' when OMDB has no poster);
+        movies not in the store are left out
+    """
+    from ..models import MoviePoster
+
+    try:
+        return dict(
+            MoviePoster.objects.filter(movie_id__in=list(movie_ids)).values_list('movie_id', 'poster_url')
+        )
+    except DatabaseError as e:
+        # E.g. migrations not applied yet: serve from OMDB as before
+        logger.warning("Poster store unavailable: %s", e)
+        return {}
+
+
+def poster_record(movie_id, title, year, payload):
+    """
+    MoviePoster row for a definite OMDB answer
+
+    Args:
+        movie_id: TMDB movie id
+        title: Movie title
+        year: Release year as given to OMDB
+        payload: OMDB payload ({} when OMDB has no such movie)
+
+    Returns:
+        Unsaved MoviePoster instance
+    """
+    from ..models import MoviePoster
+
+    return MoviePoster(
+        movie_id=movie_id,
+        title=title[:255],
+        year='' if year in (None, 'N/A') else str(year),
+        poster_url=poster_from_payload(payload) or '',
+        fetched_at=timezone.now(),
+    )
+
+
+def save_posters(records):
+    """
+    Insert or update MoviePoster rows in one statement
+
+    Args:
+        records: List of unsaved MoviePoster instances
+    """
+    from ..models import MoviePoster
+
+    if not records:
+        return
+    try:
+        MoviePoster.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['movie_id'],
+            update_fields=['title', 'year', 'poster_url', 'fetched_at'],
+        )
+    except DatabaseError as e:
+        logger.warning("Could not save %d posters: %s", len(records), e)
+
+
+def attach_stored_posters(cards):
+    """
+    Fill in 'poster_url' of cards whose movie is in the store
+
+    Args:
+        cards: List of card dictionaries with 'movie_id'
+
+    Returns:
+        List of the cards still without a poster
+    """
+    stored = stored_posters(card['movie_id'] for card in cards)
+    missing = []
+    for card in cards:
+        poster_url = stored.get(card['movie_id'])
+        record_cache(STORE_CACHE, poster_url is not None)
+        if poster_url is None:
+            missing.append(card)
+        else:
+            card['poster_url'] = poster_url or get_default_poster()
+    return missing
+
+
+def fetch_posters(cards):
+    """
+    Fill in 'poster_url' of cards from OMDB and store the answers
+
+    Args:
+        cards: List of card dictionaries with 'movie_id', 'title' and 'release_year'
+    """
+    client = get_omdb_client()
+    records = []
+    for card in cards:
+        payload = client.lookup(card['title'], card['release_year'])
+        card['poster_url'] = poster_from_payload(payload) or get_default_poster()
+        if payload is not None:
+            records.append(poster_record(card['movie_id'], card['title'], card['release_year'], payload))
+    save_posters(records)
+
+
+async def fetch_posters_async(cards):
+    """
+    Fill in 'poster_url' of cards from OMDB, all lookups running concurrently,
+    and store the answers
+
+    Args:
+        cards: List of card dictionaries with 'movie_id', 'title' and 'release_year'
+    """
+    client = get_omdb_client()
+    payloads = await asyncio.gather(
+        *(client.lookup_async(card['title'], card['release_year']) for card in cards)
+    )
+    records = []
+    for card, payload in zip(cards, payloads):
+        card['poster_url'] = poster_from_payload(payload) or get_default_poster()
+        if payload is not None:
+            records.append(poster_record(card['movie_id'], card['title'], card['release_year'], payload))
+    if records:
+        await sync_to_async(save_posters)(records)
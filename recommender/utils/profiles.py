@@ -0,0 +1,171 @@
+"""
+Profiles Module
+Per-visitor search history and the "for you" feed built from it
+
+When a visitor searches a movie, its nearest neighbours are added to the
+visitor's profile with rank weights (1 / log2(rank + 2)), after decaying
+the scores of earlier searches. The profile keeps the PROFILE_SIZE best
+scored movies, so its size is bounded whatever the history length, and
+the feed is a single vectorized top-k over it (see
+RecommendationEngine.recommend_from_scores). Searches are written by a
+background thread, off the response path; only visitors who are logged in
+or already have a session (opening the "for you" page starts one) get a
+profile.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Neighbour scores kept per profile
+PROFILE_SIZE = 500
+# Searched movies remembered (and left out of the feed)
+SEEN_SIZE = 200
+# Weight of the earlier searches each time a new one is added
+DECAY = 0.8
+
+
+def profile_owner(request, create: bool = False):
+    """
+    Profile key of the visitor
+
+    Args:
+        request: HttpRequest (the session and auth middleware are optional)
+        create: Start a session for anonymous visitors that have none
+
+    Returns:
+        'user:<id>', 'session:<key>', or None for a visitor without a session
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    session = getattr(request, 'session', None)
+    if session is None:
+        return None
+    if not session.session_key:
+        if not create:
+            return None
+        session.create()
+    return f"session:{session.session_key}"
+
+
+def _array(data, dtype):
+    return np.frombuffer(bytes(data or b''), dtype=dtype)
+
+
+def profile_arrays(profile):
+    """
+    Decoded arrays of a ViewerProfile
+
+    Returns:
+        Tuple of (seen_ids, neighbor_ids, neighbor_scores)
+    """
+    return (
+        _array(profile.seen_ids, '<i4'),
+        _array(profile.neighbor_ids, '<i4'),
+        _array(profile.neighbor_scores, '<f4'),
+    )
+
+
+def merge_neighbors(neighbor_ids, neighbor_scores, new_ids, decay: float = DECAY, size: int = PROFILE_SIZE):
+    """
+    Add ranked neighbours to a profile vector
+
+    Args:
+        neighbor_ids: Movie ids of the profile
+        neighbor_scores: Their scores
+        new_ids: Neighbour ids of the searched movie, most similar first
+        decay: Factor applied to the existing scores
+        size: Entries kept
+
+    Returns:
+        Tuple of (ids, scores), highest score first
+    """
+    new_ids = np.asarray(new_ids, dtype=np.int32)
+    new_scores = (1.0 / np.log2(np.arange(len(new_ids)) + 2.0)).astype(np.float32)
+
+    ids, inverse = np.unique(np.concatenate([neighbor_ids, new_ids]), return_inverse=True)
+    scores = np.bincount(
+        inverse, weights=np.concatenate([neighbor_scores * decay, new_scores]), minlength=len(ids)
+    ).astype(np.float32)
+
+    order = np.argsort(-scores, kind='stable')[:size]
+    return ids[order], scores[order]
+
+
+def record_search(owner, movie_id, neighbor_ids):
+    """
+    Add a searched movie and its neighbours to a visitor's profile
+
+    Args:
+        owner: Profile key (see profile_owner)
+        movie_id: TMDB id of the searched movie
+        neighbor_ids: TMDB ids of its recommendations, most similar first
+    """
+    from ..models import ViewerProfile
+
+    # Row lock: two searches of the same visitor must not overwrite each other
+    with transaction.atomic():
+        profile, _ = ViewerProfile.objects.select_for_update().get_or_create(owner=owner)
+        seen_ids, ids, scores = profile_arrays(profile)
+        ids, scores = merge_neighbors(ids, scores, neighbor_ids)
+
+        seen_ids = np.append(seen_ids[seen_ids != movie_id], np.int32(movie_id))[-SEEN_SIZE:]
+        profile.seen_ids = seen_ids.astype('<i4').tobytes()
+        profile.neighbor_ids = ids.astype('<i4').tobytes()
+        profile.neighbor_scores = scores.astype('<f4').tobytes()
+        profile.searches += 1
+        profile.updated_at = timezone.now()
+        profile.save()
+
+
+# One writer thread: profile updates are queued in search order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profiles')
+
+
+def _record_in_background(owner, movie_id, neighbor_ids):
+    try:
+        record_search(owner, movie_id, neighbor_ids)
+    except DatabaseError as e:
+        logger.warning("Search not added to the visitor profile: %s", e)
+    finally:
+        connections.close_all()
+
+
+def record_search_later(owner, movie_id, neighbor_ids):
+    """
+    Queue record_search on the background writer
+
+    Returns:
+        Future of the write
+    """
+    return _writer.submit(_record_in_background, owner, movie_id, list(neighbor_ids))
+
+
+def feed(engine, owner, k: int = 25, with_posters: bool = True):
+    """
+    "For you" recommendations of a visitor
+
+    Args:
+        engine: RecommendationEngine
+        owner: Profile key, or None
+        k: Number of movies
+        with_posters: Fill in poster URLs
+
+    Returns:
+        List of card dictionaries (empty without a profile)
+    """
+    from ..models import ViewerProfile
+
+    if owner is None:
+        return []
+    profile = ViewerProfile.objects.filter(owner=owner).first()
+    if profile is None:
+        return []
+    seen_ids, ids, scores = profile_arrays(profile)
+    return engine.recommend_from_scores(ids, scores, exclude_ids=seen_ids, k=k, with_posters=with_posters)
@@ -0,0 +1,168 @@
+"""
+Query Resolver Module
+Decides which search a query runs (title, actor, director, free text or suggestions)
+
+Queries are normalized like titles (lowercase, alphanumeric only) and looked
+up in precomputed key sets: title keys, then actor and director keys. Only
+when none matches exactly does the resolver fall back to the partial-name
+scans and, last, to fuzzy title suggestions. Free-text queries, asked for
+explicitly, go to the BM25 text index. Resolutions are memoized per
+normalized query in a bounded LRU, so a repeated query skips all of it.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from .metrics import record_cache, timed
+from .text_processing import normalize_title, find_close_matches
+from .text_search import tokenize
+
+MOVIE = 'movie'
+ACTOR = 'actor'
+DIRECTOR = 'director'
+TEXT = 'text'
+SUGGESTION = 'suggestion'
+
+RESOLVER_CACHE = 'query_resolver'
+
+
+class Resolution(NamedTuple):
+    """
+    Outcome of resolving a query
+
+    kind: MOVIE (positions holds the matched movie), ACTOR or DIRECTOR
+        (positions holds their movies, empty when nobody matched), TEXT
+        (positions holds the best matches, best first), or SUGGESTION
+        (suggestions holds close titles, possibly none)
+    """
+
+    kind: str
+    positions: tuple = ()
+    suggestions: tuple = ()
+
+
+class QueryResolver:
+    """
+    Resolve search queries against the catalog
+
+    Args:
+        movies: MovieStore of the catalog
+        actor_to_movies: Dictionary of actor name -> list of movie positions
+        director_to_movies: Dictionary of director name -> list of movie positions
+        text_index: BM25Index for TEXT searches
+        cache_size: Resolutions kept in the LRU
+        max_results: Movies kept per person resolution
+    """
+
+    def __init__(self, movies, actor_to_movies=None, director_to_movies=None, text_index=None,
+                 cache_size: int = 10000, max_results: int = 100):
+        self.movies = movies
+        self.text_index = text_index
+        self.max_results = max_results
+        self.actor_keys = self._person_keys(actor_to_movies or {})
+        self.director_keys = self._person_keys(director_to_movies or {})
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _person_keys(self, person_to_movies):
+        """Normalized name -> positions of the person's movies"""
+        keys = {}
+        for name, name_positions in person_to_movies.items():
+            key = normalize_title(name)
+            if key:
+                keys.setdefault(key, []).extend(name_positions)
+        return {key: tuple(dict.fromkeys(positions)) for key, positions in keys.items()}
+
+    def resolve(self, query: str, search_type: str = MOVIE) -> Resolution:
+        """
+        Resolve a query, using the memoized resolution when there is one
+
+        Args:
+            query: Search text as typed
+            search_type: MOVIE (title, falling back to people and suggestions),
+                ACTOR, DIRECTOR or TEXT
+
+        Returns:
+            Resolution
+        """
+        if search_type == TEXT:
+            # Word boundaries matter here; word order does not
+            cache_key = (search_type, ' '.join(sorted(tokenize(query))))
+        else:
+            cache_key = (search_type, normalize_title(query))
+        with self._lock:
+            resolution = self._cache.get(cache_key)
+            if resolution is not None:
+                self._cache.move_to_end(cache_key)
+        record_cache(RESOLVER_CACHE, resolution is not None)
+        if resolution is not None:
+            return resolution
+
+        with timed('resolve_query'):
+            resolution = self._classify(cache_key[1], search_type)
+
+        with self._lock:
+            self._cache[cache_key] = resolution
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return resolution
+
+    def _classify(self, key: str, search_type: str) -> Resolution:
+        if search_type == TEXT:
+            if self.text_index is None:
+                return Resolution(TEXT)
+            matches = self.text_index.search(key.split(), k=self.max_results)
+            return Resolution(TEXT, tuple(position for position, _ in matches))
+        if search_type == ACTOR:
+            return Resolution(ACTOR, self._find_person(key, self.actor_keys))
+        if search_type == DIRECTOR:
+            return Resolution(DIRECTOR, self._find_person(key, self.director_keys))
+        if not key:
+            return Resolution(SUGGESTION)
+
+        # O(1) checks against the precomputed key sets
+        position = self.movies.title_norm_positions.get(key)
+        if position is not None:
+            return Resolution(MOVIE, (position,))
+        for kind, person_keys in ((ACTOR, self.actor_keys), (DIRECTOR, self.director_keys)):
+            positions = person_keys.get(key)
+            if positions:
+                return Resolution(kind, positions[:self.max_results])
+
+        # Partial names ("hanks"), then close titles
+        for kind, person_keys in ((ACTOR, self.actor_keys), (DIRECTOR, self.director_keys)):
+            positions = self._partial_person(key, person_keys)
+            if positions:
+                return Resolution(kind, positions)
+        return Resolution(SUGGESTION, suggestions=self.suggest_titles(key))
+
+    def _find_person(self, key, person_keys):
+        if not key:
+            return ()
+        positions = person_keys.get(key)
+        if positions:
+            return positions[:self.max_results]
+        return self._partial_person(key, person_keys)
+
+    def _partial_person(self, key, person_keys):
+        """Movies of every person whose name contains the query"""
+        positions = {}
+        for name, name_positions in person_keys.items():
+            if key in name:
+                positions.update(dict.fromkeys(name_positions))
+                if len(positions) >= self.max_results:
+                    break
+        return tuple(positions)[:self.max_results]
+
+    def suggest_titles(self, normalized_query: str) -> tuple:
+        """Up to 5 titles close to the (normalized) query"""
+        movies = self.movies
+        close_matches = find_close_matches(normalized_query, movies.title_norm.tolist(), n=5, cutoff=0.6)
+        return tuple(movies.title[movies.title_norm_positions[match]] for match in close_matches)
+
+    def clear(self):
+        """Forget every memoized resolution"""
+        with self._lock:
+            self._cache.clear()
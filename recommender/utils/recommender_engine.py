@@ -3,191 +3,229 @@ Recommendation Engine Module
 Core recommendation logic
 """
 
-import pandas as pd
-from .text_processing import (
-    normalize_title, 
-    find_close_matches, 
-    format_release_date,
-    format_rating,
-    truncate_text
-)
-from .omdb_api import get_movie_poster
+import logging
+
+import numpy as np
+
+from .text_processing import normalize_title, format_rating
+from .poster_store import attach_stored_posters, fetch_posters
+from .enrichment import get_enrichment_cache
+from .movie_store import MovieStore
+from .similarity import as_similarity_index, top_k_indices
+from .metrics import timed
+from .query_resolver import QueryResolver, MOVIE, ACTOR, DIRECTOR, TEXT, SUGGESTION
+
+logger = logging.getLogger(__name__)
 
 
 class RecommendationEngine:
     """Movie recommendation engine"""
     
-    def __init__(self, movies_data, similarity_matrix, data_loader=None):
+    def __init__(self, movies_data, similarity_matrix, data_loader=None, query_cache_size: int = 10000):
         """
         Initialize recommendation engine
         
         Args:
-            movies_data: DataFrame with movie information
-            similarity_matrix: Pre-computed similarity matrix
-            data_loader: DataLoader instance for actor/director search
+            movies_data: DataFrame with movie information, or a MovieStore
+            similarity_matrix: Pre-computed similarity matrix, or a similarity
+                index such as SparseCosineSimilarity
+            data_loader: DataLoader instance for actor/director, free-text search and browsing
+            query_cache_size: Query resolutions memoized by the resolver
         """
-        self.movies_data = movies_data.copy()
-        self.similarity_matrix = similarity_matrix
+        # Only the compact serving columns are kept, not a copy of the DataFrame
+        if isinstance(movies_data, MovieStore):
+            self.movies = movies_data
+        else:
+            self.movies = MovieStore.from_dataframe(movies_data)
+        self.similarity_index = as_similarity_index(similarity_matrix)
         self.data_loader = data_loader
-        
-        # Add normalized titles for matching
-        self.movies_data['title_norm'] = self.movies_data['title'].apply(normalize_title)
+        self.browse_index = data_loader.browse_index if data_loader else None
+        self.resolver = QueryResolver(
+            self.movies,
+            data_loader.actor_to_movies if data_loader else None,
+            data_loader.director_to_movies if data_loader else None,
+            data_loader.text_index if data_loader else None,
+            cache_size=query_cache_size,
+        )
     
-    def get_recommendations(self, movie_title: str, k: int = 25):
+    def get_recommendations(self, movie_title: str, k: int = 25, with_posters: bool = True,
+                            search_type: str = MOVIE, resolution=None):
         """
         Get movie recommendations
         
         Args:
-            movie_title: Movie title, actor name, or director name to search
+            movie_title: Movie title, actor name, director name or free text to search
             k: Number of recommendations to return
+            with_posters: Fetch poster URLs; when False 'poster_url' is None
+            search_type: 'movie' (title, falling back to people and
+                suggestions), 'actor', 'director' or 'text'
+            resolution: The query's Resolution, when the caller has already
+                resolved it
             
         Returns:
             Tuple of (recommendations_list, suggestions_list, search_type)
             - recommendations_list: List of dicts with movie details (or None)
             - suggestions_list: List of suggested titles if no exact match (or None)
-            - search_type: 'movie', 'actor', 'director', or 'suggestion'
+            - search_type: 'movie', 'actor', 'director', 'text', 'suggestion' or 'error'
         """
         try:
-            # Normalize query
-            query_norm = normalize_title(movie_title)
-            
-            # 1. Try exact movie match
-            matches = self.movies_data[self.movies_data['title_norm'] == query_norm]
+            if resolution is None:
+                resolution = self.resolver.resolve(movie_title, search_type)
             
-            if not matches.empty:
-                # Found exact movie match
-                result = self._get_similar_movies(matches.index[0], k)
-                return result + ('movie',)
+            if resolution.kind == MOVIE:
+                recommendations, _ = self._get_similar_movies(resolution.positions[0], k, with_posters)
+                return recommendations, None, MOVIE
             
-            # 2. Try actor search
-            if self.data_loader:
-                actor_movies = self.data_loader.find_movies_by_actor(movie_title)
-                if actor_movies:
-                    return self._get_movies_by_list(actor_movies, k, movie_title, 'actor')
-                
-                # 3. Try director search
-                director_movies = self.data_loader.find_movies_by_director(movie_title)
-                if director_movies:
-                    return self._get_movies_by_list(director_movies, k, movie_title, 'director')
+            if resolution.kind in (ACTOR, DIRECTOR, TEXT):
+                recommendations = self._format_cards(list(resolution.positions[:k]), with_posters)
+                return recommendations or None, None, resolution.kind
             
-            # 4. No exact match - suggest similar titles
-            result = self._get_suggestions(query_norm)
-            return result + ('suggestion',)
+            return None, list(resolution.suggestions), SUGGESTION
             
-        except Exception as e:
-            print(f"Error in get_recommendations: {e}")
+        except Exception:
+            logger.exception("Error in get_recommendations")
             return None, None, 'error'
-            return None, []
     
-    def _get_suggestions(self, normalized_query: str):
+    def recommend_titles(self, movie_title: str, k: int = 10):
+        """
+        Get the titles of similar movies, without formatting cards or fetching posters
+        
+        Args:
+            movie_title: Movie title (case-insensitive, flexible spelling)
+            k: Number of recommendations to return
+            
+        Returns:
+            Tuple of (titles_list, suggestions_list); one of them is None
+        """
+        query_norm = normalize_title(movie_title)
+        movie_index = self.movies.title_norm_positions.get(query_norm)
+        
+        if movie_index is None:
+            return None, list(self.resolver.suggest_titles(query_norm))
+        
+        top_indices = self.similarity_index.top_k(movie_index, k)
+        return [self.movies.title[idx] for idx in top_indices], None
+    
+    def browse(self, genre=None, decade=None, director=None, page: int = 1, per_page: int = 25,
+               with_posters: bool = True):
         """
-        Get title suggestions for queries with no exact match
+        One page of the ranked movies of a genre, decade (or both) or director
         
         Args:
-            normalized_query: Normalized query string
+            genre: Genre name
+            decade: First year of a decade
+            director: Director name (not combinable with genre or decade)
+            page: 1-based page number
+            per_page: Movies per page
+            with_posters: Fetch poster URLs while formatting
             
         Returns:
-            Tuple of (None, suggestions_list)
-        """
-        candidates = self.movies_data['title_norm'].tolist()
-        close_matches = find_close_matches(normalized_query, candidates, n=5, cutoff=0.6)
-        
-        if close_matches:
-            suggestions = []
-            for match in close_matches:
-                title = self.movies_data.loc[
-                    self.movies_data['title_norm'] == match, 
-                    'title'
-                ].iloc[0]
-                suggestions.append(title)
-            return None, suggestions
-        
-        return None, []
+            Tuple of (cards, total movies in the list)
+            
+        Raises:
+            ValueError: For an unsupported facet combination
+        """
+        if self.browse_index is None:
+            return [], 0
+        positions, total = self.browse_index.page(genre, decade, director, page, per_page)
+        return self._format_cards(positions.tolist(), with_posters), total
     
-    def _get_similar_movies(self, movie_index: int, k: int):
+    def recommend_from_scores(self, movie_ids, scores, exclude_ids=(), k: int = 25, with_posters: bool = True):
+        """
+        Cards of the best scored movies of a sparse score vector (e.g. a visitor profile)
+        
+        Args:
+            movie_ids: TMDB ids
+            scores: Score of each id
+            exclude_ids: TMDB ids to leave out (e.g. movies already searched)
+            k: Number of movies
+            with_posters: Fetch poster URLs while formatting
+            
+        Returns:
+            List of card dictionaries, best first
+        """
+        positions = self.movies.positions_of(movie_ids)
+        scores = np.where(positions >= 0, scores, -np.inf)
+        if len(exclude_ids):
+            scores[np.isin(movie_ids, exclude_ids)] = -np.inf
+        
+        with timed('similarity_topk'):
+            top = top_k_indices(scores, k)
+        top = top[np.isfinite(scores[top])]
+        return self._format_cards(positions[top].tolist(), with_posters)
+    
+    def _get_similar_movies(self, movie_index: int, k: int, with_posters: bool = True):
         """
         Get similar movies based on similarity matrix
         
         Args:
-            movie_index: Index of the movie in the dataset
+            movie_index: Position of the movie in the dataset
             k: Number of recommendations
+            with_posters: Fetch poster URLs while formatting
             
         Returns:
             Tuple of (recommendations_list, None)
         """
-        # Get similarity scores
-        similarity_scores = list(enumerate(self.similarity_matrix[movie_index]))
-        
-        # Sort by similarity (descending) and exclude the movie itself
-        sorted_scores = sorted(similarity_scores, key=lambda x: x[1], reverse=True)[1:k+1]
+        # Top-k by similarity (descending), excluding the movie itself
+        with timed('similarity_topk'):
+            top_indices = self.similarity_index.top_k(movie_index, k)
         
         # Build recommendations list
-        recommendations = []
-        for idx, score in sorted_scores:
-            movie = self.movies_data.iloc[idx]
-            rec_dict = self._format_movie_data(movie)
-            recommendations.append(rec_dict)
+        recommendations = self._format_cards([int(idx) for idx in top_indices], with_posters)
         
         return recommendations, None
     
-    def _format_movie_data(self, movie: pd.Series) -> dict:
+    def _format_cards(self, positions: list, with_posters: bool = True) -> list:
         """
-        Format movie data into dictionary
+        Format the movies at the given positions, with their posters
+        
+        Posters are looked up in the poster store in one query; only movies
+        missing from it are fetched from OMDB. The OMDB enrichment fields
+        come from the in-memory enrichment cache.
         
         Args:
-            movie: Pandas Series with movie data
+            positions: Positions of the movies in the dataset
+            with_posters: Fill in poster URLs (otherwise 'poster_url' is None)
             
         Returns:
-            Dictionary with formatted movie information
+            List of card dictionaries
         """
-        # Format release date
-        release_date, release_year = format_release_date(movie['release_date'])
-        
-        # Format rating
-        rating = format_rating(movie['vote_average'])
-        
-        # Get movie poster
-        poster_url = get_movie_poster(movie['title'], release_year)
-        
-        # Get cast as comma-separated string
-        cast_str = 'N/A'
-        if 'cast_list' in movie and isinstance(movie['cast_list'], list):
-            cast_str = ', '.join(movie['cast_list'][:3])  # Top 3 actors
-        
-        return {
-            'title': movie['title'],
-            'director': movie.get('director', 'N/A'),
-            'release_date': release_date,
-            'release_year': release_year,
-            'rating': rating,
-            'overview': truncate_text(movie.get('overview', 'No overview available.'), 150),
-            'poster_url': poster_url,
-            'cast': cast_str,
-            'google_search': f"https://www.google.com/search?q={movie['title'].replace(' ', '+')}+movie"
-        }
+        with timed('format_cards'):
+            cards = [self._format_movie_data(position) for position in positions]
+            get_enrichment_cache().attach(cards)
+        
+        if with_posters and cards:
+            with timed('posters'):
+                fetch_posters(attach_stored_posters(cards))
+        return cards
     
-    def _get_movies_by_list(self, movie_titles: list, k: int, search_query: str, search_type: str):
+    def _format_movie_data(self, position: int) -> dict:
         """
-        Get movies from a list of titles (for actor/director search)
+        Format movie data into dictionary
         
         Args:
-            movie_titles: List of movie titles
-            k: Maximum number to return
-            search_query: Original search query
-            search_type: 'actor' or 'director'
+            position: Position of the movie in the dataset
             
         Returns:
-            Tuple of (recommendations_list, None)
+            Dictionary with formatted movie information ('poster_url' is
+            filled in by _format_cards)
         """
-        recommendations = []
+        movies = self.movies
+        title = movies.title[position]
+        release_year = movies.release_year(position)
         
-        for title in movie_titles[:k]:
-            # Find movie in dataframe
-            movie_match = self.movies_data[self.movies_data['title'] == title]
-            
-            if not movie_match.empty:
-                movie = movie_match.iloc[0]
-                rec_dict = self._format_movie_data(movie)
-                recommendations.append(rec_dict)
+        # Get cast as comma-separated string (top 3 actors)
+        cast_str = ', '.join(movies.cast(position, limit=3)) or 'N/A'
         
-        return recommendations, None
+        return {
+            'movie_id': int(movies.movie_id[position]),
+            'title': title,
+            'director': movies.director(position),
+            'release_date': movies.release_date[position],
+            'release_year': release_year,
+            'rating': format_rating(movies.vote_average[position]),
+            'overview': movies.overview[position],
+            'poster_url': None,
+            'cast': cast_str,
+            'google_search': f"https://www.google.com/search?q={title.replace(' ', '+')}+movie"
+        }
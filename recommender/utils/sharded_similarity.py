@@ -0,0 +1,163 @@
+"""
+Sharded Similarity Module
+Scatter-gather top-k over candidate vectors split across worker processes
+
+The feature vectors are cut into contiguous row ranges (shards). The
+matrix is written once to a scratch directory as flat CSR arrays; each
+worker process memory-maps them and copies only its own row range, and
+the scratch files are removed once every shard is up. The web process
+keeps no feature rows, and scoring runs on several cores at once. A query
+fetches the query vector from the shard that owns the movie, fans it out
+to every shard, and merges the per-shard top-k lists with a heap.
+"""
+
+import heapq
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from .similarity import SHARDED_BACKEND, SparseCosineSimilarity, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+# Shard held by this worker process (set by _init_shard)
+_shard = None
+_shard_start = 0
+
+
+def save_rows(feature_matrix, directory):
+    """
+    Write a CSR matrix as flat .npy arrays that shards can slice by rows
+
+    Args:
+        feature_matrix: N x V CSR matrix
+        directory: Existing directory to write into
+    """
+    directory = Path(directory)
+    np.save(directory / 'indptr.npy', feature_matrix.indptr.astype(np.int64))
+    np.save(directory / 'indices.npy', feature_matrix.indices)
+    np.save(directory / 'data.npy', feature_matrix.data)
+
+
+def load_rows(directory, start, stop, n_columns):
+    """Rows start:stop of a matrix written by save_rows (only those rows are read)"""
+    directory = Path(directory)
+    indptr = np.load(directory / 'indptr.npy', mmap_mode='r')
+    first, last = int(indptr[start]), int(indptr[stop])
+    indices = np.array(np.load(directory / 'indices.npy', mmap_mode='r')[first:last])
+    data = np.array(np.load(directory / 'data.npy', mmap_mode='r')[first:last])
+    return sparse.csr_matrix(
+        (data, indices, np.asarray(indptr[start:stop + 1]) - first), shape=(stop - start, n_columns)
+    )
+
+
+def _init_shard(directory, start, stop, n_columns):
+    global _shard, _shard_start
+    _shard = SparseCosineSimilarity(load_rows(directory, start, stop, n_columns))
+    _shard_start = start
+
+
+def _shard_vector(local_index):
+    """Normalized feature vector of one of this shard's movies"""
+    return _shard.vectors[local_index]
+
+
+def _shard_top_k(query, k, exclude):
+    """
+    Local top-k of this shard
+
+    Returns:
+        List of (score, global position) pairs, best first
+    """
+    scores = _shard.vectors @ query.toarray().ravel()
+    local_exclude = exclude - _shard_start if 0 <= exclude - _shard_start < len(scores) else None
+    positions = top_k_indices(scores, k, exclude=local_exclude)
+    return [(float(scores[p]), int(p) + _shard_start) for p in positions]
+
+
+def shard_bounds(n_rows, n_shards):
+    """
+    Start positions of contiguous, near-equal row ranges
+
+    Returns:
+        List of n_shards + 1 boundaries (the last one is n_rows)
+    """
+    n_shards = max(1, min(n_shards, n_rows or 1))
+    return [round(i * n_rows / n_shards) for i in range(n_shards + 1)]
+
+
+class ShardedSimilarity:
+    """
+    Neighbour lookup fanned out to one worker process per shard
+
+    Returns the same neighbours as SparseCosineSimilarity, highest score
+    first: shards break ties by position and the merge keeps that order.
+    """
+
+    backend = SHARDED_BACKEND
+
+    def __init__(self, feature_matrix, n_shards=None):
+        """
+        Args:
+            feature_matrix: N x V sparse count or TF-IDF matrix (not kept)
+            n_shards: Number of shard processes (default: one per CPU)
+        """
+        feature_matrix = sparse.csr_matrix(feature_matrix, dtype=np.float32)
+        self.n_rows, n_columns = feature_matrix.shape
+        self.bounds = shard_bounds(self.n_rows, n_shards or os.cpu_count() or 1)
+
+        # Executors keep their initargs: hand the shards a path, not rows
+        scratch = tempfile.mkdtemp(prefix='similarity-shards-')
+        try:
+            save_rows(feature_matrix, scratch)
+            del feature_matrix
+
+            # Spawned rather than forked: the web process may already run threads
+            context = multiprocessing.get_context('spawn')
+            self.workers = [
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=context,
+                    initializer=_init_shard,
+                    initargs=(scratch, start, stop, n_columns),
+                )
+                for start, stop in zip(self.bounds, self.bounds[1:])
+            ]
+            # Start the processes now, while the scratch files exist
+            for future in [worker.submit(len, ()) for worker in self.workers]:
+                future.result()
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        logger.info("Started %d similarity shards over %d movies", len(self.workers), self.n_rows)
+
+    def __len__(self):
+        return self.n_rows
+
+    def _owner(self, index: int):
+        return bisect_right(self.bounds, index, hi=len(self.workers)) - 1
+
+    def top_k(self, index: int, k: int):
+        """Positions of the k movies most similar to ``index`` (itself excluded)"""
+        owner = self._owner(index)
+        query = self.workers[owner].submit(_shard_vector, index - self.bounds[owner]).result()
+
+        futures = [worker.submit(_shard_top_k, query, k, index) for worker in self.workers]
+        shard_results = [future.result() for future in futures]
+
+        # Each list is sorted best first: merge on (-score, position)
+        merged = heapq.merge(*shard_results, key=lambda pair: (-pair[0], pair[1]))
+        return np.array([position for _, position in islice(merged, k)], dtype=np.intp)
+
+    def close(self):
+        """Stop the shard processes"""
+        for worker in self.workers:
+            worker.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,150 @@
+"""
+Similarity Module
+Top-k neighbour lookup over precomputed or on-the-fly cosine similarity
+"""
+
+import numpy as np
+from scipy import sparse
+
+
+# Supported values for the RECOMMENDER_SIMILARITY_BACKEND setting
+PRECOMPUTED_BACKEND = 'precomputed'
+SPARSE_BACKEND = 'sparse'
+SHARDED_BACKEND = 'sharded'
+SIMILARITY_BACKENDS = (PRECOMPUTED_BACKEND, SPARSE_BACKEND, SHARDED_BACKEND)
+
+
+def top_k_indices(scores, k: int, exclude=None):
+    """
+    Select the k highest scoring positions without sorting every score
+
+    Ties are broken by position everywhere, including among the scores tied
+    at the k-th place, so the result does not depend on the partition order.
+
+    Args:
+        scores: 1-D array of similarity scores
+        k: Number of positions to return
+        exclude: Position to leave out (usually the query movie itself)
+
+    Returns:
+        Array of positions ordered by descending score (ties by position)
+    """
+    scores = np.asarray(scores)
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+        available = len(scores) - 1
+    else:
+        available = len(scores)
+
+    k = min(k, available)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < len(scores):
+        # Everything above the k-th score, then the lowest tied positions
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+
+    # Highest score first, lowest position first on ties
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
+class PrecomputedSimilarity:
+    """Neighbour lookup over a dense, precomputed N x N similarity matrix"""
+
+    backend = PRECOMPUTED_BACKEND
+
+    def __init__(self, similarity_matrix):
+        """
+        Args:
+            similarity_matrix: Square matrix (ndarray, DataFrame or nested list)
+        """
+        if hasattr(similarity_matrix, 'to_numpy'):
+            similarity_matrix = similarity_matrix.to_numpy()
+        self.matrix = np.asarray(similarity_matrix, dtype=np.float32)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def scores(self, index: int):
+        """Similarity of every movie to the movie at ``index``"""
+        return self.matrix[index]
+
+    def top_k(self, index: int, k: int):
+        """Positions of the k movies most similar to ``index`` (itself excluded)"""
+        return top_k_indices(self.scores(index), k, exclude=index)
+
+
+class SparseCosineSimilarity:
+    """
+    Neighbour lookup computed at request time from a sparse feature matrix
+
+    Only the row-normalized CSR matrix is kept in memory, so the footprint
+    is proportional to the number of nonzeros instead of N x N. A query is
+    a single sparse mat-vec followed by an argpartition.
+    """
+
+    backend = SPARSE_BACKEND
+
+    def __init__(self, feature_matrix):
+        """
+        Args:
+            feature_matrix: N x V sparse count or TF-IDF matrix
+        """
+        vectors = sparse.csr_matrix(feature_matrix, dtype=np.float32)
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.vectors = sparse.csr_matrix(sparse.diags(1.0 / norms) @ vectors, dtype=np.float32)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def scores(self, index: int):
+        """Cosine similarity of every movie to the movie at ``index``"""
+        query = self.vectors[index].toarray().ravel()
+        return self.vectors @ query
+
+    def top_k(self, index: int, k: int):
+        """Positions of the k movies most similar to ``index`` (itself excluded)"""
+        return top_k_indices(self.scores(index), k, exclude=index)
+
+
+def build_count_matrix(token_lists):
+    """
+    Build a sparse bag-of-words count matrix
+
+    Args:
+        token_lists: Iterable with one list of tokens per movie
+
+    Returns:
+        Tuple of (N x V CSR count matrix, vocabulary list)
+    """
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    for tokens in token_lists:
+        for token in tokens:
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+        indptr.append(len(indices))
+
+    data = np.ones(len(indices), dtype=np.float32)
+    matrix = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, len(vocabulary)),
+    )
+    # Repeated tokens (e.g. the weighted director) become counts
+    matrix.sum_duplicates()
+    return matrix, list(vocabulary)
+
+
+def as_similarity_index(similarity):
+    """Wrap a raw similarity matrix; pass through objects that already expose top_k"""
+    if hasattr(similarity, 'top_k'):
+        return similarity
+    return PrecomputedSimilarity(similarity)
@@ -0,0 +1,152 @@
+"""
+Text Search Module
+BM25 free-text search over movie overviews, keywords and taglines
+
+The inverted index is a set of flat arrays: for each term, a slice of
+``doc_ids`` (sorted positions) and ``impacts`` (the term's precomputed BM25
+contribution to each of those movies). A query is then a handful of array
+gathers. Query terms are processed from the highest to the lowest maximum
+impact; once the remaining terms together cannot lift an unseen movie into
+the top k (MaxScore pruning), they only add to the movies already found,
+through a binary search of their posting lists instead of a full merge.
+"""
+
+import re
+
+import numpy as np
+
+from .similarity import top_k_indices
+
+# Words too common to tell movies apart
+STOP_WORDS = frozenset("""
+    a about after all also an and any are as at be been before but by can
+    do does for from had has have he her his how i if in into is it its
+    just me more most my no not of on one only or other our out over she
+    so some than that the their them then there these they this to too up
+    us was we were what when where which who whom why will with would you
+    your
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> list:
+    """
+    Split text into lowercase search terms, without stop words
+
+    Args:
+        text: Any text (non-strings such as NaN give no terms)
+
+    Returns:
+        List of terms, in order, repeats kept
+    """
+    if not isinstance(text, str):
+        return []
+    return [
+        term for term in TOKEN_PATTERN.findall(text.lower())
+        if len(term) > 1 and term not in STOP_WORDS
+    ]
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 ranking
+
+    Args:
+        documents: Iterable with one list of terms per movie, in position order
+        k1: BM25 term-frequency saturation
+        b: BM25 document-length normalization
+    """
+
+    def __init__(self, documents, k1: float = 1.2, b: float = 0.75):
+        vocabulary = {}
+        term_ids = []
+        doc_ids = []
+        doc_lengths = []
+        for position, terms in enumerate(documents):
+            doc_lengths.append(len(terms))
+            for term in terms:
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+            doc_ids.extend([position] * len(terms))
+
+        self.vocabulary = vocabulary
+        self.n_docs = len(doc_lengths)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+
+        # One posting per (term, movie), sorted by term then movie
+        keys = np.unique(term_ids.astype(np.int64) * max(self.n_docs, 1) + doc_ids, return_counts=True)
+        posting_terms = (keys[0] // max(self.n_docs, 1)).astype(np.int32)
+        self.doc_ids = (keys[0] % max(self.n_docs, 1)).astype(np.int32)
+        term_frequencies = keys[1].astype(np.float32)
+
+        document_frequencies = np.bincount(posting_terms, minlength=len(vocabulary))
+        self.indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequencies, out=self.indptr[1:])
+
+        idf = np.log1p((self.n_docs - document_frequencies + 0.5) / (document_frequencies + 0.5))
+        average_length = doc_lengths.mean() if self.n_docs else 1.0
+        length_norm = k1 * (1 - b + b * doc_lengths[self.doc_ids] / max(average_length, 1e-9))
+        self.impacts = (
+            idf[posting_terms] * term_frequencies * (k1 + 1) / (term_frequencies + length_norm)
+        ).astype(np.float32)
+
+        # Upper bound of each term's contribution, for pruning
+        self.max_impacts = np.zeros(len(vocabulary), dtype=np.float32)
+        np.maximum.at(self.max_impacts, posting_terms, self.impacts)
+
+    def __len__(self):
+        return self.n_docs
+
+    def _postings(self, term_id):
+        start, stop = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.doc_ids[start:stop], self.impacts[start:stop]
+
+    def search(self, query, k: int = 25) -> list:
+        """
+        Best matching movies for a free-text query
+
+        Args:
+            query: Query text, or a list of terms from tokenize()
+            k: Number of movies to return
+
+        Returns:
+            List of (position, score) pairs, best first (ties by position)
+        """
+        terms = tokenize(query) if isinstance(query, str) else query
+        weights = {}
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                weights[term_id] = weights.get(term_id, 0) + 1
+        if not weights or k <= 0:
+            return []
+
+        # Highest possible contribution first
+        term_ids = sorted(weights, key=lambda t: -self.max_impacts[t] * weights[t])
+        bounds = np.array([self.max_impacts[t] * weights[t] for t in term_ids])
+        remaining_bound = np.concatenate([np.cumsum(bounds[::-1])[::-1], [0.0]])
+
+        candidates = np.empty(0, dtype=np.int32)
+        scores = np.empty(0, dtype=np.float32)
+        for i, term_id in enumerate(term_ids):
+            docs, impacts = self._postings(term_id)
+            impacts = impacts * weights[term_id]
+
+            if len(candidates) >= k and remaining_bound[i] < np.partition(scores, -k)[-k]:
+                # No unseen movie can reach the top k: only score the candidates
+                found = np.searchsorted(docs, candidates)
+                found = np.minimum(found, len(docs) - 1)
+                hit = docs[found] == candidates
+                scores[hit] += impacts[found[hit]]
+                continue
+
+            candidates, inverse = np.unique(np.concatenate([candidates, docs]), return_inverse=True)
+            scores = np.bincount(
+                inverse, weights=np.concatenate([scores, impacts]), minlength=len(candidates)
+            ).astype(np.float32)
+
+        # Candidates are in position order, so ties at the cutoff go by position too
+        top = top_k_indices(scores, k)
+        return [(int(candidates[i]), float(scores[i])) for i in top]
@@ -3,19 +3,69 @@ Views for the movie recommendation system
 Clean and organized using utility modules
 """
 
+import logging
+import math
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
 from .utils import get_data_loader, RecommendationEngine
+from .utils.browse import parse_decade
+from .utils.card_cache import CardFragmentCache
+from .utils.hot_queries import get_query_tracker, warm_hot_queries
+from .utils.metrics import registry, timed
+from .utils.poster_store import attach_stored_posters, fetch_posters_async
+from .utils.profiles import feed, profile_owner, record_search_later
+
+logger = logging.getLogger(__name__)
 
 # Initialize data loader (singleton pattern)
 data_loader = get_data_loader()
 
 # Get loaded data
-movies_data = data_loader.get_movies_data()
+movie_store = data_loader.get_movie_store()
 similarity_matrix = data_loader.get_similarity_matrix()
 titles_list = data_loader.get_titles_list()
 
 # Initialize recommendation engine
-recommender = RecommendationEngine(movies_data, similarity_matrix, data_loader)
+recommender = RecommendationEngine(
+    movie_store, similarity_matrix, data_loader,
+    query_cache_size=getattr(settings, 'RECOMMENDER_QUERY_CACHE_SIZE', 10000),
+)
+
+# Pre-rendered result cards
+card_cache = CardFragmentCache(
+    model_version=data_loader.data_version(),
+    max_size=getattr(settings, 'RECOMMENDER_CARD_CACHE_SIZE', 5000),
+)
+
+# Replay the hottest queries of earlier processes so their results are cached
+if getattr(settings, 'RECOMMENDER_WARMUP_QUERIES', 0):
+    threading.Thread(
+        target=warm_hot_queries,
+        args=(recommender, card_cache, settings.RECOMMENDER_WARMUP_QUERIES),
+        daemon=True,
+    ).start()
+
+def _render(request, template_name, context):
+    """Render a template, timing the render stage"""
+    if context.get('recommended_movies'):
+        # Cards come from the fragment cache; the page only stitches them in
+        context['recommended_cards'] = card_cache.render(context['recommended_movies'])
+    with timed('render'):
+        return render(request, template_name, context)
+
+
+def metrics(request):
+    """Prometheus text exposition of the recommender metrics"""
+    if not registry.enabled:
+        raise Http404("Metrics are disabled")
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4')
+
 
 def main(request):
     """
@@ -28,7 +78,7 @@ def main(request):
     # --- GET Request ---
     # Display the main search page
     if request.method == 'GET':
-        return render(
+        return _render(
             request,
             'recommender/index.html',
             {
@@ -52,7 +102,7 @@ def main(request):
 
         # Check if the search term is empty
         if not movie_name:
-            return render(
+            return _render(
                 request,
                 'recommender/index.html',
                 {
@@ -67,174 +117,340 @@ def main(request):
                 }
             )
 
+        template_name, context, resolution = _search(movie_name, search_type_input)
+        _remember_search(request, resolution, context)
+        return _render(request, template_name, context)
+
+
+def _in_thread_pool(func):
+    """
+    Async wrapper running func on the shared thread pool
+    
+    Unlike thread-sensitive sync_to_async calls, these run concurrently,
+    but on threads Django's request_finished handler never sees, so the
+    database connections func opens there (hot-query flushes, enrichment
+    refreshes) are closed here once they are obsolete, as at the end of a
+    request.
+    """
+    def run(*args, **kwargs):
         try:
-            # --- Search by Actor ---
-            if search_type_input == 'actor':
-                actor_movies = data_loader.find_movies_by_actor(movie_name)
-                
-                if actor_movies:
-                    recommendations = []
-                    for title in actor_movies[:25]: # Get top 25 movies for the actor
-                        movie_match = movies_data[movies_data['title'] == title]
-                        if not movie_match.empty:
-                            movie = movie_match.iloc[0]
-                            rec_dict = recommender._format_movie_data(movie)
-                            recommendations.append(rec_dict)
-                    
-                    if recommendations:
-                        return render(
-                            request,
-                            'recommender/result.html',
-                            {
-                                'all_movie_names': titles_list,
-                                'input_provided': 'yes',
-                                'movie_found': 'yes',
-                                'recomendation_found': 'yes',
-                                'recommended_movies': recommendations,
-                                'suggestions': [],
-                                'input_movie_name': movie_name,
-                                'search_type': 'actor',
-                                'search_message': f'Movies featuring {movie_name}'
-                            }
-                        )
-                
-                # Actor not found or has no movies in the list
-                return render(
-                    request,
-                    'recommender/index.html',
-                    {
-                        'all_movie_names': titles_list,
-                        'input_provided': 'yes',
-                        'movie_found': '',
-                        'recomendation_found': '',
-                        'recommended_movies': [],
-                        'suggestions': [],
-                        'input_movie_name': movie_name,
-                        'error_message': f'Actor "{movie_name}" not found in our database. Please try another actor name.'
-                    }
-                )
-
-            # --- Search by Director ---
-            elif search_type_input == 'director':
-                director_movies = data_loader.find_movies_by_director(movie_name)
-                
-                if director_movies:
-                    recommendations = []
-                    for title in director_movies[:25]: # Get top 25 movies for the director
-                        movie_match = movies_data[movies_data['title'] == title]
-                        if not movie_match.empty:
-                            movie = movie_match.iloc[0]
-                            rec_dict = recommender._format_movie_data(movie)
-                            recommendations.append(rec_dict)
-                    
-                    if recommendations:
-                        return render(
-                            request,
-                            'recommender/result.html',
-                            {
-                                'all_movie_names': titles_list,
-                                'input_provided': 'yes',
-                                'movie_found': 'yes',
-                                'recomendation_found': 'yes',
-                                'recommended_movies': recommendations,
-                                'suggestions': [],
-                                'input_movie_name': movie_name,
-                                'search_type': 'director',
-                                'search_message': f'Movies directed by {movie_name}'
-                            }
-                        )
-                
-                # Director not found
-                return render(
-                    request,
-                    'recommender/index.html',
-                    {
-                        'all_movie_names': titles_list,
-                        'input_provided': 'yes',
-                        'movie_found': '',
-                        'recomendation_found': '',
-                        'recommended_movies': [],
-                        'suggestions': [],
-                        'input_movie_name': movie_name,
-                        'error_message': f'Director "{movie_name}" not found in our database. Please try another director name.'
-                    }
-                )
-
-            # --- Search by Movie Title (Default) ---
-            else:
-                recommendations, suggestions, search_type = recommender.get_recommendations(movie_name, k=25)
-                
-                search_message = f'Movies similar to {movie_name}'
-                
-                # Case 1: Movie found, recommendations generated
-                if recommendations:
-                    return render(
-                        request,
-                        'recommender/result.html',
-                        {
-                            'all_movie_names': titles_list,
-                            'input_provided': 'yes',
-                            'movie_found': 'yes',
-                            'recomendation_found': 'yes',
-                            'recommended_movies': recommendations,
-                            'suggestions': [],
-                            'input_movie_name': movie_name,
-                            'search_type': search_type,
-                            'search_message': search_message
-                        }
-                    )
-                # Case 2: Movie not found, but suggestions are available
-                elif suggestions:
-                    return render(
-                        request,
-                        'recommender/index.html',
-                        {
-                            'all_movie_names': titles_list,
-                            'input_provided': 'yes',
-                            'movie_found': 'no',
-                            'recomendation_found': '',
-                            'recommended_movies': [],
-                            'suggestions': suggestions,
-                            'input_movie_name': movie_name,
-                            'error_message': ''
-                        }
-                    )
-                # Case 3: Movie not found, no suggestions
-                else:
-                    return render(
-                        request,
-                        'recommender/index.html',
-                        {
-                            'all_movie_names': titles_list,
-                            'input_provided': 'yes',
-                            'movie_found': '',
-                            'recomendation_found': '',
-                            'recommended_movies': [],
-                            'suggestions': [],
-                            'input_movie_name': movie_name,
-                            'error_message': f'Movie "{movie_name}" not found in our database. Please try another title.'
-                        }
-                    )
-
-        # --- General Error Handling ---
-        except Exception as e:
-            # Log the error for debugging
-            print(f"Error in main view: {e}")
-            import traceback
-            traceback.print_exc()
-            
-            # Show a generic error message to the user
-            return render(
-                request,
-                'recommender/index.html',
-                {
-                    'all_movie_names': titles_list,
-                    'input_provided': 'yes',
-                    'movie_found': '',
-                    'recomendation_found': '',
-                    'recommended_movies': [],
-                    'suggestions': [],
-                    'input_movie_name': movie_name,
-                    'error_message': 'An error occurred while searching. Please try again with a different search term.'
-                }
-            )
\ No newline at end of file
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def main_async(request):
+    """
+    Async variant of main for ASGI servers
+    
+    The CPU-bound engine work and template rendering run in the thread pool,
+    and the posters missing from the poster store are fetched concurrently
+    over a pooled async HTTP client, so a worker is not blocked while OMDB
+    answers.
+    """
+    if request.method == 'POST':
+        movie_name = request.POST.get('movie_name', '').strip()
+        if movie_name:
+            search_type_input = request.POST.get('search_type', 'movie').lower()
+            template_name, context, resolution = await _in_thread_pool(_search)(
+                movie_name, search_type_input, with_posters=False
+            )
+            missing = await sync_to_async(attach_stored_posters)(context['recommended_movies'])
+            await fetch_posters_async(missing)
+            await sync_to_async(_remember_search)(request, resolution, context)
+            return await _in_thread_pool(_render)(request, template_name, context)
+    
+    # GET and empty searches need no engine or network work
+    return await _in_thread_pool(main)(request)
+
+
+# Result page headline and not-found message per resolved search type
+SEARCH_MESSAGES = {
+    'movie': 'Movies similar to {}',
+    'actor': 'Movies featuring {}',
+    'director': 'Movies directed by {}',
+    'text': 'Movies matching "{}"',
+}
+NOT_FOUND_MESSAGES = {
+    'actor': 'Actor "{}" not found in our database. Please try another actor name.',
+    'director': 'Director "{}" not found in our database. Please try another director name.',
+    'text': 'No movies match "{}". Please try other keywords.',
+    'suggestion': 'Movie "{}" not found in our database. Please try another title.',
+    'error': 'An error occurred while searching. Please try again with a different search term.',
+}
+
+
+def _remember_search(request, resolution, context):
+    """Queue a successful title search for the visitor's profile (visitors with a session only)"""
+    if context.get('search_type') != 'movie' or not getattr(settings, 'RECOMMENDER_PROFILES_ENABLED', True):
+        return
+    owner = profile_owner(request)
+    if owner is None:
+        return
+    movie_id = int(recommender.movies.movie_id[resolution.positions[0]])
+    record_search_later(owner, movie_id, [card['movie_id'] for card in context['recommended_movies']])
+
+
+def _track(query, search_type):
+    """Count a search in the hot-query tracker"""
+    tracker = get_query_tracker()
+    if tracker is not None:
+        tracker.record(query, search_type)
+
+
+def _search(movie_name, search_type_input, with_posters=True):
+    """
+    Run a search and build the page that shows its results
+    
+    The engine's query resolver picks the one search path to run (title,
+    actor, director, free text or suggestions), so views never try them in turn.
+    
+    Args:
+        movie_name: Search term (non-empty)
+        search_type_input: 'movie', 'actor', 'director' or 'text'
+        with_posters: Fetch poster URLs while formatting cards (the async view
+            fetches them afterwards, concurrently)
+        
+    Returns:
+        Tuple of (template_name, context, resolution)
+    """
+    if search_type_input not in SEARCH_MESSAGES:
+        search_type_input = 'movie'
+    _track(movie_name, search_type_input)
+    # Resolved here so the caller can record the searched movie without a second lookup
+    resolution = recommender.resolver.resolve(movie_name, search_type_input)
+    recommendations, suggestions, search_type = recommender.get_recommendations(
+        movie_name, k=25, with_posters=with_posters, search_type=search_type_input, resolution=resolution
+    )
+    
+    context = {
+        'all_movie_names': titles_list,
+        'input_provided': 'yes',
+        'movie_found': '',
+        'recomendation_found': '',
+        'recommended_movies': [],
+        'suggestions': [],
+        'input_movie_name': movie_name,
+        'error_message': ''
+    }
+    
+    # Case 1: Recommendations found
+    if recommendations:
+        context.update({
+            'movie_found': 'yes',
+            'recomendation_found': 'yes',
+            'recommended_movies': recommendations,
+            'search_type': search_type,
+            'search_message': SEARCH_MESSAGES[search_type].format(movie_name)
+        })
+        return 'recommender/result.html', context, resolution
+    
+    # Case 2: Movie not found, but suggestions are available
+    if suggestions:
+        context.update({'movie_found': 'no', 'suggestions': suggestions})
+        return 'recommender/index.html', context, resolution
+    
+    # Case 3: Nothing found (or the search failed)
+    context['error_message'] = NOT_FOUND_MESSAGES.get(search_type, NOT_FOUND_MESSAGES['suggestion']).format(movie_name)
+    return 'recommender/index.html', context, resolution
+
+
+@require_GET
+def api_search(request):
+    """
+    JSON search API
+    
+    Query parameters:
+        q: Search term
+        type: 'movie' (default), 'actor', 'director' or 'text'
+        k: Number of results (1-100, default 25)
+    
+    Posters come from the poster store only; movies without a stored
+    poster have a null 'poster_url'.
+    """
+    query = request.GET.get('q', '').strip()
+    search_type = request.GET.get('type', 'movie').lower()
+    if not query:
+        return JsonResponse({'error': 'Missing query parameter "q"'}, status=400)
+    if search_type not in SEARCH_MESSAGES:
+        return JsonResponse(
+            {'error': f"Unknown search type; expected one of {', '.join(SEARCH_MESSAGES)}"}, status=400
+        )
+    try:
+        k = min(max(int(request.GET.get('k', 25)), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'Query parameter "k" must be an integer'}, status=400)
+    
+    _track(query, search_type)
+    recommendations, suggestions, resolved_type = recommender.get_recommendations(
+        query, k=k, with_posters=False, search_type=search_type
+    )
+    if resolved_type == 'error':
+        return JsonResponse({'error': NOT_FOUND_MESSAGES['error']}, status=500)
+    if recommendations:
+        attach_stored_posters(recommendations)
+    return JsonResponse({
+        'query': query,
+        'search_type': resolved_type,
+        'results': recommendations or [],
+        'suggestions': suggestions or [],
+    })
+
+
+def _visitor_feed(request, with_posters=True):
+    try:
+        return feed(recommender, profile_owner(request), k=25, with_posters=with_posters)
+    except DatabaseError as e:
+        logger.warning("Visitor profile unavailable: %s", e)
+        return []
+
+
+def for_you(request):
+    """
+    Recommendations from the visitor's search history
+    
+    Opening this page starts a session for anonymous visitors, so their
+    searches are remembered from then on.
+    """
+    if getattr(settings, 'RECOMMENDER_PROFILES_ENABLED', True):
+        profile_owner(request, create=True)
+    recommendations = _visitor_feed(request)
+    context = {
+        'all_movie_names': titles_list,
+        'input_provided': 'yes',
+        'movie_found': '',
+        'recomendation_found': '',
+        'recommended_movies': [],
+        'suggestions': [],
+        'input_movie_name': '',
+        'error_message': ''
+    }
+    if recommendations:
+        context.update({
+            'movie_found': 'yes',
+            'recomendation_found': 'yes',
+            'recommended_movies': recommendations,
+            'search_message': 'Recommended for you',
+        })
+        return _render(request, 'recommender/result.html', context)
+    
+    context['error_message'] = 'Search for a few movies first to get recommendations picked for you.'
+    return _render(request, 'recommender/index.html', context)
+
+
+@require_GET
+def api_for_you(request):
+    """JSON variant of for_you (posters from the poster store only)"""
+    recommendations = _visitor_feed(request, with_posters=False)
+    attach_stored_posters(recommendations)
+    return JsonResponse({'results': recommendations})
+
+
+def _browse_params(request):
+    """
+    Facets and page of a browse request
+    
+    Returns:
+        Tuple of (params dict, error message or None)
+    """
+    params = {
+        'genre': request.GET.get('genre', '').strip() or None,
+        'director': request.GET.get('director', '').strip() or None,
+        'decade': None,
+    }
+    if request.GET.get('decade'):
+        params['decade'] = parse_decade(request.GET['decade'])
+        if params['decade'] is None:
+            return params, 'Decade must look like 1990, 1990s or 90s'
+    try:
+        params['page'] = max(int(request.GET.get('page', 1)), 1)
+        params['per_page'] = min(max(int(request.GET.get('per_page', 25)), 1), 100)
+    except ValueError:
+        return params, 'Page numbers must be integers'
+    if params['director'] and (params['genre'] or params['decade'] is not None):
+        return params, 'Director browsing cannot be combined with genre or decade'
+    return params, None
+
+
+def _browse_suggestions(params):
+    """Genre or director names close to a browse request that matched nothing"""
+    if recommender.browse_index is None:
+        return []
+    return recommender.browse_index.suggestions(genre=params['genre'], director=params['director'])
+
+
+@require_GET
+def browse(request):
+    """
+    Ranked movies of a genre and/or decade, or of a director, one page at a time
+    
+    Query parameters: genre, decade, director, page, per_page
+    """
+    params, error = _browse_params(request)
+    context = {
+        'all_movie_names': titles_list,
+        'input_provided': 'yes',
+        'movie_found': '',
+        'recomendation_found': '',
+        'recommended_movies': [],
+        'suggestions': [],
+        'input_movie_name': '',
+        'error_message': error or ''
+    }
+    if error:
+        return _render(request, 'recommender/index.html', context)
+    
+    recommendations, total = recommender.browse(**params)
+    if not recommendations:
+        context['error_message'] = 'No movies to browse for this selection.'
+        near = _browse_suggestions(params) if not total else []
+        if near:
+            context['error_message'] += f" Did you mean: {', '.join(near)}?"
+        return _render(request, 'recommender/index.html', context)
+    
+    pages = math.ceil(total / params['per_page'])
+    page_links = {'page': params['page'], 'pages': pages}
+    for name, number in (('previous', params['page'] - 1), ('next', params['page'] + 1)):
+        if 1 <= number <= pages:
+            query = request.GET.copy()
+            query['page'] = number
+            page_links[name] = query.urlencode()
+    
+    facets = {key: params[key] for key in ('genre', 'decade', 'director')}
+    context.update({
+        'movie_found': 'yes',
+        'recomendation_found': 'yes',
+        'recommended_movies': recommendations,
+        'search_message': recommender.browse_index.title(**facets),
+        'page_links': page_links,
+    })
+    return _render(request, 'recommender/result.html', context)
+
+
+@require_GET
+def api_browse(request):
+    """
+    JSON variant of browse (posters from the poster store only)
+    
+    Without any facet, also lists the genres and decades that can be browsed.
+    """
+    params, error = _browse_params(request)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    
+    recommendations, total = recommender.browse(with_posters=False, **params)
+    attach_stored_posters(recommendations)
+    response = {
+        'page': params['page'],
+        'per_page': params['per_page'],
+        'total': total,
+        'results': recommendations,
+    }
+    if not total:
+        response['suggestions'] = _browse_suggestions(params)
+    index = recommender.browse_index
+    if index is not None and not (params['genre'] or params['director'] or params['decade'] is not None):
+        response['genres'] = sorted(index.genre_names.values())
+        response['decades'] = index.decades
+    return JsonResponse(response)
@@ -0,0 +1,118 @@
+"""
+Convert the legacy pickled similarity model into the versioned artifact format
+
+Usage:
+    python scripts/convert_model_artifacts.py
+    python scripts/convert_model_artifacts.py --movies-pickle data/models/movies.pkl
+    python scripts/convert_model_artifacts.py --data-dir /path/to/data
+
+The legacy matrix was built by the training notebook, which merged the
+CSVs on title (so duplicate titles repeat movies) and then dropped rows
+with missing values. Without --movies-pickle that row order is rebuilt
+from the TMDB CSVs. Either way, only the first row of each movie id is
+kept, preferring the row whose credits belong to the movie, so the
+artifact is keyed on unique ids.
+
+Only run this on pickles you produced yourself: unpickling executes code.
+"""
+
+import argparse
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from recommender.utils.data_loader import DataLoader, DATA_DIR
+from recommender.utils.model_artifacts import save_model_artifacts
+
+# Columns the notebook kept before dropping rows with missing values
+LEGACY_COLUMNS = ['id', 'title', 'overview', 'genres', 'keywords', 'cast', 'crew',
+                  'original_language', 'release_date', 'runtime']
+
+
+def legacy_movie_table(movies, credits):
+    """
+    Movie rows in the order of the legacy similarity matrix
+
+    Args:
+        movies: TMDB movies CSV as a DataFrame
+        credits: TMDB credits CSV as a DataFrame
+
+    Returns:
+        DataFrame with id, title and the credits' movie_id of every matrix row
+    """
+    merged = movies.merge(credits, on='title')
+    columns = [c for c in LEGACY_COLUMNS if c in merged]
+    kept = merged[columns].dropna().index
+    return merged.loc[kept, ['id', 'title', 'movie_id']].reset_index(drop=True)
+
+
+def drop_repeated_ids(movies_data, similarity_matrix):
+    """
+    Keep one matrix row and column per movie id
+
+    The first row of each id is kept, or, when the table has the credits'
+    movie_id, the first row whose credits belong to the movie.
+
+    Returns:
+        Tuple of (movie table, square matrix) without repeated ids
+    """
+    ids = movies_data['id'].to_numpy()
+    if 'movie_id' in movies_data:
+        mismatched = movies_data['movie_id'].to_numpy() != ids
+    else:
+        mismatched = np.zeros(len(ids), dtype=bool)
+    # Stable sort: within each id, rows with matching credits come first
+    order = np.lexsort((np.arange(len(ids)), mismatched, ids))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = ids[order][1:] != ids[order][:-1]
+    keep = np.sort(order[first])
+    return movies_data.iloc[keep].reset_index(drop=True), similarity_matrix[np.ix_(keep, keep)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR,
+                        help='Data directory with datasets/ and models/ (default: data)')
+    parser.add_argument('--similarity', type=Path, default=None,
+                        help='Pickled similarity matrix (default: <data-dir>/models/similarity_list.pkl)')
+    parser.add_argument('--movies-pickle', type=Path, default=None,
+                        help='Pickled movie DataFrame the matrix was built from '
+                             '(default: rebuilt from the TMDB CSVs like the training notebook)')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Artifact directory (default: <data-dir>/models)')
+    args = parser.parse_args(argv)
+    similarity_path = args.similarity or args.data_dir / 'models' / 'similarity_list.pkl'
+    output = args.output or args.data_dir / 'models'
+
+    if args.movies_pickle:
+        with open(args.movies_pickle, 'rb') as f:
+            movies_data = pd.DataFrame(pickle.load(f)).reset_index(drop=True)
+    else:
+        loader = DataLoader(data_dir=args.data_dir)
+        movies_data = legacy_movie_table(loader.load_movies(), loader.load_credits())
+
+    with open(similarity_path, 'rb') as f:
+        similarity_matrix = np.asarray(pickle.load(f))
+
+    if similarity_matrix.shape != (len(movies_data), len(movies_data)):
+        parser.error(
+            f"Similarity matrix shape {similarity_matrix.shape} does not match the "
+            f"{len(movies_data)} rows of the movie table; pass the --movies-pickle it was built from"
+        )
+
+    legacy_rows = len(movies_data)
+    movies_data, similarity_matrix = drop_repeated_ids(movies_data, similarity_matrix)
+    manifest = save_model_artifacts(output, movies_data, similarity_matrix)
+    print(f"Wrote {manifest['row_count']} rows to {output} "
+          f"({legacy_rows - manifest['row_count']} repeated movie rows dropped)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())